@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark - latence des autres endpoints pendant une rafale de connexions.
+
+Simule l'arrivée simultanée des coachs (POST /api/auth/login en parallèle)
+pendant qu'un arbitre interroge /api/auth/me en continu, et affiche les
+percentiles de latence de ces requêtes avec et sans la rafale.
+
+Usage:
+    REACT_APP_BACKEND_URL=http://localhost:8001 \\
+    python backend/benchmarks/bench_login_storm.py --email admin2@test.com --password admin123 --logins 40
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+import httpx
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', 'http://localhost:8001').rstrip('/')
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def afficher(titre, latences):
+    print(f"{titre}: n={len(latences)} "
+          f"p50={percentile(latences, 50):.1f}ms "
+          f"p95={percentile(latences, 95):.1f}ms "
+          f"p99={percentile(latences, 99):.1f}ms "
+          f"max={max(latences, default=0):.1f}ms "
+          f"moy={statistics.mean(latences) if latences else 0:.1f}ms")
+
+
+async def sonde(client, token, stop, latences, intervalle):
+    """Interroge /api/auth/me en boucle et mesure la latence"""
+    headers = {"Authorization": f"Bearer {token}"}
+    while not stop.is_set():
+        debut = time.perf_counter()
+        response = await client.get(f"{BASE_URL}/api/auth/me", headers=headers)
+        response.raise_for_status()
+        latences.append((time.perf_counter() - debut) * 1000)
+        await asyncio.sleep(intervalle)
+
+
+async def login(client, email, password):
+    debut = time.perf_counter()
+    response = await client.post(f"{BASE_URL}/api/auth/login", json={"email": email, "password": password})
+    response.raise_for_status()
+    return (time.perf_counter() - debut) * 1000, response.json()
+
+
+async def mesurer(client, token, duree, intervalle, rafale=None):
+    stop = asyncio.Event()
+    latences = []
+    tache = asyncio.create_task(sonde(client, token, stop, latences, intervalle))
+    resultat_rafale = None
+    if rafale:
+        resultat_rafale = await rafale()
+    else:
+        await asyncio.sleep(duree)
+    stop.set()
+    await tache
+    return latences, resultat_rafale
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--logins", type=int, default=40, help="Nombre de connexions simultanées")
+    parser.add_argument("--duree", type=float, default=3.0, help="Durée de la mesure de référence (s)")
+    parser.add_argument("--intervalle", type=float, default=0.02, help="Intervalle entre deux sondes (s)")
+    args = parser.parse_args()
+
+    limits = httpx.Limits(max_connections=args.logins + 10)
+    async with httpx.AsyncClient(timeout=60, limits=limits) as client:
+        response = await client.post(f"{BASE_URL}/api/auth/login", json={"email": args.email, "password": args.password})
+        response.raise_for_status()
+        token = response.cookies.get("session_token")
+
+        reference, _ = await mesurer(client, token, args.duree, args.intervalle)
+        afficher("Sans rafale  /api/auth/me", reference)
+
+        async def rafale():
+            return await asyncio.gather(*[login(client, args.email, args.password) for _ in range(args.logins)])
+
+        pendant, connexions = await mesurer(client, token, args.duree, args.intervalle, rafale)
+        afficher(f"Rafale de {args.logins} logins /api/auth/me", pendant)
+        afficher("Logins", [latence for latence, _ in connexions])
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark - qualité et temps de calcul de la répartition des combats sur les aires.
+
+Génère des compétitions fictives de 500 à 2000 combats (catégories de 2 à 32
+compétiteurs), puis compare l'ordonnancement par liste (ordonnancer_combats)
+à l'ancienne répartition round-robin par catégorie et par tour, évaluée avec
+les mêmes contraintes (enchaînement des tours, repos minimum, bloc des finales).
+
+Pour chaque configuration: durée totale (minutes), écart à la borne inférieure
+max(charge / nb aires, plus long chemin d'un arbre) et temps de calcul.
+Aucune base de données n'est nécessaire.
+
+Usage:
+    python backend/benchmarks/bench_ordonnancement.py --combats 500,1000,2000 --aires 4,8
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "bench_ordonnancement")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import server  # noqa: E402
+
+
+def generer_combats(nb_combats, rng):
+    """Arbres de catégories de tailles aléatoires jusqu'à atteindre nb_combats"""
+    combats = []
+    numero = 0
+    while len(combats) < nb_combats:
+        numero += 1
+        taille = rng.randint(2, 32)
+        arbre = server.construire_arbre(
+            [f"cptr_{numero}_{i}" for i in range(taille)], "comp_bench", f"cat_{numero:04d}"
+        )
+        combats.extend(server.combats_en_documents(arbre))
+    return combats
+
+
+def repartition_round_robin(combats, aire_ids):
+    """Ancienne répartition: tri par catégorie puis tour, distribution modulo le nombre d'aires"""
+    finales = [c for c in combats if c["tour"] in server.TOURS_FINALES]
+    autres = [c for c in combats if c["tour"] not in server.TOURS_FINALES]
+    autres.sort(key=lambda c: (c["categorie_id"], server.rang_tour(c["tour"]), c["position"]))
+    finales.sort(key=lambda c: (c["categorie_id"], server.rang_tour(c["tour"]), c["position"]))
+    return [(c, aire_ids[i % len(aire_ids)]) for i, c in enumerate(autres)], \
+        [(c, aire_ids[i % len(aire_ids)]) for i, c in enumerate(finales)]
+
+
+def evaluer_sequences(phases, combats, aire_ids, repos):
+    """Durée totale d'une répartition exécutée dans l'ordre, avec enchaînement et repos"""
+    successeurs = server.graphe_precedences(combats)
+    liberation = {c["combat_id"]: 0 for c in combats}
+    libre = dict.fromkeys(aire_ids, 0)
+    for numero, phase in enumerate(phases):
+        if numero > 0:
+            debut_bloc = max(libre.values())
+            libre = dict.fromkeys(aire_ids, debut_bloc)
+        for combat, aire_id in phase:
+            debut = max(libre[aire_id], liberation[combat["combat_id"]])
+            fin = debut + server.duree_combat(combat)
+            libre[aire_id] = fin
+            for cible in successeurs[combat["combat_id"]]:
+                liberation[cible] = max(liberation[cible], fin + repos)
+    return max(libre.values())
+
+
+def borne_inferieure(combats, nb_aires, repos):
+    charge = sum(server.duree_combat(c) for c in combats) / nb_aires
+    successeurs = server.graphe_precedences(combats)
+    par_id = {c["combat_id"]: c for c in combats}
+    memo = {}
+
+    def chemin(cid):
+        if cid not in memo:
+            suite = max((repos + chemin(s) for s in successeurs[cid]), default=0)
+            memo[cid] = server.duree_combat(par_id[cid]) + suite
+        return memo[cid]
+
+    return max(charge, max(chemin(cid) for cid in par_id))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--combats", default="500,1000,2000")
+    parser.add_argument("--aires", default="4,8")
+    parser.add_argument("--repos", type=int, default=server.REPOS_MINIMUM_MINUTES)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'combats':>8} {'aires':>6} {'borne':>7} {'liste':>7} {'écart':>7} "
+          f"{'round-robin':>12} {'écart':>7} {'calcul ms':>10}")
+    for nb_combats in [int(n) for n in args.combats.split(",")]:
+        combats = generer_combats(nb_combats, rng)
+        for nb_aires in [int(n) for n in args.aires.split(",")]:
+            aire_ids = [f"aire_{i + 1}" for i in range(nb_aires)]
+            borne = borne_inferieure(combats, nb_aires, args.repos)
+
+            debut = time.perf_counter()
+            _, fin_liste = server.ordonnancer_combats(combats, aire_ids, args.repos)
+            duree_calcul = (time.perf_counter() - debut) * 1000
+
+            fin_rr = evaluer_sequences(repartition_round_robin(combats, aire_ids), combats, aire_ids, args.repos)
+            print(f"{len(combats):>8} {nb_aires:>6} {borne:>7.0f} {fin_liste:>7} "
+                  f"{(fin_liste / borne - 1) * 100:>6.1f}% {fin_rr:>12} "
+                  f"{(fin_rr / borne - 1) * 100:>6.1f}% {duree_calcul:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
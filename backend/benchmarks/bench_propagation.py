@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark - coût de propager_vainqueur selon la taille de l'arbre.
+
+Génère des arbres de 8 à 256 compétiteurs dans une base MongoDB jetable,
+joue tous les combats dans l'ordre des tours et mesure, pour chaque résultat,
+le temps de propagation et le nombre de commandes MongoDB envoyées.
+Le coût doit rester constant quelle que soit la taille de l'arbre.
+
+Usage:
+    MONGO_URL=mongodb://localhost:27017 python backend/benchmarks/bench_propagation.py
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from pathlib import Path
+
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
+
+BENCH_DB = f"bench_propagation_{os.getpid()}"
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import server  # noqa: E402
+
+
+class CompteurCommandes(monitoring.CommandListener):
+    """Compte les commandes MongoDB envoyées par le client"""
+
+    def __init__(self):
+        self.total = 0
+
+    def started(self, event):
+        self.total += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+
+async def jouer_arbre(nb_competiteurs, compteur):
+    categorie_id = f"cat_bench_{nb_competiteurs}"
+    combats = server.construire_arbre(
+        [f"cptr_{i}" for i in range(nb_competiteurs)], "comp_bench", categorie_id
+    )
+    await server.db.combats.insert_many(server.combats_en_documents(combats))
+
+    ordre = sorted(combats, key=lambda c: (server.rang_tour(c.tour), c.position))
+    durees = []
+    commandes = []
+    for combat in ordre:
+        # Relire le combat pour connaître les compétiteurs qualifiés entre-temps
+        doc = await server.db.combats.find_one({"combat_id": combat.combat_id}, {"_id": 0})
+        vainqueur_id = doc["rouge_id"] or doc["bleu_id"]
+        avant = compteur.total
+        debut = time.perf_counter()
+        await server.propager_vainqueur(doc, vainqueur_id)
+        durees.append((time.perf_counter() - debut) * 1000)
+        commandes.append(compteur.total - avant)
+
+    await server.db.combats.delete_many({"categorie_id": categorie_id})
+    return durees, commandes
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tailles", default="8,16,32,64,128,256")
+    args = parser.parse_args()
+
+    compteur = CompteurCommandes()
+    client = AsyncIOMotorClient(os.environ["MONGO_URL"], event_listeners=[compteur])
+    server.db = client[BENCH_DB]
+
+    try:
+        print(f"{'compétiteurs':>12} {'combats':>8} {'ms/résultat':>12} {'max ms':>8} {'cmd/résultat':>13}")
+        for taille in [int(t) for t in args.tailles.split(",")]:
+            durees, commandes = await jouer_arbre(taille, compteur)
+            print(f"{taille:>12} {len(durees):>8} {sum(durees) / len(durees):>12.2f} "
+                  f"{max(durees):>8.2f} {sum(commandes) / len(commandes):>13.2f}")
+    finally:
+        await client.drop_database(BENCH_DB)
+        client.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Benchmark - sérialisation JSON et octets transférés pour les grosses réponses.
+
+Génère une compétition fictive de 1000 combats (catégories de 2 à 32
+compétiteurs) et construit les charges utiles des listes (combats enrichis
+comme dans list_combats, pesée) et des arbres de catégories. Pour chacune,
+compare le temps de sérialisation de l'ancien chemin (jsonable_encoder puis
+json stdlib, comme JSONResponse) à orjson (OrjsonResponse renvoyée
+directement), puis la taille sur le réseau brute, en gzip et en Brotli
+(si le module brotli est installé) avec les réglages du middleware.
+Aucune base de données n'est nécessaire.
+
+Usage:
+    python backend/benchmarks/bench_serialisation.py --combats 1000 --repetitions 20
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "bench_serialisation")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from fastapi.responses import JSONResponse  # noqa: E402
+
+import server  # noqa: E402
+
+CLUBS = ["Taekwondo Club Pointe-à-Pitre", "Dojang des Abymes", "ASC Baie-Mahault", "Étoile du Gosier",
+         "TKD Sainte-Anne", "Club Lamentin Arts Martiaux"]
+
+
+def generer_competition(nb_combats, rng):
+    """Compétiteurs, catégories et combats enrichis (noms, catégorie, tatami) jusqu'à nb_combats"""
+    competiteurs = {}
+    categories = {}
+    combats = []
+    numero = 0
+    while len(combats) < nb_combats:
+        numero += 1
+        categorie_id = f"cat_{numero:04d}"
+        categories[categorie_id] = {
+            "categorie_id": categorie_id, "competition_id": "comp_bench",
+            "nom": f"Seniors Masculin -{54 + numero % 30}kg", "age_min": 18, "age_max": 35,
+            "sexe": "M", "poids_min": 50.0, "poids_max": 54.0 + numero % 30
+        }
+        ids = [f"cptr_{numero}_{i}" for i in range(rng.randint(2, 32))]
+        for competiteur_id in ids:
+            competiteurs[competiteur_id] = {
+                "competiteur_id": competiteur_id, "competition_id": "comp_bench",
+                "nom": f"NOM{rng.randint(1, 9999)}", "prenom": f"Prénom{rng.randint(1, 999)}",
+                "date_naissance": "2000-01-01", "sexe": "M", "poids_declare": 70.0,
+                "club": rng.choice(CLUBS), "categorie_id": categorie_id, "pese": True,
+                "poids_pesee": 69.4, "created_at": datetime.now(timezone.utc)
+            }
+        for combat in server.combats_en_documents(server.construire_arbre(ids, "comp_bench", categorie_id)):
+            combat.pop("_id", None)
+            combat["ordre"] = len(combats) + 1
+            combat["created_at"] = datetime.now(timezone.utc)
+            combats.append(combat)
+
+    for combat in combats:
+        for couleur in ("rouge", "bleu"):
+            competiteur = competiteurs.get(combat.get(f"{couleur}_id"))
+            combat[couleur] = {k: competiteur[k] for k in ("nom", "prenom", "club")} if competiteur else None
+        combat["categorie_nom"] = categories[combat["categorie_id"]]["nom"]
+        combat["tatami_nom"] = "Non assigné"
+
+    pesee = [{**c, "categorie_nom": categories[c["categorie_id"]]["nom"]} for c in competiteurs.values()]
+    arbres = {}
+    for categorie_id, categorie in categories.items():
+        arbre = {"quart": [], "demi": [], "bronze": [], "finale": []}
+        for combat in combats:
+            if combat["categorie_id"] == categorie_id:
+                arbre.setdefault(combat["tour"], []).append(combat)
+        arbres[categorie_id] = {"categorie": categorie, "arbre": arbre, "tours": sorted(arbre, key=server.rang_tour)}
+    return {"list_combats": combats, "list_pesee": pesee, "arbres": arbres}
+
+
+def chronometrer(fonction, repetitions):
+    """Durée médiane d'un appel en millisecondes"""
+    durees = []
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction()
+        durees.append((time.perf_counter() - debut) * 1000)
+    return sorted(durees)[len(durees) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--combats", type=int, default=1000)
+    parser.add_argument("--repetitions", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    charges = generer_competition(args.combats, random.Random(args.seed))
+    print(f"{'réponse':>13} {'stdlib ms':>10} {'orjson ms':>10} {'gain':>6} "
+          f"{'brut Ko':>8} {'gzip Ko':>8} {'br Ko':>7} {'gzip ms':>8}")
+    for nom, contenu in charges.items():
+        ancien = chronometrer(lambda: JSONResponse(jsonable_encoder(contenu)).body, args.repetitions)
+        nouveau = chronometrer(lambda: server.OrjsonResponse(contenu).body, args.repetitions)
+
+        corps = server.dumps_json(contenu)
+        taille_gzip = len(server.Compresseur("gzip").terminer(corps))
+        duree_gzip = chronometrer(lambda: server.Compresseur("gzip").terminer(corps), args.repetitions)
+        taille_br = len(server.Compresseur("br").terminer(corps)) / 1024 if server.brotli else None
+
+        print(f"{nom:>13} {ancien:>10.1f} {nouveau:>10.1f} {ancien / nouveau:>5.1f}x "
+              f"{len(corps) / 1024:>8.0f} {taille_gzip / 1024:>8.0f} "
+              f"{f'{taille_br:.0f}' if taille_br is not None else '-':>7} {duree_gzip:>8.1f}")
+
+    # Contrôle: les deux chemins produisent le même document
+    for nom, contenu in charges.items():
+        assert json.loads(server.dumps_json(contenu)) == json.loads(JSONResponse(jsonable_encoder(contenu)).body), nom
+
+
+if __name__ == "__main__":
+    main()
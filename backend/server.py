@@ -1,19 +1,37 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response, UploadFile, File
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response, UploadFile, File, Query, Header
+from fastapi.responses import StreamingResponse, JSONResponse
 from fastapi.security import HTTPBearer
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
+from starlette.datastructures import Headers, MutableHeaders
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict
+from pydantic import BaseModel, Field, ConfigDict, field_validator
 from typing import List, Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import uuid
+import time
 from datetime import datetime, timezone, timedelta
 import httpx
 import random
+import asyncio
 import io
+import json
+import math
+import bisect
+import re
+import base64
+import heapq
+import zlib
+import orjson
+
+try:
+    import brotli  # facultatif: compression Brotli si le module est installé
+except ImportError:
+    brotli = None
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
@@ -23,7 +41,27 @@ mongo_url = os.environ['MONGO_URL']
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ['DB_NAME']]
 
-app = FastAPI()
+def serialiser_defaut(obj):
+    """Types qu'orjson ne connaît pas: modèles pydantic, ensembles, le reste en texte"""
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    return str(obj)
+
+def dumps_json(content) -> bytes:
+    return orjson.dumps(content, default=serialiser_defaut, option=orjson.OPT_NON_STR_KEYS)
+
+class OrjsonResponse(JSONResponse):
+    """
+    Réponse JSON par défaut, sérialisée par orjson. Un endpoint qui la renvoie
+    directement évite en plus le passage de FastAPI par jsonable_encoder.
+    """
+
+    def render(self, content) -> bytes:
+        return dumps_json(content)
+
+app = FastAPI(default_response_class=OrjsonResponse)
 api_router = APIRouter(prefix="/api")
 security = HTTPBearer(auto_error=False)
 
@@ -59,6 +97,10 @@ class Competition(BaseModel):
     duree_estimee_heures: int = 8
     statut: str = "active"  # active, terminee, annulee
     coaches_autorises: List[str] = []  # Liste des user_id des coachs autorisés
+    planification: Optional[dict] = None  # paramètres du dernier planning horaire (voir PlanificationCompetition)
+    durees_observees: Optional[dict] = None  # {"aires"|"groupes": {clé: {"moyenne": minutes, "n": nb}}}
+    compteurs: Optional[dict] = None  # voir COMPTEURS_COMPETITION
+    categorie_template: Optional[dict] = None  # {"template_id", "nom", "version"} du dernier modèle de catégories appliqué
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     created_by: str = ""
 
@@ -104,6 +146,14 @@ class CompetiteurCreate(BaseModel):
 class PeseeUpdate(BaseModel):
     poids_officiel: float
 
+class PeseeLotItem(BaseModel):
+    competiteur_id: str
+    poids_officiel: float
+
+class PeseeLot(BaseModel):
+    competition_id: str
+    pesees: List[PeseeLotItem]
+
 class Categorie(BaseModel):
     model_config = ConfigDict(extra="ignore")
     categorie_id: str = Field(default_factory=lambda: f"cat_{uuid.uuid4().hex[:12]}")
@@ -124,6 +174,30 @@ class CategorieCreate(BaseModel):
     poids_min: float
     poids_max: float
 
+class LigneCategorie(BaseModel):
+    """Catégorie d'un modèle, sans identifiant ni compétition"""
+    nom: str
+    age_min: int
+    age_max: int
+    sexe: str
+    poids_min: float
+    poids_max: float
+
+class CategorieTemplate(BaseModel):
+    """Modèle nommé et versionné de catégories; immuable une fois créé"""
+    model_config = ConfigDict(extra="ignore")
+    template_id: str = Field(default_factory=lambda: f"tpl_{uuid.uuid4().hex[:12]}")
+    nom: str
+    version: int = 1
+    categories: List[dict] = []  # lignes au format LigneCategorie
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_by: str = ""
+
+class CategorieTemplateCreate(BaseModel):
+    nom: str
+    categories: Optional[List[LigneCategorie]] = None
+    competition_id: Optional[str] = None  # à défaut de `categories`: copie des catégories de cette compétition
+
 class AireCombat(BaseModel):
     model_config = ConfigDict(extra="ignore")
     aire_id: str = Field(default_factory=lambda: f"aire_{uuid.uuid4().hex[:12]}")
@@ -161,7 +235,7 @@ class Combat(BaseModel):
     categorie_id: str
     aire_id: Optional[str] = None  # Aire de combat assignée
     tatami_id: Optional[str] = None  # Alias rétrocompatibilité
-    tour: str  # quart, demi, finale, bronze
+    tour: str  # tour_N, huitieme, quart, demi, finale, bronze
     position: int  # position in bracket
     ordre: int = 0  # ordre d'exécution global
     rouge_id: Optional[str] = None
@@ -173,9 +247,17 @@ class Combat(BaseModel):
     statut: str = "a_venir"  # a_venir, en_cours, termine, non_dispute
     termine: bool = False
     est_finale: bool = False  # Si c'est un combat de finale (à faire en dernier)
-    heure_debut: Optional[str] = None  # ISO format
+    heure_debut: Optional[str] = None  # HH:MM, heure planifiée
+    heure_estimee: Optional[str] = None  # HH:MM, recalculée d'après l'avancement réel de l'aire
+    heure_debut_reelle: Optional[str] = None  # ISO format, au lancement du combat
+    heure_fin_reelle: Optional[str] = None  # ISO format, à la saisie du résultat
     duree_minutes: int = 6  # durée estimée en minutes
     est_pause: bool = False  # si c'est un créneau de pause
+    next_combat_id: Optional[str] = None  # combat où le vainqueur est qualifié
+    next_slot: Optional[str] = None  # rouge ou bleu
+    loser_next_combat_id: Optional[str] = None  # combat où le perdant est qualifié (bronze)
+    loser_slot: Optional[str] = None  # rouge ou bleu
+    version: int = 0  # incrémentée à chaque saisie de résultat ou qualification
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 class CombatResultat(BaseModel):
@@ -183,16 +265,43 @@ class CombatResultat(BaseModel):
     score_rouge: int = 0
     score_bleu: int = 0
     type_victoire: str = "normal"
+    version: Optional[int] = None  # version du combat affichée lors de la saisie
 
 class PlanificationCreate(BaseModel):
     heure_debut_competition: str  # ISO format ex: "09:00"
     duree_combat_minutes: int = 6
     pauses: List[dict] = []  # [{"apres_combat": 10, "duree_minutes": 15}]
 
+class PauseAire(BaseModel):
+    debut: str  # HH:MM
+    duree_minutes: int
+    aire_id: Optional[str] = None  # None = pause commune à toutes les aires
+
+class PlanificationCompetition(BaseModel):
+    heure_debut: Optional[str] = None  # HH:MM, par défaut l'heure de début de la compétition
+    duree_combat_minutes: Optional[int] = None  # si défini, remplace la durée de chaque combat
+    repos_minutes: Optional[int] = None  # repos minimum entre deux combats d'un compétiteur
+    pauses: List[PauseAire] = []
+    heure_finales: Optional[str] = None  # le bloc des finales ne commence pas avant cette heure
+    pause_avant_finales_minutes: int = 0
+
 class ModifierOrdreCombat(BaseModel):
     combat_id: str
     nouvel_ordre: int
-    nouvelle_heure: Optional[str] = None
+    nouvelle_heure: Optional[str] = None  # HH:MM
+
+    @field_validator("nouvelle_heure")
+    @classmethod
+    def valider_heure(cls, heure: Optional[str]) -> Optional[str]:
+        """Heure normalisée en HH:MM: le planning relit toutes les heures enregistrées"""
+        if not heure:
+            return None
+        try:
+            return minutes_en_heure(heure_en_minutes(heure))
+        except ValueError:
+            raise ValueError("Format d'heure invalide (HH:MM)")
+
+RANGS_MEDAILLES = {"or": 1, "argent": 2, "bronze": 3}
 
 class Medaille(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -200,6 +309,7 @@ class Medaille(BaseModel):
     categorie_id: str
     competiteur_id: str
     type: str  # or, argent, bronze
+    rang: int = Field(default_factory=lambda data: RANGS_MEDAILLES.get(data["type"], len(RANGS_MEDAILLES) + 1))
 
 class HistoriqueResultat(BaseModel):
     model_config = ConfigDict(extra="ignore")
@@ -216,16 +326,102 @@ class HistoriqueResultat(BaseModel):
 
 # ============ AUTH HELPERS ============
 
-async def get_current_user(request: Request) -> User:
+class SessionCache:
+    """Cache LRU avec TTL des sessions résolues (session_token -> User)"""
+
+    def __init__(self, max_size: int, ttl_seconds: float):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.entries = OrderedDict()  # session_token -> (expire_at_monotonic, User)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, session_token: str) -> Optional[User]:
+        entry = self.entries.get(session_token)
+        if entry is None:
+            self.misses += 1
+            return None
+        expire_at, user = entry
+        if expire_at <= time.monotonic():
+            del self.entries[session_token]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(session_token)
+        self.hits += 1
+        return user
+
+    def set(self, session_token: str, user: User, session_expires_at: datetime):
+        if self.max_size <= 0:
+            return
+        # Ne jamais garder une session au-delà de sa propre expiration
+        restant = (session_expires_at - datetime.now(timezone.utc)).total_seconds()
+        ttl = min(self.ttl_seconds, restant)
+        if ttl <= 0:
+            return
+        self.entries[session_token] = (time.monotonic() + ttl, user)
+        self.entries.move_to_end(session_token)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, session_token: str):
+        self.entries.pop(session_token, None)
+
+    def invalidate_user(self, user_id: str):
+        for token in [t for t, (_, u) in self.entries.items() if u.user_id == user_id]:
+            del self.entries[token]
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0
+        }
+
+session_cache = SessionCache(
+    max_size=int(os.environ.get("SESSION_CACHE_MAX_SIZE", "1000")),
+    ttl_seconds=float(os.environ.get("SESSION_CACHE_TTL_SECONDS", "60"))
+)
+
+def get_session_token(request: Request) -> Optional[str]:
     session_token = request.cookies.get("session_token")
     auth_header = request.headers.get("Authorization")
     
     if auth_header and auth_header.startswith("Bearer "):
         session_token = auth_header.split(" ")[1]
     
+    return session_token
+
+# bcrypt libère le GIL: un pool de threads borné suffit à sortir le hachage
+# de la boucle d'événements sans bloquer les autres requêtes.
+PASSWORD_HASH_CONCURRENCY = int(os.environ.get("PASSWORD_HASH_CONCURRENCY", "2"))
+password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_CONCURRENCY, thread_name_prefix="bcrypt")
+
+async def hash_password(password: str) -> str:
+    """Hache un mot de passe dans le pool dédié"""
+    from passlib.hash import bcrypt
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, bcrypt.hash, password)
+
+async def verify_password(password: str, hashed: str) -> bool:
+    """Vérifie un mot de passe dans le pool dédié"""
+    from passlib.hash import bcrypt
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(password_executor, bcrypt.verify, password, hashed)
+
+async def get_current_user(request: Request) -> User:
+    session_token = get_session_token(request)
+    
     if not session_token:
         raise HTTPException(status_code=401, detail="Non authentifié")
     
+    cached = session_cache.get(session_token)
+    if cached is not None:
+        return cached
+    
     session = await db.user_sessions.find_one({"session_token": session_token}, {"_id": 0})
     if not session:
         raise HTTPException(status_code=401, detail="Session invalide")
@@ -242,7 +438,9 @@ async def get_current_user(request: Request) -> User:
     if not user:
         raise HTTPException(status_code=401, detail="Utilisateur non trouvé")
     
-    return User(**user)
+    current_user = User(**user)
+    session_cache.set(session_token, current_user, expires_at)
+    return current_user
 
 async def require_admin(user: User = Depends(get_current_user)) -> User:
     if user.role not in ["admin", "master"]:
@@ -262,12 +460,11 @@ async def register(data: UserCreate, response: Response):
     if existing:
         raise HTTPException(status_code=400, detail="Email déjà utilisé")
     
-    from passlib.hash import bcrypt
     user_id = f"user_{uuid.uuid4().hex[:12]}"
     user_doc = {
         "user_id": user_id,
         "email": data.email,
-        "password": bcrypt.hash(data.password),
+        "password": await hash_password(data.password),
         "name": data.name,
         "role": data.role,
         "picture": None,
@@ -303,8 +500,7 @@ async def login(data: UserLogin, response: Response):
     if not user:
         raise HTTPException(status_code=401, detail="Email ou mot de passe incorrect")
     
-    from passlib.hash import bcrypt
-    if not bcrypt.verify(data.password, user["password"]):
+    if not await verify_password(data.password, user["password"]):
         raise HTTPException(status_code=401, detail="Email ou mot de passe incorrect")
     
     session_token = f"sess_{uuid.uuid4().hex}"
@@ -361,6 +557,7 @@ async def exchange_session(request: Request, response: Response):
             {"user_id": user_id},
             {"$set": {"name": oauth_data["name"], "picture": oauth_data.get("picture")}}
         )
+        session_cache.invalidate_user(user_id)
         role = existing["role"]
     else:
         user_id = f"user_{uuid.uuid4().hex[:12]}"
@@ -409,12 +606,133 @@ async def get_me(user: User = Depends(get_current_user)):
 
 @api_router.post("/auth/logout")
 async def logout(request: Request, response: Response):
-    session_token = request.cookies.get("session_token")
+    session_token = get_session_token(request)
     if session_token:
+        session_cache.invalidate(session_token)
         await db.user_sessions.delete_one({"session_token": session_token})
     response.delete_cookie("session_token", path="/", samesite="none", secure=True)
     return {"message": "Déconnecté"}
 
+# ============ COMPTEURS DE COMPÉTITION ============
+
+# Sous-document `compteurs` de chaque compétition, tenu à jour par $inc dans les
+# endpoints qui modifient les données et recalculé périodiquement
+COMPTEURS_COMPETITION = (
+    "competiteurs", "competiteurs_peses", "categories", "tatamis",
+    "combats", "combats_termines", "finales", "finales_terminees", "medailles"
+)
+COMPTEURS_RECONCILIATION_SECONDS = float(os.environ.get("COMPTEURS_RECONCILIATION_SECONDS", "600"))
+
+def compteurs_vides() -> dict:
+    return dict.fromkeys(COMPTEURS_COMPETITION, 0)
+
+def contribution_combats(combats: list) -> dict:
+    """Part de ces combats dans les compteurs (combats, terminés, finales)"""
+    totaux = {"combats": 0, "combats_termines": 0, "finales": 0, "finales_terminees": 0}
+    for combat in combats:
+        totaux["combats"] += 1
+        totaux["combats_termines"] += bool(combat.get("termine"))
+        totaux["finales"] += bool(combat.get("est_finale"))
+        totaux["finales_terminees"] += bool(combat.get("est_finale") and combat.get("termine"))
+    return totaux
+
+def ecart_combats(avant: list, apres: list) -> dict:
+    """Variation des compteurs de combats entre deux états"""
+    ancien = contribution_combats(avant)
+    return {cle: valeur - ancien[cle] for cle, valeur in contribution_combats(apres).items()}
+
+async def incrementer_compteurs(competition_id: Optional[str], **deltas):
+    """
+    Applique des variations aux compteurs d'une compétition en une écriture.
+    Sans sous-document `compteurs` (compétition antérieure), rien n'est écrit:
+    le prochain recalcul les initialise.
+    """
+    inc = {f"compteurs.{cle}": valeur for cle, valeur in deltas.items() if valeur}
+    if not competition_id or not inc:
+        return
+    await db.competitions.update_one(
+        {"competition_id": competition_id, "compteurs": {"$exists": True}},
+        {"$inc": inc}
+    )
+
+async def recalculer_compteurs(competition_id: str) -> dict:
+    """Recompte tout depuis les collections et remplace les compteurs stockés"""
+    competiteurs, combats, categorie_ids, tatamis = await asyncio.gather(
+        db.competiteurs.aggregate([
+            {"$match": {"competition_id": competition_id}},
+            {"$group": {
+                "_id": None,
+                "competiteurs": {"$sum": 1},
+                "competiteurs_peses": {"$sum": {"$cond": [{"$eq": ["$pese", True]}, 1, 0]}}
+            }}
+        ]).to_list(None),
+        db.combats.find(
+            {"competition_id": competition_id},
+            {"_id": 0, "termine": 1, "est_finale": 1}
+        ).to_list(None),
+        db.categories.distinct("categorie_id", {"competition_id": competition_id}),
+        db.tatamis.count_documents({"competition_id": competition_id})
+    )
+    medailles = await db.medailles.count_documents({"categorie_id": {"$in": categorie_ids}}) if categorie_ids else 0
+
+    compteurs = compteurs_vides()
+    if competiteurs:
+        compteurs["competiteurs"] = competiteurs[0]["competiteurs"]
+        compteurs["competiteurs_peses"] = competiteurs[0]["competiteurs_peses"]
+    compteurs.update(contribution_combats(combats))
+    compteurs.update(categories=len(categorie_ids), tatamis=tatamis, medailles=medailles)
+
+    await db.competitions.update_one({"competition_id": competition_id}, {"$set": {"compteurs": compteurs}})
+    return compteurs
+
+async def lire_compteurs(competition: dict) -> dict:
+    """Compteurs stockés, initialisés au premier accès pour les compétitions antérieures"""
+    compteurs = competition.get("compteurs")
+    if compteurs is None:
+        compteurs = await recalculer_compteurs(competition["competition_id"])
+    return {**compteurs_vides(), **compteurs}
+
+def etat_finales(compteurs: dict) -> dict:
+    """Avancement des combats réguliers et des finales, déduit des compteurs"""
+    finales_total = compteurs["finales"]
+    finales_terminees = compteurs["finales_terminees"]
+    return {
+        "combats_reguliers_restants": max(
+            0, (compteurs["combats"] - finales_total) - (compteurs["combats_termines"] - finales_terminees)
+        ),
+        "finales_total": finales_total,
+        "finales_terminees": finales_terminees,
+        "finales_restantes": max(0, finales_total - finales_terminees)
+    }
+
+def exposer_compteurs(competition: dict):
+    """Champs nb_* attendus par le frontend, lus depuis les compteurs"""
+    compteurs = {**compteurs_vides(), **(competition.get("compteurs") or {})}
+    competition["nb_competiteurs"] = compteurs["competiteurs"]
+    competition["nb_combats"] = compteurs["combats"]
+    competition["nb_combats_termines"] = compteurs["combats_termines"]
+
+async def reconcilier_compteurs() -> int:
+    """Recalcule les compteurs des compétitions actives (ou non initialisées)"""
+    competition_ids = await db.competitions.distinct(
+        "competition_id",
+        {"$or": [{"statut": "active"}, {"compteurs": {"$exists": False}}]}
+    )
+    for competition_id in competition_ids:
+        await recalculer_compteurs(competition_id)
+    return len(competition_ids)
+
+async def boucle_reconciliation_compteurs():
+    """Tâche de fond: corrige périodiquement une éventuelle dérive des compteurs"""
+    while True:
+        try:
+            await reconcilier_compteurs()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Réconciliation des compteurs échouée: {e}")
+        await asyncio.sleep(COMPTEURS_RECONCILIATION_SECONDS)
+
 # ============ COMPETITIONS ENDPOINTS ============
 
 async def user_can_access_competition(user: User, competition_id: str) -> bool:
@@ -447,6 +765,8 @@ async def list_competitions(statut: Optional[str] = None, user: User = Depends(g
         query["coaches_autorises"] = user.user_id
         competitions = await db.competitions.find(query, {"_id": 0}).sort("date", -1).to_list(100)
     
+    for competition in competitions:
+        exposer_compteurs(competition)
     return competitions
 
 @api_router.get("/competitions/{competition_id}")
@@ -459,22 +779,44 @@ async def get_competition(competition_id: str, user: User = Depends(get_current_
     if not competition:
         raise HTTPException(status_code=404, detail="Compétition non trouvée")
     
-    # Ajouter les stats
-    competition["nb_competiteurs"] = await db.competiteurs.count_documents({"competition_id": competition_id})
-    competition["nb_combats"] = await db.combats.count_documents({"competition_id": competition_id})
-    competition["nb_combats_termines"] = await db.combats.count_documents({"competition_id": competition_id, "termine": True})
+    # Ajouter les stats (compteurs matérialisés)
+    competition["compteurs"] = await lire_compteurs(competition)
+    exposer_compteurs(competition)
     
     return competition
 
+@api_router.post("/competitions/{competition_id}/compteurs/recalculer")
+async def recalculer_compteurs_competition(competition_id: str, user: User = Depends(require_admin)):
+    """Recompte immédiatement les compteurs d'une compétition (sans attendre la réconciliation)"""
+    if not await db.competitions.find_one({"competition_id": competition_id}, {"_id": 0, "competition_id": 1}):
+        raise HTTPException(status_code=404, detail="Compétition non trouvée")
+    return await recalculer_compteurs(competition_id)
+
 @api_router.post("/competitions")
-async def create_competition(data: CompetitionCreate, user: User = Depends(require_admin)):
-    """Crée une nouvelle compétition (admin uniquement)"""
+async def create_competition(
+    data: CompetitionCreate,
+    template_id: Optional[str] = None,
+    user: User = Depends(require_admin)
+):
+    """
+    Crée une nouvelle compétition (admin uniquement). Avec `template_id`, ses
+    catégories sont créées dans la foulée depuis ce modèle (voir seed_categories).
+    """
+    template = await charger_template(template_id) if template_id else None
     competition = Competition(**data.model_dump(), created_by=user.user_id)
     comp_dict = competition.model_dump()
     comp_dict["created_at"] = comp_dict["created_at"].isoformat()
+    comp_dict["compteurs"] = compteurs_vides()
+    
+    categories = instancier_template(template, competition.competition_id) if template else []
+    if template:
+        comp_dict["categorie_template"] = reference_template(template)
+        comp_dict["compteurs"]["categories"] = len(categories)
     
     await db.competitions.insert_one(comp_dict)
     comp_dict.pop("_id", None)
+    if categories:
+        await db.categories.insert_many(categories)
     
     return comp_dict
 
@@ -516,11 +858,13 @@ async def delete_competition(competition_id: str, user: User = Depends(require_a
     await db.combats.delete_many({"competition_id": competition_id})
     await db.competiteurs.delete_many({"competition_id": competition_id})
     await db.categories.delete_many({"competition_id": competition_id})
+    invalidate_category_index(competition_id)
     await db.tatamis.delete_many({"competition_id": competition_id})
     await db.aires_combat.delete_many({"competition_id": competition_id})
     await db.medailles.delete_many({"competition_id": competition_id})
     
     result = await db.competitions.delete_one({"competition_id": competition_id})
+    invalider_vues_competition(competition_id)
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Compétition non trouvée")
     
@@ -532,6 +876,266 @@ async def list_coaches(user: User = Depends(require_admin)):
     coaches = await db.users.find({"role": "coach"}, {"_id": 0, "password": 0}).to_list(100)
     return coaches
 
+# ============ CHARGEMENT GROUPÉ DES RÉFÉRENCES ============
+
+async def charger_par_ids(collection, id_field: str, ids, projection: Optional[dict] = None) -> dict:
+    """Charge en une seule requête ($in) les documents référencés, indexés par identifiant"""
+    ids = list({i for i in ids if i})
+    if not ids:
+        return {}
+    proj = {"_id": 0}
+    if projection:
+        proj.update(projection)
+        proj[id_field] = 1
+    docs = await collection.find({id_field: {"$in": ids}}, proj).to_list(None)
+    return {doc[id_field]: doc for doc in docs}
+
+async def charger_references_combats(
+    combats: list,
+    competiteur_projection: Optional[dict] = None,
+    categorie_projection: Optional[dict] = None,
+    avec_tatamis: bool = False
+):
+    """
+    Résout toutes les références d'une liste de combats (rouge, bleu, vainqueur,
+    catégorie, tatami) avec une requête $in par collection.
+    Retourne (competiteurs, categories, tatamis) sous forme de dictionnaires par identifiant.
+    """
+    competiteur_ids = set()
+    for combat in combats:
+        competiteur_ids.update([combat.get("rouge_id"), combat.get("bleu_id"), combat.get("vainqueur_id")])
+    
+    requetes = [
+        charger_par_ids(db.competiteurs, "competiteur_id", competiteur_ids, competiteur_projection),
+        charger_par_ids(db.categories, "categorie_id", (c.get("categorie_id") for c in combats), categorie_projection)
+    ]
+    if avec_tatamis:
+        requetes.append(charger_par_ids(
+            db.tatamis, "tatami_id", (c.get("tatami_id") for c in combats), {"nom": 1, "numero": 1}
+        ))
+    
+    resultats = await asyncio.gather(*requetes)
+    tatamis = resultats[2] if avec_tatamis else {}
+    return resultats[0], resultats[1], tatamis
+
+# ============ PAGINATION PAR CURSEUR ============
+
+def encoder_curseur(valeurs: list) -> str:
+    """Curseur opaque contenant les valeurs de tri du dernier élément renvoyé"""
+    return base64.urlsafe_b64encode(json.dumps(valeurs, default=str).encode("utf-8")).decode("ascii")
+
+def decoder_curseur(curseur: str, nb_champs: int) -> list:
+    try:
+        valeurs = json.loads(base64.urlsafe_b64decode(curseur.encode("ascii")))
+    except (ValueError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Curseur invalide")
+    if not isinstance(valeurs, list) or len(valeurs) != nb_champs:
+        raise HTTPException(status_code=400, detail="Curseur invalide")
+    return valeurs
+
+def filtre_apres_curseur(tri: list, valeurs: list) -> dict:
+    """
+    Filtre keyset sélectionnant les documents situés après `valeurs` dans l'ordre `tri`
+    (liste de (champ, 1|-1), le dernier champ devant être un identifiant unique).
+    """
+    conditions = []
+    for i, (champ, sens) in enumerate(tri):
+        condition = {tri[j][0]: valeurs[j] for j in range(i)}
+        condition[champ] = {"$gt" if sens == 1 else "$lt": valeurs[i]}
+        conditions.append(condition)
+    return {"$or": conditions}
+
+def requete_apres_curseur(query: dict, tri: list, curseur: Optional[str]) -> dict:
+    if not curseur:
+        return query
+    return {"$and": [query, filtre_apres_curseur(tri, decoder_curseur(curseur, len(tri)))]}
+
+async def lire_page(collection, query: dict, projection: dict, tri: list,
+                    curseur: Optional[str], limit: Optional[int], response: Response) -> list:
+    """
+    Lit une page triée selon `tri` à partir du curseur. Sans limite, tout est renvoyé.
+    Le curseur de la page suivante est placé dans l'en-tête X-Next-Cursor.
+    """
+    cursor = collection.find(requete_apres_curseur(query, tri, curseur), projection).sort(tri)
+    if limit is None:
+        return await cursor.to_list(None)
+    
+    docs = await cursor.limit(limit + 1).to_list(None)
+    if len(docs) > limit:
+        docs = docs[:limit]
+        response.headers["X-Next-Cursor"] = encoder_curseur([docs[-1].get(champ) for champ, _ in tri])
+    return docs
+
+NDJSON_LOT = 500  # documents lus et enrichis ensemble en mode flux
+
+def reponses_liste(modele=None) -> dict:
+    """
+    Documentation OpenAPI des endpoints servis par repondre_liste: ils renvoient
+    directement leur réponse, FastAPI ne peut donc pas la déduire d'un response_model.
+    """
+    return {200: {
+        "description": "Liste triée, en JSON ou en NDJSON (Accept: application/x-ndjson)",
+        **({"model": List[modele]} if modele else {}),
+        "headers": {"X-Next-Cursor": {
+            "description": "Curseur de la page suivante (avec `limit`), à renvoyer dans `cursor`",
+            "schema": {"type": "string"}
+        }},
+        "content": {"application/x-ndjson": {"schema": {"type": "string"}}}
+    }}
+
+def veut_ndjson(request: Request) -> bool:
+    return "application/x-ndjson" in request.headers.get("accept", "")
+
+async def repondre_liste(request: Request, response: Response, collection, query: dict, projection: dict,
+                         tri: list, curseur: Optional[str], limit: Optional[int], enrichir=None):
+    """
+    Réponse d'un endpoint de liste, triée selon `tri` et paginée par curseur (voir lire_page).
+    Si le client accepte application/x-ndjson, les documents sont envoyés un par ligne au fil
+    de la lecture du curseur MongoDB, par lots de NDJSON_LOT: la mémoire reste bornée et les
+    premières lignes partent tout de suite. `enrichir(docs)` complète chaque lot en place.
+    """
+    if not veut_ndjson(request):
+        docs = await lire_page(collection, query, projection, tri, curseur, limit, response)
+        if enrichir:
+            await enrichir(docs)
+        # Renvoyée directement: pas de second passage par jsonable_encoder
+        return OrjsonResponse(docs, headers=dict(response.headers))
+    
+    if limit is not None:
+        # Page bornée: lue d'abord pour connaître le curseur suivant avant d'envoyer les en-têtes
+        page = await lire_page(collection, query, projection, tri, curseur, limit, response)
+        
+        async def lots():
+            for i in range(0, len(page), NDJSON_LOT):
+                yield page[i:i + NDJSON_LOT]
+    else:
+        cursor = collection.find(requete_apres_curseur(query, tri, curseur), projection).sort(tri).batch_size(NDJSON_LOT)
+        
+        async def lots():
+            lot = []
+            async for doc in cursor:
+                lot.append(doc)
+                if len(lot) >= NDJSON_LOT:
+                    yield lot
+                    lot = []
+            if lot:
+                yield lot
+    
+    async def lignes():
+        async for lot in lots():
+            if enrichir:
+                await enrichir(lot)
+            yield b"".join(dumps_json(doc) + b"\n" for doc in lot)
+    
+    return StreamingResponse(lignes(), media_type="application/x-ndjson", headers=dict(response.headers))
+
+# ============ FLUX TEMPS RÉEL (SSE) ============
+
+class LiveFeedHub:
+    """
+    Diffuse aux écrans abonnés (arbitres, suivi des combats) les modifications
+    de combats d'une compétition, éventuellement filtrées par aire.
+    """
+
+    def __init__(self, taille_file: int = 100):
+        self.taille_file = taille_file
+        self.abonnes = {}  # competition_id -> {queue: aire_id ou None}
+        self.sequence = 0
+
+    def subscribe(self, competition_id: str, aire_id: Optional[str] = None) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.taille_file)
+        self.abonnes.setdefault(competition_id, {})[queue] = aire_id
+        return queue
+
+    def unsubscribe(self, competition_id: str, queue: asyncio.Queue):
+        abonnes = self.abonnes.get(competition_id, {})
+        abonnes.pop(queue, None)
+        if not abonnes:
+            self.abonnes.pop(competition_id, None)
+
+    def publish(self, competition_id: Optional[str], aire_id: Optional[str], evenement: dict):
+        # Toute modification publiée périme la vue arbitre de l'aire; un combat qui se
+        # termine change aussi le nombre de finales restantes affiché sur toutes les aires
+        if "termine" in evenement.get("changements", {}):
+            arbitre_snapshots.invalider(competition_id)
+        else:
+            arbitre_snapshots.invalider(competition_id, aire_id)
+        # Idem pour l'arbre de la catégorie (toute la compétition pour un événement global)
+        if evenement.get("categorie_id"):
+            bracket_cache.invalider_categorie(evenement["categorie_id"])
+        else:
+            bracket_cache.invalider_competition(competition_id)
+        if not competition_id or competition_id not in self.abonnes:
+            return
+        self.sequence += 1
+        evenement = {**evenement, "id": self.sequence, "competition_id": competition_id, "aire_id": aire_id}
+        for queue, filtre_aire in list(self.abonnes[competition_id].items()):
+            # Un événement sans aire concerne tous les écrans de la compétition
+            if filtre_aire and aire_id and filtre_aire != aire_id:
+                continue
+            if queue.full():
+                # Écran trop lent: on vide sa file et on lui demande de se resynchroniser
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "resync", "id": self.sequence})
+                continue
+            queue.put_nowait(evenement)
+
+live_feed = LiveFeedHub()
+LIVE_FEED_HEARTBEAT_SECONDS = float(os.environ.get("LIVE_FEED_HEARTBEAT_SECONDS", "15"))
+
+def invalider_vues_competition(competition_id: Optional[str]):
+    """Périme les vues en cache d'une compétition (arbitre, arbres) après une écriture non publiée"""
+    arbitre_snapshots.invalider(competition_id)
+    bracket_cache.invalider_competition(competition_id)
+
+def publier_combat(type_evenement: str, combat: dict, **changements):
+    """Publie un delta sur un combat (seuls les champs modifiés sont envoyés)"""
+    live_feed.publish(combat.get("competition_id"), combat.get("aire_id"), {
+        "type": type_evenement,
+        "combat_id": combat["combat_id"],
+        "categorie_id": combat.get("categorie_id"),
+        "changements": changements
+    })
+
+@api_router.get("/live/competition/{competition_id}")
+async def live_competition(
+    competition_id: str,
+    request: Request,
+    aire_id: Optional[str] = None,
+    user: User = Depends(get_current_user)
+):
+    """
+    Flux Server-Sent Events des modifications de combats d'une compétition.
+    Avec aire_id, seuls les événements de cette aire (et ceux sans aire) sont envoyés.
+    """
+    if not await user_can_access_competition(user, competition_id):
+        raise HTTPException(status_code=403, detail="Accès non autorisé")
+    
+    queue = live_feed.subscribe(competition_id, aire_id)
+    
+    async def evenements():
+        try:
+            yield f"event: connecte\ndata: {json.dumps({'competition_id': competition_id, 'aire_id': aire_id})}\n\n"
+            while True:
+                try:
+                    evenement = await asyncio.wait_for(queue.get(), timeout=LIVE_FEED_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    # Commentaire SSE pour garder la connexion ouverte derrière les proxys
+                    yield ": ping\n\n"
+                    continue
+                yield f"id: {evenement['id']}\nevent: {evenement['type']}\ndata: {json.dumps(evenement, default=str)}\n\n"
+        finally:
+            live_feed.unsubscribe(competition_id, queue)
+    
+    return StreamingResponse(
+        evenements(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 # ============ COMPETITEURS ENDPOINTS ============
 
 def calculate_age(date_naissance: str) -> int:
@@ -568,32 +1172,113 @@ def date_fr_to_iso(date_fr: str) -> str:
         pass
     return str(date_fr)
 
-async def assign_categorie(competiteur: dict, competition_id: str) -> Optional[str]:
-    """Assigne une catégorie basée sur le poids officiel (si pesé) ou déclaré"""
+# ============ INDEX DES CATÉGORIES (ATTRIBUTION AUTOMATIQUE) ============
+
+class CategoryIndex:
+    """
+    Index en mémoire des catégories d'une compétition.
+    
+    Pour chaque (sexe, âge), les bornes de poids des catégories couvrant cet âge
+    sont triées; chaque borne et chaque intervalle entre deux bornes est associé
+    à la catégorie retenue, retrouvée par bisection. En cas de chevauchement
+    (ex: 21kg est à la fois le max de -21kg et le min de -24kg), la catégorie
+    créée en premier l'emporte, comme avec find_one sur la collection.
+    """
+
+    def __init__(self, categories: list):
+        # categories: dans l'ordre naturel de la collection
+        self.categories = {c["categorie_id"]: c for c in categories}
+        self.tables = {}  # (sexe, age) -> (bornes, categorie_au_point, categorie_entre)
+        tables_partagees = {}
+        
+        par_sexe = {}
+        for rang, cat in enumerate(categories):
+            par_sexe.setdefault(cat["sexe"], []).append((rang, cat))
+        
+        for sexe, cats in par_sexe.items():
+            age_min = math.floor(min(cat["age_min"] for _, cat in cats))
+            age_max = math.ceil(max(cat["age_max"] for _, cat in cats))
+            for age in range(age_min, age_max + 1):
+                couvrantes = [(rang, cat) for rang, cat in cats if cat["age_min"] <= age <= cat["age_max"]]
+                if not couvrantes:
+                    continue
+                cle = tuple(rang for rang, _ in couvrantes)
+                if cle not in tables_partagees:
+                    tables_partagees[cle] = self._construire_table(couvrantes)
+                self.tables[(sexe, age)] = tables_partagees[cle]
+
+    @staticmethod
+    def _construire_table(couvrantes: list) -> tuple:
+        def gagnante(poids):
+            candidates = [(rang, cat) for rang, cat in couvrantes if cat["poids_min"] <= poids <= cat["poids_max"]]
+            return min(candidates, key=lambda rc: rc[0])[1]["categorie_id"] if candidates else None
+        
+        bornes = sorted({cat["poids_min"] for _, cat in couvrantes} | {cat["poids_max"] for _, cat in couvrantes})
+        au_point = [gagnante(b) for b in bornes]
+        entre = [gagnante((bornes[i] + bornes[i + 1]) / 2) for i in range(len(bornes) - 1)]
+        return bornes, au_point, entre
+
+    def resoudre(self, sexe: str, age: int, poids) -> Optional[str]:
+        """Catégorie correspondant au sexe, à l'âge et au poids, ou None"""
+        if poids is None:
+            return None
+        table = self.tables.get((sexe, age))
+        if table is None:
+            return None
+        bornes, au_point, entre = table
+        i = bisect.bisect_left(bornes, poids)
+        if i < len(bornes) and bornes[i] == poids:
+            return au_point[i]
+        if 0 < i < len(bornes):
+            return entre[i - 1]
+        return None
+
+CATEGORY_INDEX_TTL_SECONDS = float(os.environ.get("CATEGORY_INDEX_TTL_SECONDS", "300"))
+category_indexes = {}  # competition_id -> (expire_at_monotonic, CategoryIndex)
+
+async def get_category_index(competition_id: str) -> CategoryIndex:
+    """Index des catégories d'une compétition (chargé une fois puis gardé en mémoire)"""
+    entry = category_indexes.get(competition_id)
+    if entry and entry[0] > time.monotonic():
+        return entry[1]
+    categories = await db.categories.find(
+        {"competition_id": competition_id}, {"_id": 0}
+    ).sort("$natural", 1).to_list(None)
+    index = CategoryIndex(categories)
+    category_indexes[competition_id] = (time.monotonic() + CATEGORY_INDEX_TTL_SECONDS, index)
+    return index
+
+def invalidate_category_index(competition_id: Optional[str]):
+    """À appeler après toute création, suppression ou re-génération de catégories"""
+    category_indexes.pop(competition_id, None)
+
+def resoudre_categorie(index: CategoryIndex, competiteur: dict) -> Optional[str]:
+    """Attribution pure (sans accès base) basée sur le poids officiel (si pesé) ou déclaré"""
     age = calculate_age(competiteur["date_naissance"])
     poids = competiteur.get("poids_officiel") or competiteur.get("poids_declare")
-    sexe = competiteur["sexe"]
-    
-    categorie = await db.categories.find_one({
-        "competition_id": competition_id,
-        "sexe": sexe,
-        "age_min": {"$lte": age},
-        "age_max": {"$gte": age},
-        "poids_min": {"$lte": poids},
-        "poids_max": {"$gte": poids}
-    }, {"_id": 0})
-    
-    return categorie["categorie_id"] if categorie else None
+    return index.resoudre(competiteur["sexe"], age, poids)
+
+async def assign_categorie(competiteur: dict, competition_id: str) -> Optional[str]:
+    """Assigne une catégorie basée sur le poids officiel (si pesé) ou déclaré"""
+    index = await get_category_index(competition_id)
+    return resoudre_categorie(index, competiteur)
 
-@api_router.get("/competiteurs")
+@api_router.get("/competiteurs", responses=reponses_liste(Competiteur))
 async def list_competiteurs(
+    request: Request,
+    response: Response,
     competition_id: Optional[str] = None,
     categorie_id: Optional[str] = None, 
     club: Optional[str] = None,
     pese: Optional[bool] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=5000),
     user: User = Depends(get_current_user)
 ):
-    """Liste les compétiteurs avec filtres"""
+    """
+    Liste les compétiteurs avec filtres, triés par club et nom.
+    Pagination par curseur (limit / X-Next-Cursor) et flux NDJSON: voir repondre_liste.
+    """
     query = {}
     if competition_id:
         if not await user_can_access_competition(user, competition_id):
@@ -606,8 +1291,8 @@ async def list_competiteurs(
     if pese is not None:
         query["pese"] = pese
     
-    competiteurs = await db.competiteurs.find(query, {"_id": 0}).to_list(1000)
-    return competiteurs
+    tri = [("club", 1), ("nom", 1), ("competiteur_id", 1)]
+    return await repondre_liste(request, response, db.competiteurs, query, {"_id": 0}, tri, cursor, limit)
 
 @api_router.get("/competiteurs/{competiteur_id}")
 async def get_competiteur(competiteur_id: str, user: User = Depends(get_current_user)):
@@ -668,6 +1353,7 @@ async def create_competiteur(data: CompetiteurCreate, user: User = Depends(get_c
     
     await db.competiteurs.insert_one(comp_dict)
     comp_dict.pop("_id", None)
+    await incrementer_compteurs(data.competition_id, competiteurs=1)
     return comp_dict
 
 @api_router.put("/competiteurs/{competiteur_id}")
@@ -685,38 +1371,70 @@ async def update_competiteur(competiteur_id: str, data: CompetiteurCreate, user:
         {"$set": update_data}
     )
     
+    # Changement de compétition: le compétiteur passe d'un compteur à l'autre
+    if existing["competition_id"] != data.competition_id:
+        pese = int(bool(existing.get("pese")))
+        await incrementer_compteurs(existing["competition_id"], competiteurs=-1, competiteurs_peses=-pese)
+        await incrementer_compteurs(data.competition_id, competiteurs=1, competiteurs_peses=pese)
+    
+    invalider_vues_competition(existing["competition_id"])
+    
     updated = await db.competiteurs.find_one({"competiteur_id": competiteur_id}, {"_id": 0})
     return updated
 
 @api_router.delete("/competiteurs/{competiteur_id}")
 async def delete_competiteur(competiteur_id: str, user: User = Depends(require_admin)):
-    result = await db.competiteurs.delete_one({"competiteur_id": competiteur_id})
-    if result.deleted_count == 0:
+    supprime = await db.competiteurs.find_one_and_delete(
+        {"competiteur_id": competiteur_id},
+        {"_id": 0, "competition_id": 1, "pese": 1}
+    )
+    if not supprime:
         raise HTTPException(status_code=404, detail="Compétiteur non trouvé")
+    await incrementer_compteurs(
+        supprime.get("competition_id"), competiteurs=-1, competiteurs_peses=-int(bool(supprime.get("pese")))
+    )
+    invalider_vues_competition(supprime.get("competition_id"))
     return {"message": "Compétiteur supprimé"}
 
 # ============ PESEE ENDPOINTS ============
 
-@api_router.get("/pesee/{competition_id}")
-async def list_pesee(competition_id: str, user: User = Depends(get_current_user)):
-    """Liste tous les compétiteurs pour la pesée d'une compétition"""
+@api_router.get("/pesee/{competition_id}", responses=reponses_liste(Competiteur))
+async def list_pesee(
+    competition_id: str,
+    request: Request,
+    response: Response,
+    club: Optional[str] = None,
+    pese: Optional[bool] = None,
+    categorie_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=5000),
+    user: User = Depends(get_current_user)
+):
+    """
+    Liste les compétiteurs pour la pesée d'une compétition, triés par club et nom.
+    Filtres optionnels: club, pesé/non pesé, catégorie.
+    Pagination par curseur (limit / X-Next-Cursor) et flux NDJSON: voir repondre_liste.
+    """
     if not await user_can_access_competition(user, competition_id):
         raise HTTPException(status_code=403, detail="Accès non autorisé")
     
-    competiteurs = await db.competiteurs.find(
-        {"competition_id": competition_id},
-        {"_id": 0}
-    ).sort([("club", 1), ("nom", 1)]).to_list(1000)
+    query = {"competition_id": competition_id}
+    if club:
+        query["club"] = club
+    if pese is not None:
+        query["pese"] = pese
+    if categorie_id:
+        query["categorie_id"] = categorie_id
     
-    # Enrichir avec les noms des catégories
-    for comp in competiteurs:
-        if comp.get("categorie_id"):
-            cat = await db.categories.find_one({"categorie_id": comp["categorie_id"]}, {"_id": 0, "nom": 1})
+    async def enrichir(competiteurs):
+        # Enrichir avec les noms des catégories (table en mémoire)
+        index = await get_category_index(competition_id)
+        for comp in competiteurs:
+            cat = index.categories.get(comp.get("categorie_id"))
             comp["categorie_nom"] = cat["nom"] if cat else "Non assignée"
-        else:
-            comp["categorie_nom"] = "Non assignée"
     
-    return competiteurs
+    tri = [("club", 1), ("nom", 1), ("competiteur_id", 1)]
+    return await repondre_liste(request, response, db.competiteurs, query, {"_id": 0}, tri, cursor, limit, enrichir)
 
 @api_router.put("/pesee/{competiteur_id}")
 async def enregistrer_pesee(competiteur_id: str, data: PeseeUpdate, user: User = Depends(require_admin)):
@@ -742,6 +1460,9 @@ async def enregistrer_pesee(competiteur_id: str, data: PeseeUpdate, user: User =
         {"competiteur_id": competiteur_id},
         {"$set": update_data}
     )
+    if not comp.get("pese"):
+        await incrementer_compteurs(comp["competition_id"], competiteurs_peses=1)
+    invalider_vues_competition(comp["competition_id"])
     
     # Si la catégorie a changé, notifier
     categorie_changee = ancienne_categorie != nouvelle_categorie
@@ -753,6 +1474,67 @@ async def enregistrer_pesee(competiteur_id: str, data: PeseeUpdate, user: User =
         "categorie_changee": categorie_changee
     }
 
+@api_router.post("/pesee/lot")
+async def enregistrer_pesees_lot(data: PeseeLot, user: User = Depends(require_admin)):
+    """
+    Enregistre les poids officiels de plusieurs compétiteurs en une seule requête.
+    Les catégories sont recalculées depuis l'index en mémoire et toutes les
+    mises à jour sont envoyées en un seul bulk_write.
+    """
+    from pymongo import UpdateOne
+    
+    # Une seule pesée par compétiteur: la dernière saisie l'emporte
+    poids_par_id = {p.competiteur_id: p.poids_officiel for p in data.pesees}
+    if not poids_par_id:
+        raise HTTPException(status_code=400, detail="Aucune pesée à enregistrer")
+    
+    competiteurs, index = await asyncio.gather(
+        db.competiteurs.find(
+            {"competition_id": data.competition_id, "competiteur_id": {"$in": list(poids_par_id)}},
+            {"_id": 0, "competiteur_id": 1, "nom": 1, "prenom": 1, "date_naissance": 1,
+             "sexe": 1, "poids_declare": 1, "categorie_id": 1, "pese": 1}
+        ).to_list(None),
+        get_category_index(data.competition_id)
+    )
+    
+    operations = []
+    resultats = []
+    for comp in competiteurs:
+        poids = poids_par_id[comp["competiteur_id"]]
+        ancienne_categorie = comp.get("categorie_id")
+        nouvelle_categorie = resoudre_categorie(index, {**comp, "poids_officiel": poids})
+        operations.append(UpdateOne(
+            {"competiteur_id": comp["competiteur_id"]},
+            {"$set": {"poids_officiel": poids, "pese": True, "categorie_id": nouvelle_categorie}}
+        ))
+        cat = index.categories.get(nouvelle_categorie)
+        resultats.append({
+            "competiteur_id": comp["competiteur_id"],
+            "nom": comp.get("nom"),
+            "prenom": comp.get("prenom"),
+            "poids_officiel": poids,
+            "ancienne_categorie_id": ancienne_categorie,
+            "categorie_id": nouvelle_categorie,
+            "categorie_nom": cat["nom"] if cat else "Non assignée",
+            "categorie_changee": ancienne_categorie != nouvelle_categorie
+        })
+    
+    if operations:
+        await db.competiteurs.bulk_write(operations, ordered=False)
+        await incrementer_compteurs(
+            data.competition_id, competiteurs_peses=sum(1 for comp in competiteurs if not comp.get("pese"))
+        )
+        invalider_vues_competition(data.competition_id)
+    
+    trouves = {comp["competiteur_id"] for comp in competiteurs}
+    return {
+        "message": f"{len(resultats)} pesée(s) enregistrée(s)",
+        "enregistres": len(resultats),
+        "categories_changees": sum(1 for r in resultats if r["categorie_changee"]),
+        "introuvables": [cid for cid in poids_par_id if cid not in trouves],
+        "resultats": resultats
+    }
+
 @api_router.put("/pesee/{competiteur_id}/poids-declare")
 async def enregistrer_poids_declare(competiteur_id: str, poids: float, user: User = Depends(get_current_user)):
     """Enregistre/modifie le poids déclaré (coach peut modifier)"""
@@ -767,6 +1549,7 @@ async def enregistrer_poids_declare(competiteur_id: str, poids: float, user: Use
         {"competiteur_id": competiteur_id},
         {"$set": {"poids_declare": poids}}
     )
+    invalider_vues_competition(comp["competition_id"])
     
     return {"message": "Poids déclaré mis à jour", "poids_declare": poids}
 
@@ -785,19 +1568,33 @@ async def annuler_pesee(competiteur_id: str, user: User = Depends(require_admin)
         {"competiteur_id": competiteur_id},
         {"$set": {"poids_officiel": None, "pese": False, "categorie_id": nouvelle_categorie}}
     )
+    if comp.get("pese"):
+        await incrementer_compteurs(comp["competition_id"], competiteurs_peses=-1)
+    invalider_vues_competition(comp["competition_id"])
     
     return {"message": "Pesée annulée"}
 
 # ============ CATEGORIES ENDPOINTS ============
 
-@api_router.get("/categories")
-async def list_categories(competition_id: Optional[str] = None, user: User = Depends(get_current_user)):
+@api_router.get("/categories", responses=reponses_liste(Categorie))
+async def list_categories(
+    request: Request,
+    response: Response,
+    competition_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=5000),
+    user: User = Depends(get_current_user)
+):
+    """
+    Liste les catégories, par sexe, âge et poids.
+    Pagination par curseur (limit / X-Next-Cursor) et flux NDJSON: voir repondre_liste.
+    """
     query = {}
     if competition_id:
         query["competition_id"] = competition_id
     
-    categories = await db.categories.find(query, {"_id": 0}).to_list(500)
-    return categories
+    tri = [("sexe", 1), ("age_min", 1), ("poids_min", 1), ("categorie_id", 1)]
+    return await repondre_liste(request, response, db.categories, query, {"_id": 0}, tri, cursor, limit)
 
 @api_router.post("/categories")
 async def create_categorie(data: CategorieCreate, user: User = Depends(require_admin)):
@@ -805,13 +1602,21 @@ async def create_categorie(data: CategorieCreate, user: User = Depends(require_a
     cat_dict = cat.model_dump()
     await db.categories.insert_one(cat_dict)
     cat_dict.pop("_id", None)
+    invalidate_category_index(cat.competition_id)
+    await incrementer_compteurs(cat.competition_id, categories=1)
     return cat_dict
 
 @api_router.delete("/categories/{categorie_id}")
 async def delete_categorie(categorie_id: str, user: User = Depends(require_admin)):
-    result = await db.categories.delete_one({"categorie_id": categorie_id})
-    if result.deleted_count == 0:
+    categorie = await db.categories.find_one_and_delete(
+        {"categorie_id": categorie_id},
+        {"_id": 0, "competition_id": 1}
+    )
+    if not categorie:
         raise HTTPException(status_code=404, detail="Catégorie non trouvée")
+    invalidate_category_index(categorie.get("competition_id"))
+    bracket_cache.invalider_categorie(categorie_id)
+    await incrementer_compteurs(categorie.get("competition_id"), categories=-1)
     return {"message": "Catégorie supprimée"}
 
 # ============ SEED CATEGORIES OFFICIELLES ============
@@ -870,58 +1675,95 @@ CATEGORIES_OFFICIELLES = {
     }
 }
 
+def compiler_template(definitions: dict) -> list:
+    """Lignes de catégories (format LigneCategorie) d'une définition par groupe d'âge et par sexe"""
+    lignes = []
+    for categorie_age, config in definitions.items():
+        for sexe, libelle in (("M", "Masculin"), ("F", "Féminin")):
+            for poids_nom, poids_min, poids_max in config[sexe]:
+                lignes.append({
+                    "nom": f"{categorie_age} {libelle} {poids_nom}",
+                    "age_min": config["age_min"],
+                    "age_max": config["age_max"],
+                    "sexe": sexe,
+                    "poids_min": float(poids_min),
+                    "poids_max": float(poids_max)
+                })
+    return lignes
+
+# Modèle officiel, compilé une fois au chargement et enregistré au démarrage
+TEMPLATE_OFFICIEL_ID = "tpl_ffta_2025_2026"
+TEMPLATE_OFFICIEL = CategorieTemplate(
+    template_id=TEMPLATE_OFFICIEL_ID,
+    nom="FFTA/FFDA 2025/2026",
+    categories=compiler_template(CATEGORIES_OFFICIELLES),
+    created_by="system"
+).model_dump()
+
+# Les modèles ne changent jamais: gardés en mémoire dès la première lecture
+templates_categories = {TEMPLATE_OFFICIEL_ID: TEMPLATE_OFFICIEL}
+
+async def charger_template(template_id: str) -> dict:
+    template = templates_categories.get(template_id)
+    if template is None:
+        template = await db.categorie_templates.find_one({"template_id": template_id}, {"_id": 0})
+        if not template:
+            raise HTTPException(status_code=404, detail="Modèle de catégories non trouvé")
+        templates_categories[template_id] = template
+    return template
+
+def reference_template(template: dict) -> dict:
+    return {k: template[k] for k in ("template_id", "nom", "version")}
+
+def instancier_template(template: dict, competition_id: str) -> list:
+    """Documents de catégories prêts pour un insert_many"""
+    return [
+        {"categorie_id": f"cat_{uuid.uuid4().hex[:12]}", "competition_id": competition_id, **ligne}
+        for ligne in template["categories"]
+    ]
+
+async def enregistrer_template_officiel():
+    await db.categorie_templates.update_one(
+        {"template_id": TEMPLATE_OFFICIEL_ID},
+        {"$setOnInsert": TEMPLATE_OFFICIEL},
+        upsert=True
+    )
+
 @api_router.post("/categories/seed/{competition_id}")
-async def seed_categories(competition_id: str, user: User = Depends(require_admin)):
-    """Peuple une compétition avec toutes les catégories officielles FFTA/FFDA"""
+async def seed_categories(
+    competition_id: str,
+    template_id: str = TEMPLATE_OFFICIEL_ID,
+    user: User = Depends(require_admin)
+):
+    """
+    Remplace les catégories d'une compétition par celles d'un modèle
+    (par défaut les catégories officielles FFTA/FFDA), en une seule insertion.
+    """
     # Vérifier que la compétition existe
-    competition = await db.competitions.find_one({"competition_id": competition_id}, {"_id": 0})
+    competition = await db.competitions.find_one({"competition_id": competition_id}, {"_id": 0, "competition_id": 1})
     if not competition:
         raise HTTPException(status_code=404, detail="Compétition non trouvée")
+    template = await charger_template(template_id)
     
     # Supprimer les catégories existantes de cette compétition
-    await db.categories.delete_many({"competition_id": competition_id})
+    supprimees = await db.categories.delete_many({"competition_id": competition_id})
     
-    categories_created = []
+    categories = instancier_template(template, competition_id)
+    if categories:
+        await db.categories.insert_many(categories)
+    await db.competitions.update_one(
+        {"competition_id": competition_id},
+        {"$set": {"categorie_template": reference_template(template)}}
+    )
     
-    for categorie_age, config in CATEGORIES_OFFICIELLES.items():
-        age_min = config["age_min"]
-        age_max = config["age_max"]
-        
-        # Catégories masculines
-        for poids_nom, poids_min, poids_max in config["M"]:
-            cat = Categorie(
-                competition_id=competition_id,
-                nom=f"{categorie_age} Masculin {poids_nom}",
-                age_min=age_min,
-                age_max=age_max,
-                sexe="M",
-                poids_min=poids_min,
-                poids_max=poids_max
-            )
-            cat_dict = cat.model_dump()
-            await db.categories.insert_one(cat_dict)
-            cat_dict.pop("_id", None)
-            categories_created.append(cat_dict)
-        
-        # Catégories féminines
-        for poids_nom, poids_min, poids_max in config["F"]:
-            cat = Categorie(
-                competition_id=competition_id,
-                nom=f"{categorie_age} Féminin {poids_nom}",
-                age_min=age_min,
-                age_max=age_max,
-                sexe="F",
-                poids_min=poids_min,
-                poids_max=poids_max
-            )
-            cat_dict = cat.model_dump()
-            await db.categories.insert_one(cat_dict)
-            cat_dict.pop("_id", None)
-            categories_created.append(cat_dict)
+    invalidate_category_index(competition_id)
+    invalider_vues_competition(competition_id)
+    await incrementer_compteurs(competition_id, categories=len(categories) - supprimees.deleted_count)
     
     return {
-        "message": f"{len(categories_created)} catégories créées pour la compétition",
-        "total": len(categories_created)
+        "message": f"{len(categories)} catégories créées pour la compétition",
+        "total": len(categories),
+        "template": reference_template(template)
     }
 
 @api_router.get("/categories/age-groups")
@@ -956,6 +1798,69 @@ async def get_categories_for_surclassement(
     
     return categories
 
+# ============ MODÈLES DE CATÉGORIES ============
+
+@api_router.get("/categorie-templates")
+async def list_categorie_templates(user: User = Depends(get_current_user)):
+    """Liste les modèles de catégories (sans leurs lignes), par nom puis version décroissante"""
+    templates = await db.categorie_templates.find({}, {"_id": 0}).sort([("nom", 1), ("version", -1)]).to_list(None)
+    for template in templates:
+        template["nb_categories"] = len(template.pop("categories", []))
+    return templates
+
+@api_router.get("/categorie-templates/{template_id}")
+async def get_categorie_template(template_id: str, user: User = Depends(get_current_user)):
+    return await charger_template(template_id)
+
+@api_router.post("/categorie-templates")
+async def create_categorie_template(data: CategorieTemplateCreate, user: User = Depends(require_admin)):
+    """
+    Crée un modèle de catégories, à partir de lignes explicites ou des catégories
+    d'une compétition. Un nom déjà utilisé donne une nouvelle version du modèle.
+    """
+    from pymongo.errors import DuplicateKeyError
+
+    if data.categories is not None:
+        lignes = [ligne.model_dump() for ligne in data.categories]
+    elif data.competition_id:
+        lignes = await db.categories.find(
+            {"competition_id": data.competition_id},
+            {"_id": 0, "categorie_id": 0, "competition_id": 0}
+        ).sort([("sexe", 1), ("age_min", 1), ("poids_min", 1)]).to_list(None)
+        lignes = [LigneCategorie(**ligne).model_dump() for ligne in lignes]
+    else:
+        raise HTTPException(status_code=400, detail="Indiquez les catégories ou une compétition à copier")
+    if not lignes:
+        raise HTTPException(status_code=400, detail="Le modèle doit contenir au moins une catégorie")
+    
+    derniere = await db.categorie_templates.find_one(
+        {"nom": data.nom}, {"_id": 0, "version": 1}, sort=[("version", -1)]
+    )
+    template = CategorieTemplate(
+        nom=data.nom,
+        version=derniere["version"] + 1 if derniere else 1,
+        categories=lignes,
+        created_by=user.user_id
+    ).model_dump()
+    try:
+        await db.categorie_templates.insert_one(template)
+    except DuplicateKeyError:
+        raise HTTPException(status_code=409, detail="Cette version du modèle vient d'être créée, réessayez")
+    template.pop("_id", None)
+    templates_categories[template["template_id"]] = template
+    return template
+
+@api_router.delete("/categorie-templates/{template_id}")
+async def delete_categorie_template(template_id: str, user: User = Depends(require_admin)):
+    """Supprime un modèle; les compétitions qui l'ont appliqué gardent leurs catégories"""
+    if template_id == TEMPLATE_OFFICIEL_ID:
+        raise HTTPException(status_code=400, detail="Le modèle officiel ne peut pas être supprimé")
+    result = await db.categorie_templates.delete_one({"template_id": template_id})
+    if result.deleted_count == 0:
+        raise HTTPException(status_code=404, detail="Modèle de catégories non trouvé")
+    templates_categories.pop(template_id, None)
+    return {"message": "Modèle supprimé"}
+
 # ============ AIRES DE COMBAT ENDPOINTS ============
 
 @api_router.get("/aires-combat")
@@ -1012,74 +1917,75 @@ async def create_aire_combat(data: AireCombatCreate, user: User = Depends(requir
 @api_router.delete("/aires-combat/{aire_id}")
 async def delete_aire_combat(aire_id: str, user: User = Depends(require_admin)):
     """Supprime une aire de combat"""
-    result = await db.aires_combat.delete_one({"aire_id": aire_id})
-    if result.deleted_count == 0:
+    aire = await db.aires_combat.find_one_and_delete({"aire_id": aire_id}, {"_id": 0, "competition_id": 1})
+    if not aire:
         raise HTTPException(status_code=404, detail="Aire de combat non trouvée")
+    arbitre_snapshots.invalider(aire.get("competition_id"), aire_id)
     return {"message": "Aire de combat supprimée"}
 
 @api_router.post("/aires-combat/repartir/{competition_id}")
-async def repartir_combats_sur_aires(competition_id: str, user: User = Depends(require_admin)):
+async def repartir_combats_sur_aires(
+    competition_id: str,
+    repos_minutes: Optional[int] = Query(None, ge=0),
+    user: User = Depends(require_admin)
+):
     """
-    Répartit automatiquement les combats sur les aires de combat disponibles.
+    Répartit automatiquement les combats non terminés sur les aires actives
+    en minimisant la durée totale (voir ordonnancer_combats).
     Les finales sont mises à la fin de la compétition.
+    repos_minutes: repos minimum entre deux combats d'un compétiteur (REPOS_MINIMUM_MINUTES par défaut)
     """
-    # Récupérer les aires de combat
-    aires = await db.aires_combat.find(
-        {"competition_id": competition_id},
-        {"_id": 0}
-    ).sort("numero", 1).to_list(10)
+    if repos_minutes is None:
+        repos_minutes = REPOS_MINIMUM_MINUTES
+    from pymongo import UpdateOne
+    
+    aires, combats = await asyncio.gather(
+        db.aires_combat.find({"competition_id": competition_id}, {"_id": 0}).sort("numero", 1).to_list(None),
+        db.combats.find({"competition_id": competition_id, "termine": False}, {"_id": 0}).to_list(None)
+    )
     
     if not aires:
         raise HTTPException(status_code=400, detail="Aucune aire de combat configurée")
     
-    # Récupérer tous les combats non terminés
-    combats = await db.combats.find(
-        {"competition_id": competition_id, "termine": False},
-        {"_id": 0}
-    ).to_list(1000)
+    # Les aires en pause ou hors service ne reçoivent pas de combats
+    aires_actives = [a for a in aires if a.get("statut", "active") == "active"]
+    if not aires_actives:
+        raise HTTPException(status_code=400, detail="Aucune aire de combat active")
     
     if not combats:
         return {"message": "Aucun combat à répartir", "total": 0}
     
-    # Séparer finales et autres combats
-    finales = [c for c in combats if c["tour"] in ["finale", "bronze"]]
-    autres = [c for c in combats if c["tour"] not in ["finale", "bronze"]]
-    
-    # Trier par catégorie puis par tour
-    tour_ordre = {"quart": 1, "demi": 2}
-    autres.sort(key=lambda x: (x["categorie_id"], tour_ordre.get(x["tour"], 0), x["position"]))
-    finales.sort(key=lambda x: (x["categorie_id"], 1 if x["tour"] == "bronze" else 2, x["position"]))
+    plan, fin = ordonnancer_combats(combats, [a["aire_id"] for a in aires_actives], repos_minutes)
+    ordres = ordres_par_aire(plan)
     
-    # Répartir les combats (sauf finales) sur les aires
-    nb_aires = len(aires)
-    for i, combat in enumerate(autres):
-        aire = aires[i % nb_aires]
-        await db.combats.update_one(
-            {"combat_id": combat["combat_id"]},
+    await db.combats.bulk_write([
+        UpdateOne(
+            {"combat_id": combat_id},
             {"$set": {
-                "aire_id": aire["aire_id"],
-                "ordre": i + 1,
-                "est_finale": False
+                "aire_id": p["aire_id"],
+                "ordre": ordres[combat_id],
+                "est_finale": p["est_finale"]
             }}
         )
+        for combat_id, p in plan.items()
+    ], ordered=False)
+    await incrementer_compteurs(competition_id, **ecart_combats(
+        [c for c in combats if c["combat_id"] in plan],
+        [{**c, "est_finale": plan[c["combat_id"]]["est_finale"]} for c in combats if c["combat_id"] in plan]
+    ))
     
-    # Les finales seront sur toutes les aires (rotation) à la fin
-    base_ordre = len(autres)
-    for i, combat in enumerate(finales):
-        aire = aires[i % nb_aires]
-        await db.combats.update_one(
-            {"combat_id": combat["combat_id"]},
-            {"$set": {
-                "aire_id": aire["aire_id"],
-                "ordre": base_ordre + i + 1,
-                "est_finale": True
-            }}
-        )
+    live_feed.publish(competition_id, None, {"type": "resync"})
     
+    nb_finales = sum(1 for p in plan.values() if p["est_finale"])
     return {
-        "message": f"{len(combats)} combats répartis sur {nb_aires} aire(s)",
-        "combats_reguliers": len(autres),
-        "finales": len(finales)
+        "message": f"{len(plan)} combats répartis sur {len(aires_actives)} aire(s)",
+        "combats_reguliers": len(plan) - nb_finales,
+        "finales": nb_finales,
+        "duree_totale_minutes": fin,
+        "combats_par_aire": {
+            a["aire_id"]: sum(1 for p in plan.values() if p["aire_id"] == a["aire_id"])
+            for a in aires_actives
+        }
     }
 
 @api_router.put("/aires-combat/{aire_id}")
@@ -1098,61 +2004,113 @@ async def update_aire_combat(aire_id: str, data: AireCombatUpdate, user: User =
         raise HTTPException(status_code=404, detail="Aire de combat non trouvée")
     
     aire = await db.aires_combat.find_one({"aire_id": aire_id}, {"_id": 0})
+    arbitre_snapshots.invalider(aire["competition_id"], aire_id)
     return aire
 
 # ============ GESTION ORDRE DES COMBATS (DRAG & DROP) ============
 
 class ReorderCombatsRequest(BaseModel):
-    combat_ids: list[str]  # Liste des combat_ids dans le nouvel ordre
+    combat_ids: Optional[list[str]] = None  # Liste des combat_ids dans le nouvel ordre
+    # Ou déplacement d'un seul combat
+    combat_id: Optional[str] = None
+    nouvel_ordre: Optional[int] = None
 
 @api_router.put("/combats/reorder/{aire_id}")
 async def reorder_combats(aire_id: str, data: ReorderCombatsRequest, user: User = Depends(require_admin)):
     """
     Réordonne les combats d'une aire de combat.
-    Reçoit la liste des combat_ids dans le nouvel ordre.
+    Reçoit soit la liste des combat_ids dans le nouvel ordre, soit un seul
+    combat à déplacer (combat_id + nouvel_ordre): seuls les combats situés
+    entre l'ancienne et la nouvelle position sont alors renumérotés.
     """
+    from pymongo import UpdateOne, UpdateMany
+    
     # Vérifier que l'aire existe
-    aire = await db.aires_combat.find_one({"aire_id": aire_id}, {"_id": 0})
+    aire = await db.aires_combat.find_one({"aire_id": aire_id}, {"_id": 0, "competition_id": 1})
     if not aire:
         raise HTTPException(status_code=404, detail="Aire de combat non trouvée")
     
-    # Mettre à jour l'ordre de chaque combat
-    for index, combat_id in enumerate(data.combat_ids):
-        await db.combats.update_one(
-            {"combat_id": combat_id, "aire_id": aire_id},
-            {"$set": {"ordre": index + 1}}
-        )
+    if data.combat_ids is not None:
+        # Mettre à jour l'ordre de tous les combats en une seule requête
+        if data.combat_ids:
+            await db.combats.bulk_write([
+                UpdateOne({"combat_id": combat_id, "aire_id": aire_id}, {"$set": {"ordre": index + 1}})
+                for index, combat_id in enumerate(data.combat_ids)
+            ], ordered=False)
+        
+        live_feed.publish(aire["competition_id"], aire_id, {
+            "type": "combats_reordonnes",
+            "combat_ids": data.combat_ids
+        })
+        await replanifier_aire(aire_id)
+        return {"message": f"{len(data.combat_ids)} combat(s) réordonnés"}
     
-    return {"message": f"{len(data.combat_ids)} combat(s) réordonnés"}
-
-@api_router.get("/combats/ordre/{aire_id}")
-async def get_combats_ordre(aire_id: str, user: User = Depends(get_current_user)):
-    """Récupère les combats d'une aire dans l'ordre"""
-    combats = await db.combats.find(
+    if not data.combat_id or data.nouvel_ordre is None:
+        raise HTTPException(status_code=400, detail="Indiquez combat_ids, ou combat_id et nouvel_ordre")
+    if data.nouvel_ordre < 1:
+        raise HTTPException(status_code=400, detail="L'ordre doit être supérieur ou égal à 1")
+    
+    combat = await db.combats.find_one(
+        {"combat_id": data.combat_id, "aire_id": aire_id},
+        {"_id": 0, "ordre": 1}
+    )
+    if not combat:
+        raise HTTPException(status_code=404, detail="Combat non trouvé sur cette aire")
+    
+    # Ne pas dépasser le dernier combat de l'aire
+    dernier = await db.combats.find_one(
+        {"aire_id": aire_id}, {"_id": 0, "ordre": 1}, sort=[("ordre", -1)]
+    )
+    ancien_ordre = combat.get("ordre", 0)
+    nouvel_ordre = min(data.nouvel_ordre, (dernier or {}).get("ordre") or 1)
+    if ancien_ordre == nouvel_ordre:
+        return {"message": "Ordre inchangé", "combats_decales": 0}
+    
+    # Décaler d'un rang tous les combats situés entre les deux positions,
+    # terminés compris, pour qu'aucun rang ne soit partagé
+    if nouvel_ordre < ancien_ordre:
+        intervalle, decalage = {"$gte": nouvel_ordre, "$lt": ancien_ordre}, 1
+    else:
+        intervalle, decalage = {"$gt": ancien_ordre, "$lte": nouvel_ordre}, -1
+    result = await db.combats.bulk_write([
+        UpdateMany(
+            {"aire_id": aire_id, "ordre": intervalle, "combat_id": {"$ne": data.combat_id}},
+            {"$inc": {"ordre": decalage}}
+        ),
+        UpdateOne({"combat_id": data.combat_id}, {"$set": {"ordre": nouvel_ordre}})
+    ])
+    combats_decales = result.modified_count - 1
+    
+    live_feed.publish(aire["competition_id"], aire_id, {
+        "type": "combats_reordonnes",
+        "combat_id": data.combat_id,
+        "ancien_ordre": ancien_ordre,
+        "nouvel_ordre": nouvel_ordre
+    })
+    await replanifier_aire(aire_id)
+    
+    return {"message": "Combat déplacé", "combats_decales": combats_decales}
+
+@api_router.get("/combats/ordre/{aire_id}")
+async def get_combats_ordre(aire_id: str, user: User = Depends(get_current_user)):
+    """Récupère les combats d'une aire dans l'ordre"""
+    combats = await db.combats.find(
         {"aire_id": aire_id, "termine": False},
         {"_id": 0}
     ).sort([("est_finale", 1), ("ordre", 1)]).to_list(200)
     
     # Enrichir avec les infos des compétiteurs
+    competiteurs, categories, _ = await charger_references_combats(
+        combats,
+        competiteur_projection={"nom": 1, "prenom": 1, "club": 1},
+        categorie_projection={"nom": 1}
+    )
     for combat in combats:
         if combat.get("rouge_id"):
-            rouge = await db.competiteurs.find_one(
-                {"competiteur_id": combat["rouge_id"]},
-                {"_id": 0, "nom": 1, "prenom": 1, "club": 1}
-            )
-            combat["rouge"] = rouge
+            combat["rouge"] = competiteurs.get(combat["rouge_id"])
         if combat.get("bleu_id"):
-            bleu = await db.competiteurs.find_one(
-                {"competiteur_id": combat["bleu_id"]},
-                {"_id": 0, "nom": 1, "prenom": 1, "club": 1}
-            )
-            combat["bleu"] = bleu
-        # Catégorie
-        categorie = await db.categories.find_one(
-            {"categorie_id": combat["categorie_id"]},
-            {"_id": 0, "nom": 1}
-        )
-        combat["categorie"] = categorie
+            combat["bleu"] = competiteurs.get(combat["bleu_id"])
+        combat["categorie"] = categories.get(combat["categorie_id"])
     
     return combats
 
@@ -1163,7 +2121,12 @@ class ForfaitRequest(BaseModel):
     raison: str = "forfait"  # forfait, absence, blessure, disqualification
 
 @api_router.post("/combats/{combat_id}/forfait")
-async def declarer_forfait(combat_id: str, data: ForfaitRequest, user: User = Depends(get_current_user)):
+async def declarer_forfait(
+    combat_id: str,
+    data: ForfaitRequest,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    user: User = Depends(get_current_user)
+):
     """
     Déclare un forfait pour un combattant.
     Le combat est automatiquement gagné par l'adversaire.
@@ -1172,6 +2135,13 @@ async def declarer_forfait(combat_id: str, data: ForfaitRequest, user: User = De
     if not combat:
         raise HTTPException(status_code=404, detail="Combat non trouvé")
     
+    if deja_enregistre(combat, idempotency_key):
+        return {
+            "message": f"Forfait enregistré ({data.raison})",
+            "combat": combat,
+            "vainqueur_id": combat.get("vainqueur_id")
+        }
+    
     if combat["termine"]:
         raise HTTPException(status_code=400, detail="Ce combat est déjà terminé")
     
@@ -1198,10 +2168,13 @@ async def declarer_forfait(combat_id: str, data: ForfaitRequest, user: User = De
         # Si l'adversaire n'est pas encore défini, le combat est annulé
         update_data["statut"] = "non_dispute"
     
-    await db.combats.update_one(
-        {"combat_id": combat_id},
-        {"$set": update_data}
-    )
+    updated, applique = await appliquer_resultat(combat, {"termine": False}, update_data, idempotency_key)
+    if not applique:
+        return {
+            "message": f"Forfait enregistré ({data.raison})",
+            "combat": updated,
+            "vainqueur_id": updated.get("vainqueur_id")
+        }
     
     # Marquer le compétiteur comme éliminé
     await db.competiteurs.update_one(
@@ -1209,11 +2182,15 @@ async def declarer_forfait(combat_id: str, data: ForfaitRequest, user: User = De
         {"$set": {"elimine": True, "raison_elimination": data.raison}}
     )
     
+    publier_combat("forfait", combat, version=updated["version"], **update_data)
+    
     # Propager le vainqueur si défini
     if vainqueur_id:
-        await propager_vainqueur(combat, vainqueur_id)
+        await propager_vainqueur(combat, vainqueur_id, qualifier_perdant=data.raison != "disqualification")
+    await replanifier_aire(combat.get("aire_id"))
     
     # Log de l'action
+    maintenant = datetime.now(timezone.utc).isoformat()
     await db.historique_resultats.insert_one({
         "historique_id": f"hist_{uuid.uuid4().hex[:12]}",
         "combat_id": combat_id,
@@ -1221,10 +2198,10 @@ async def declarer_forfait(combat_id: str, data: ForfaitRequest, user: User = De
         "competiteur_id": data.competiteur_id,
         "raison": data.raison,
         "modifie_par": user.user_id,
-        "date": datetime.now(timezone.utc).isoformat()
+        "modifie_at": maintenant,
+        "date": maintenant
     })
     
-    updated = await db.combats.find_one({"combat_id": combat_id}, {"_id": 0})
     return {
         "message": f"Forfait enregistré ({data.raison})",
         "combat": updated,
@@ -1248,27 +2225,36 @@ async def create_tatami(data: TatamiCreate, user: User = Depends(require_admin))
     tat_dict = tat.model_dump()
     await db.tatamis.insert_one(tat_dict)
     tat_dict.pop("_id", None)
+    await incrementer_compteurs(tat.competition_id, tatamis=1)
     return tat_dict
 
 @api_router.delete("/tatamis/{tatami_id}")
 async def delete_tatami(tatami_id: str, user: User = Depends(require_admin)):
-    result = await db.tatamis.delete_one({"tatami_id": tatami_id})
-    if result.deleted_count == 0:
+    tatami = await db.tatamis.find_one_and_delete({"tatami_id": tatami_id}, {"_id": 0, "competition_id": 1})
+    if not tatami:
         raise HTTPException(status_code=404, detail="Tatami non trouvé")
+    await incrementer_compteurs(tatami.get("competition_id"), tatamis=-1)
     return {"message": "Tatami supprimé"}
 
 # ============ COMBATS ENDPOINTS ============
 
-@api_router.get("/combats/suivre")
+@api_router.get("/combats/suivre", responses=reponses_liste())
 async def combats_a_suivre(
+    request: Request,
+    response: Response,
     competition_id: Optional[str] = None,
     categorie_id: Optional[str] = None,
     tatami_id: Optional[str] = None,
     tour: Optional[str] = None,
     statut: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=5000),
     user: User = Depends(get_current_user)
 ):
-    """Récupère les combats à suivre avec filtres"""
+    """
+    Récupère les combats à suivre avec filtres, dans l'ordre de passage.
+    Pagination par curseur (limit / X-Next-Cursor) et flux NDJSON: voir repondre_liste.
+    """
     query = {"statut": {"$ne": "termine"}} if not statut else {}
     
     if competition_id:
@@ -1282,12 +2268,22 @@ async def combats_a_suivre(
     if statut:
         query["statut"] = statut
     
-    combats = await db.combats.find(query, {"_id": 0}).sort("ordre", 1).to_list(500)
-    
-    # Enrichir avec les noms des compétiteurs et catégories
+    tri = [("ordre", 1), ("combat_id", 1)]
+    return await repondre_liste(
+        request, response, db.combats, query, {"_id": 0}, tri, cursor, limit, enrichir=enrichir_combats_a_suivre
+    )
+
+async def enrichir_combats_a_suivre(combats: list):
+    """Ajoute les noms des compétiteurs, de la catégorie et du tatami (un lot de références chargé à la fois)"""
+    competiteurs, categories, tatamis = await charger_references_combats(
+        combats,
+        competiteur_projection={"nom": 1, "prenom": 1, "club": 1},
+        categorie_projection={"nom": 1},
+        avec_tatamis=True
+    )
     for combat in combats:
         if combat.get("rouge_id"):
-            rouge = await db.competiteurs.find_one({"competiteur_id": combat["rouge_id"]}, {"_id": 0, "nom": 1, "prenom": 1, "club": 1})
+            rouge = competiteurs.get(combat["rouge_id"])
             combat["rouge_nom"] = f"{rouge['prenom']} {rouge['nom']}" if rouge else "Inconnu"
             combat["rouge_club"] = rouge.get("club", "") if rouge else ""
         else:
@@ -1295,76 +2291,214 @@ async def combats_a_suivre(
             combat["rouge_club"] = ""
             
         if combat.get("bleu_id"):
-            bleu = await db.competiteurs.find_one({"competiteur_id": combat["bleu_id"]}, {"_id": 0, "nom": 1, "prenom": 1, "club": 1})
+            bleu = competiteurs.get(combat["bleu_id"])
             combat["bleu_nom"] = f"{bleu['prenom']} {bleu['nom']}" if bleu else "Inconnu"
             combat["bleu_club"] = bleu.get("club", "") if bleu else ""
         else:
             combat["bleu_nom"] = "À déterminer"
             combat["bleu_club"] = ""
         
-        cat = await db.categories.find_one({"categorie_id": combat["categorie_id"]}, {"_id": 0, "nom": 1})
+        cat = categories.get(combat["categorie_id"])
         combat["categorie_nom"] = cat["nom"] if cat else "Inconnue"
         
         if combat.get("tatami_id"):
-            tatami = await db.tatamis.find_one({"tatami_id": combat["tatami_id"]}, {"_id": 0, "nom": 1, "numero": 1})
+            tatami = tatamis.get(combat["tatami_id"])
             combat["tatami_nom"] = tatami["nom"] if tatami else "Non assigné"
         else:
             combat["tatami_nom"] = "Non assigné"
-    
-    return combats
 
-@api_router.get("/combats/arbre/{categorie_id}")
-async def get_arbre_combats(categorie_id: str, user: User = Depends(get_current_user)):
-    """Récupère l'arbre complet des combats pour une catégorie (pour affichage et export PDF)"""
-    combats = await db.combats.find({"categorie_id": categorie_id}, {"_id": 0}).to_list(100)
-    
-    # Enrichir avec les informations
-    arbre = {"quart": [], "demi": [], "bronze": [], "finale": []}
+class BracketCache:
+    """
+    Arbres de combats prêts à servir, déjà sérialisés, par catégorie (LRU). Chaque catégorie et chaque
+    compétition a une révision en mémoire, augmentée à chaque modification publiée
+    (voir LiveFeedHub.publish): une entrée n'est servie que si les deux n'ont pas bougé.
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self.entries = OrderedDict()  # categorie_id -> {"competition_id", "cle", "corps"}
+        self.revisions_categories = {}
+        self.revisions_competitions = {}
+        self.revision = 0  # compteur global: les révisions ne reculent jamais
+        self.hits = 0
+        self.misses = 0
+
+    def cle(self, categorie_id: str, competition_id: Optional[str]) -> tuple:
+        return (self.revisions_categories.get(categorie_id, 0), self.revisions_competitions.get(competition_id, 0))
+
+    def get(self, categorie_id: str) -> Optional[dict]:
+        entry = self.entries.get(categorie_id)
+        if entry is None or entry["cle"] != self.cle(categorie_id, entry["competition_id"]):
+            self.misses += 1
+            return None
+        self.entries.move_to_end(categorie_id)
+        self.hits += 1
+        return entry
+
+    def set(self, categorie_id: str, competition_id: Optional[str], corps: bytes, revision: int):
+        """Mémorise un arbre construit alors que le compteur global valait `revision`"""
+        if self.max_size <= 0 or revision != self.revision:
+            return  # une modification est survenue pendant la construction
+        self.entries[categorie_id] = {
+            "competition_id": competition_id,
+            "cle": self.cle(categorie_id, competition_id),
+            "corps": corps
+        }
+        self.entries.move_to_end(categorie_id)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    def invalider_categorie(self, categorie_id: Optional[str]):
+        if categorie_id:
+            self.revision += 1
+            self.revisions_categories[categorie_id] = self.revision
+
+    def invalider_competition(self, competition_id: Optional[str]):
+        if competition_id:
+            self.revision += 1
+            self.revisions_competitions[competition_id] = self.revision
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "revision": self.revision,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0
+        }
+
+bracket_cache = BracketCache(max_size=int(os.environ.get("BRACKET_CACHE_MAX_SIZE", "500")))
+
+def nom_affiche(competiteur: Optional[dict]) -> str:
+    return f"{competiteur['prenom']} {competiteur['nom']}" if competiteur else "Inconnu"
+
+async def construire_arbres(categorie_ids: list) -> dict:
+    """
+    Construit les arbres de plusieurs catégories en trois lectures (combats,
+    compétiteurs, catégories). Les combats sont regroupés par tour, quel qu'il
+    soit (tour_32, huitieme, quart...), triés par position; `tours` donne l'ordre
+    d'affichage des colonnes.
+    """
+    combats, categories = await asyncio.gather(
+        db.combats.find({"categorie_id": {"$in": categorie_ids}}, {"_id": 0}).to_list(None),
+        charger_par_ids(db.categories, "categorie_id", categorie_ids)
+    )
+    competiteur_ids = [c.get(champ) for c in combats for champ in ("rouge_id", "bleu_id", "vainqueur_id")]
+    competiteurs = await charger_par_ids(
+        db.competiteurs, "competiteur_id", competiteur_ids, {"nom": 1, "prenom": 1, "club": 1}
+    )
     
+    par_categorie = {categorie_id: [] for categorie_id in categorie_ids}
     for combat in combats:
         # Ajouter les noms des compétiteurs
-        if combat.get("rouge_id"):
-            rouge = await db.competiteurs.find_one({"competiteur_id": combat["rouge_id"]}, {"_id": 0, "nom": 1, "prenom": 1, "club": 1})
-            combat["rouge"] = {"nom": f"{rouge['prenom']} {rouge['nom']}", "club": rouge.get("club", "")} if rouge else {"nom": "Inconnu", "club": ""}
-        else:
-            combat["rouge"] = {"nom": "À déterminer", "club": ""}
-            
-        if combat.get("bleu_id"):
-            bleu = await db.competiteurs.find_one({"competiteur_id": combat["bleu_id"]}, {"_id": 0, "nom": 1, "prenom": 1, "club": 1})
-            combat["bleu"] = {"nom": f"{bleu['prenom']} {bleu['nom']}", "club": bleu.get("club", "")} if bleu else {"nom": "Inconnu", "club": ""}
-        else:
-            combat["bleu"] = {"nom": "À déterminer", "club": ""}
+        for couleur in ("rouge", "bleu"):
+            competiteur_id = combat.get(f"{couleur}_id")
+            if competiteur_id:
+                competiteur = competiteurs.get(competiteur_id)
+                combat[couleur] = {"nom": nom_affiche(competiteur), "club": competiteur.get("club", "") if competiteur else ""}
+            else:
+                combat[couleur] = {"nom": "À déterminer", "club": ""}
         
         # Ajouter le vainqueur si terminé
         if combat.get("vainqueur_id"):
-            vainqueur = await db.competiteurs.find_one({"competiteur_id": combat["vainqueur_id"]}, {"_id": 0, "nom": 1, "prenom": 1})
-            combat["vainqueur_nom"] = f"{vainqueur['prenom']} {vainqueur['nom']}" if vainqueur else "Inconnu"
-        
-        if combat["tour"] in arbre:
-            arbre[combat["tour"]].append(combat)
-    
-    # Trier par position
-    for tour in arbre:
-        arbre[tour] = sorted(arbre[tour], key=lambda x: x.get("position", 0))
-    
-    # Ajouter les infos de la catégorie
-    categorie = await db.categories.find_one({"categorie_id": categorie_id}, {"_id": 0})
+            combat["vainqueur_nom"] = nom_affiche(competiteurs.get(combat["vainqueur_id"]))
+        par_categorie[combat["categorie_id"]].append(combat)
+    
+    arbres = {}
+    for categorie_id, combats_categorie in par_categorie.items():
+        # Les tours historiquement affichés sont toujours présents, même vides
+        arbre = {"quart": [], "demi": [], "bronze": [], "finale": []}
+        for combat in sorted(combats_categorie, key=lambda x: x.get("position", 0)):
+            arbre.setdefault(combat["tour"], []).append(combat)
+        arbres[categorie_id] = {
+            "categorie": categories.get(categorie_id),
+            "arbre": arbre,
+            "tours": sorted((tour for tour, liste in arbre.items() if liste), key=rang_tour),
+            "total_combats": len(combats_categorie),
+            "combats_termines": len([c for c in combats_categorie if c.get("termine")])
+        }
+    return arbres
+
+async def lire_arbres(categorie_ids: list) -> dict:
+    """
+    Arbres sérialisés ({categorie_id: {"competition_id", "corps"}}) depuis le cache;
+    les catégories manquantes sont construites ensemble.
+    """
+    arbres = {}
+    manquantes = []
+    for categorie_id in categorie_ids:
+        entry = bracket_cache.get(categorie_id)
+        if entry is None:
+            manquantes.append(categorie_id)
+        else:
+            arbres[categorie_id] = entry
+    
+    if manquantes:
+        revision = bracket_cache.revision
+        construits = await construire_arbres(manquantes)
+        for categorie_id, payload in construits.items():
+            competition_id = (payload["categorie"] or {}).get("competition_id")
+            if payload["categorie"] is not None:
+                payload["revision"] = max(bracket_cache.cle(categorie_id, competition_id))
+            corps = dumps_json(payload)
+            arbres[categorie_id] = {"competition_id": competition_id, "corps": corps}
+            if payload["categorie"] is not None:
+                # Une catégorie inexistante n'est pas mise en cache
+                bracket_cache.set(categorie_id, competition_id, corps, revision)
+    return arbres
+
+@api_router.get("/combats/arbre/{categorie_id}")
+async def get_arbre_combats(categorie_id: str, user: User = Depends(get_current_user)):
+    """Récupère l'arbre complet des combats pour une catégorie (pour affichage et export PDF)"""
+    arbre = (await lire_arbres([categorie_id]))[categorie_id]
+    return Response(content=arbre["corps"], media_type="application/json")
+
+@api_router.get("/combats/arbres")
+async def get_arbres_combats(
+    competition_id: str,
+    categorie_id: Optional[List[str]] = Query(None),
+    user: User = Depends(get_current_user)
+):
+    """
+    Arbres de plusieurs catégories en une réponse ({categorie_id: arbre}), pour la
+    vue d'ensemble du tournoi. Sans categorie_id: toutes les catégories dont l'arbre est généré.
+    """
+    if not await user_can_access_competition(user, competition_id):
+        raise HTTPException(status_code=403, detail="Accès non autorisé à cette compétition")
     
-    return {
-        "categorie": categorie,
-        "arbre": arbre,
-        "total_combats": len(combats),
-        "combats_termines": len([c for c in combats if c.get("termine")])
-    }
+    if categorie_id:
+        categorie_ids = list(dict.fromkeys(categorie_id))
+    else:
+        categorie_ids = await db.categories.distinct(
+            "categorie_id", {"competition_id": competition_id, "arbre_genere": True}
+        )
+    arbres = await lire_arbres(categorie_ids)
+    # Objet JSON assemblé à partir des arbres déjà sérialisés; une catégorie
+    # demandée d'une autre compétition n'est pas renvoyée
+    corps = b",".join(
+        dumps_json(cid) + b":" + arbre["corps"] for cid, arbre in arbres.items()
+        if arbre["competition_id"] == competition_id
+    )
+    return Response(content=b"{" + corps + b"}", media_type="application/json")
 
-@api_router.get("/combats")
+@api_router.get("/combats", responses=reponses_liste(Combat))
 async def list_combats(
+    request: Request,
+    response: Response,
     competition_id: Optional[str] = None,
     categorie_id: Optional[str] = None,
     tatami_id: Optional[str] = None,
     tour: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=5000),
     user: User = Depends(get_current_user)
 ):
+    """
+    Liste les combats avec filtres, dans l'ordre de passage.
+    Pagination par curseur (limit / X-Next-Cursor) et flux NDJSON: voir repondre_liste.
+    """
     query = {}
     if competition_id:
         query["competition_id"] = competition_id
@@ -1375,8 +2509,8 @@ async def list_combats(
     if tour:
         query["tour"] = tour
     
-    combats = await db.combats.find(query, {"_id": 0}).to_list(1000)
-    return combats
+    tri = [("ordre", 1), ("combat_id", 1)]
+    return await repondre_liste(request, response, db.combats, query, {"_id": 0}, tri, cursor, limit)
 
 @api_router.get("/combats/{combat_id}")
 async def get_combat(combat_id: str, user: User = Depends(get_current_user)):
@@ -1385,15 +2519,612 @@ async def get_combat(combat_id: str, user: User = Depends(get_current_user)):
         raise HTTPException(status_code=404, detail="Combat non trouvé")
     return combat
 
+# ============ MOTEUR D'ARBRE (ÉLIMINATION DIRECTE) ============
+
+# Nom des tours selon le nombre de places du tour
+NOMS_TOURS = {2: "finale", 4: "demi", 8: "quart", 16: "huitieme"}
+PLACES_TOURS = {nom: places for places, nom in NOMS_TOURS.items()}
+
+def nom_tour(nb_places: int) -> str:
+    """Nom d'un tour à partir de son nombre de places (tour_32, tour_64... au-delà des huitièmes)"""
+    return NOMS_TOURS.get(nb_places, f"tour_{nb_places}")
+
+def places_tour(tour: str) -> Optional[int]:
+    """Nombre de places d'un tour (inverse de nom_tour)"""
+    if tour in PLACES_TOURS:
+        return PLACES_TOURS[tour]
+    if tour.startswith("tour_") and tour[5:].isdigit():
+        return int(tour[5:])
+    return None
+
+def rang_tour(tour: str) -> int:
+    """Rang d'exécution d'un tour: premiers tours d'abord, bronze juste avant la finale"""
+    if tour == "bronze":
+        return rang_tour("finale") - 1
+    places = places_tour(tour)
+    if places is None:
+        return 0
+    return -2 * (places.bit_length() - 1)
+
+def ordre_tetes_de_serie(nb: int) -> list:
+    """Numéro de tête de série de chaque emplacement d'un tableau de nb places (1, nb, ...)"""
+    seeds = [1]
+    while len(seeds) < nb:
+        taille = len(seeds) * 2
+        seeds = [x for seed in seeds for x in (seed, taille + 1 - seed)]
+    return seeds
+
+def construire_arbre(
+    competiteur_ids: list,
+    competition_id: str,
+    categorie_id: str,
+    tatami_id: Optional[str] = None
+) -> List[Combat]:
+    """
+    Construit en mémoire l'arbre complet d'élimination directe pour N compétiteurs.
+    
+    - Le tableau est complété à la puissance de 2 supérieure avec des BYE,
+      au plus un par combat du premier tour et répartis entre les moitiés du tableau
+    - Un compétiteur exempté (BYE) est placé directement au tour suivant
+    - Chaque combat pointe vers le combat suivant (next_combat_id / next_slot)
+      et, pour les demi-finales, vers le match bronze (loser_next_combat_id / loser_slot)
+    - Un match pour le bronze est ajouté dès que les deux demi-finales sont disputées
+    """
+    n = len(competiteur_ids)
+    if n < 2:
+        return []
+    
+    taille = 1 << (n - 1).bit_length()
+    nb_byes = taille - n
+    
+    # Premier tour: les combats recevant un BYE sont ceux des meilleures têtes de série
+    nb_paires = taille // 2
+    seeds = ordre_tetes_de_serie(nb_paires)
+    restants = iter(competiteur_ids)
+    emplacements = []
+    for paire in range(nb_paires):
+        rouge = next(restants)
+        bleu = None if seeds[paire] <= nb_byes else next(restants)
+        emplacements.append((rouge, bleu))
+    
+    # Créer tous les combats, tour par tour
+    tours = []
+    places = taille
+    while places >= 2:
+        tour = nom_tour(places)
+        tours.append([
+            Combat(
+                competition_id=competition_id,
+                categorie_id=categorie_id,
+                tatami_id=tatami_id,
+                tour=tour,
+                position=position + 1
+            )
+            for position in range(places // 2)
+        ])
+        places //= 2
+    
+    # Premier tour: combats réels, ou qualification directe en cas de BYE
+    premier_tour = tours[0]
+    for index, (rouge, bleu) in enumerate(emplacements):
+        if bleu is None:
+            premier_tour[index] = None
+            if len(tours) > 1:
+                suivant = tours[1][index // 2]
+                setattr(suivant, "rouge_id" if index % 2 == 0 else "bleu_id", rouge)
+        else:
+            premier_tour[index].rouge_id = rouge
+            premier_tour[index].bleu_id = bleu
+    
+    # Pointeurs vers le combat suivant
+    for numero_tour, combats_tour in enumerate(tours[:-1]):
+        for index, combat in enumerate(combats_tour):
+            if combat is None:
+                continue
+            suivant = tours[numero_tour + 1][index // 2]
+            combat.next_combat_id = suivant.combat_id
+            combat.next_slot = "rouge" if index % 2 == 0 else "bleu"
+    
+    combats = [combat for combats_tour in tours for combat in combats_tour if combat is not None]
+    
+    # Match pour le bronze entre les perdants des deux demi-finales
+    if len(tours) >= 2 and all(tours[-2]):
+        bronze = Combat(
+            competition_id=competition_id,
+            categorie_id=categorie_id,
+            tatami_id=tatami_id,
+            tour="bronze",
+            position=1
+        )
+        for index, demi in enumerate(tours[-2]):
+            demi.loser_next_combat_id = bronze.combat_id
+            demi.loser_slot = "rouge" if index % 2 == 0 else "bleu"
+        combats.append(bronze)
+    
+    return combats
+
+def nombre_byes(n: int) -> int:
+    """Nombre de places vides d'un tableau de n compétiteurs"""
+    return (1 << (n - 1).bit_length()) - n if n > 1 else 0
+
+def combats_en_documents(combats: list) -> list:
+    """Convertit les combats générés en documents MongoDB"""
+    docs = []
+    for combat in combats:
+        combat_dict = combat.model_dump()
+        combat_dict["created_at"] = combat_dict["created_at"].isoformat()
+        docs.append(combat_dict)
+    return docs
+
+# ============ ORDONNANCEMENT DES COMBATS SUR LES AIRES ============
+
+REPOS_MINIMUM_MINUTES = int(os.environ.get("REPOS_MINIMUM_MINUTES", "10"))
+DUREE_COMBAT_DEFAUT_MINUTES = 6
+TOURS_FINALES = ("finale", "bronze")
+
+def duree_combat(combat: dict) -> int:
+    return combat.get("duree_minutes") or DUREE_COMBAT_DEFAUT_MINUTES
+
+def graphe_precedences(combats: list) -> dict:
+    """
+    Successeurs de chaque combat dans son arbre (combat où vont le vainqueur et le perdant).
+    Utilise les pointeurs; pour les combats générés avant leur introduction, les
+    retrouve par catégorie, tour et position comme cibles_propagation.
+    """
+    par_position = {(c["categorie_id"], c["tour"], c["position"]): c["combat_id"] for c in combats}
+    bronzes = {c["categorie_id"]: c["combat_id"] for c in combats if c["tour"] == "bronze"}
+    ids = {c["combat_id"] for c in combats}
+    
+    successeurs = {}
+    for combat in combats:
+        if combat.get("next_combat_id") or combat.get("loser_next_combat_id"):
+            cibles = [combat.get("next_combat_id"), combat.get("loser_next_combat_id")]
+        else:
+            places = places_tour(combat["tour"])
+            cibles = []
+            if places and places > 2:
+                cibles.append(par_position.get(
+                    (combat["categorie_id"], nom_tour(places // 2), (combat["position"] + 1) // 2)
+                ))
+            if combat["tour"] == "demi":
+                cibles.append(bronzes.get(combat["categorie_id"]))
+        successeurs[combat["combat_id"]] = [c for c in cibles if c in ids]
+    return successeurs
+
+def ordonnancer_combats(
+    combats: list,
+    aire_ids: list,
+    repos_minutes: int = REPOS_MINIMUM_MINUTES,
+    disponibilite_aires: Optional[dict] = None
+) -> tuple:
+    """
+    Ordonnancement par liste des combats restants sur les aires actives.
+    
+    - Un combat ne peut commencer qu'une fois les combats qui lui fournissent
+      ses compétiteurs terminés, plus le temps de repos minimum
+    - Quand une aire se libère, elle prend parmi les combats prêts celui dont le
+      chemin critique (durée restante jusqu'à la fin de son arbre) est le plus long
+    - Les finales et matchs pour le bronze forment un bloc final commun à toutes les aires
+    - Les combats en cours restent sur leur aire
+    
+    disponibilite_aires: minute à partir de laquelle chaque aire est libre (0 par défaut).
+    Retourne (plan, fin) où plan associe à chaque combat_id
+    {aire_id, debut, fin, est_finale} (minutes depuis le début) et fin est la durée totale.
+    """
+    par_id = {c["combat_id"]: c for c in combats}
+    successeurs = graphe_precedences(combats)
+    nb_predecesseurs = dict.fromkeys(par_id, 0)
+    for cibles in successeurs.values():
+        for cible in cibles:
+            nb_predecesseurs[cible] += 1
+    
+    # Chemin critique: durée du combat + repos + plus long chemin de ses successeurs
+    ordre_topologique = [cid for cid, n in nb_predecesseurs.items() if n == 0]
+    restants = dict(nb_predecesseurs)
+    for cid in ordre_topologique:
+        for cible in successeurs[cid]:
+            restants[cible] -= 1
+            if restants[cible] == 0:
+                ordre_topologique.append(cible)
+    priorite = {}
+    for cid in reversed(ordre_topologique):
+        suite = max((repos_minutes + priorite[s] for s in successeurs[cid]), default=0)
+        priorite[cid] = duree_combat(par_id[cid]) + suite
+    
+    def est_finale(cid):
+        return par_id[cid]["tour"] in TOURS_FINALES
+    
+    def cle(cid):
+        combat = par_id[cid]
+        return (-priorite[cid], combat["categorie_id"], rang_tour(combat["tour"]), combat["position"], cid)
+    
+    disponibilite_aires = disponibilite_aires or {}
+    aires = [(disponibilite_aires.get(aire_id, 0), numero, aire_id) for numero, aire_id in enumerate(aire_ids)]
+    plan = {}
+    liberation = dict.fromkeys(par_id, 0)
+    prets = {False: [], True: []}  # par phase: combats dont tous les prédécesseurs sont placés
+    
+    def placer(cid, aire_id, debut):
+        fin = debut + duree_combat(par_id[cid])
+        plan[cid] = {"aire_id": aire_id, "debut": debut, "fin": fin, "est_finale": est_finale(cid)}
+        for cible in successeurs[cid]:
+            liberation[cible] = max(liberation[cible], fin + repos_minutes)
+            nb_predecesseurs[cible] -= 1
+            if nb_predecesseurs[cible] == 0:
+                prets[est_finale(cible)].append(cible)
+        return fin
+    
+    # Combats en cours: conservés sur leur aire
+    aires_par_id = {aire_id: i for i, (_, _, aire_id) in enumerate(aires)}
+    for cid, combat in par_id.items():
+        if combat.get("statut") == "en_cours" and combat.get("aire_id") in aires_par_id:
+            i = aires_par_id[combat["aire_id"]]
+            libre, numero, aire_id = aires[i]
+            aires[i] = (placer(cid, aire_id, libre), numero, aire_id)
+    for phase in (False, True):
+        prets[phase] = [
+            cid for cid, n in nb_predecesseurs.items()
+            if n == 0 and cid not in plan and est_finale(cid) == phase
+        ]
+    
+    fin_totale = max((libre for libre, _, _ in aires), default=0)
+    for phase in (False, True):
+        if phase:
+            # Bloc des finales: commence au même moment sur toutes les aires
+            debut_bloc = max([libre for libre, _, _ in aires] + [p["fin"] for p in plan.values()])
+            aires = [(debut_bloc, numero, aire_id) for _, numero, aire_id in aires]
+        heapq.heapify(aires)
+        en_attente = []  # (liberation, cle, cid)
+        disponibles = []  # (cle, cid)
+        
+        while prets[phase] or en_attente or disponibles:
+            for cid in prets[phase]:
+                heapq.heappush(en_attente, (liberation[cid], cle(cid), cid))
+            prets[phase] = []
+            
+            libre, numero, aire_id = heapq.heappop(aires)
+            if not disponibles and en_attente and en_attente[0][0] > libre:
+                # Aucun combat prêt: l'aire attend le prochain combat libéré
+                libre = en_attente[0][0]
+            while en_attente and en_attente[0][0] <= libre:
+                _, priorite_cle, cid = heapq.heappop(en_attente)
+                heapq.heappush(disponibles, (priorite_cle, cid))
+            
+            _, cid = heapq.heappop(disponibles)
+            heapq.heappush(aires, (placer(cid, aire_id, libre), numero, aire_id))
+        
+        fin_totale = max([fin_totale] + [libre for libre, _, _ in aires])
+    
+    return plan, fin_totale
+
+def ordres_par_aire(plan: dict) -> dict:
+    """Numéro d'ordre (1, 2, ...) de chaque combat sur son aire, selon l'heure de début prévue"""
+    ordres = {}
+    compteurs = {}
+    for cid, p in sorted(plan.items(), key=lambda item: (item[1]["debut"], item[0])):
+        compteurs[p["aire_id"]] = compteurs.get(p["aire_id"], 0) + 1
+        ordres[cid] = compteurs[p["aire_id"]]
+    return ordres
+
+# ============ PLANIFICATION HORAIRE ============
+
+def heure_en_minutes(heure: str) -> int:
+    """'HH:MM' -> minutes depuis minuit (ValueError si le format est invalide)"""
+    heures, minutes = heure.split(":")[:2]
+    heures, minutes = int(heures), int(minutes)
+    if not (0 <= heures < 24 and 0 <= minutes < 60):
+        raise ValueError(heure)
+    return heures * 60 + minutes
+
+def minutes_en_heure(minutes: int) -> str:
+    return f"{(minutes // 60) % 24:02d}:{minutes % 60:02d}"
+
+def apres_pauses(debut: int, duree: int, pauses: list) -> int:
+    """Repousse après la pause un combat qui la chevaucherait (pauses: [(debut, fin)] triées)"""
+    for pause_debut, pause_fin in pauses:
+        if debut < pause_fin and debut + duree > pause_debut:
+            debut = pause_fin
+    return debut
+
+def pauses_aire(parametres: dict, aire_id: str) -> list:
+    return sorted(
+        (heure_en_minutes(p["debut"]), heure_en_minutes(p["debut"]) + p["duree_minutes"])
+        for p in parametres.get("pauses", [])
+        if p.get("aire_id") in (None, aire_id)
+    )
+
+def calculer_horaires(
+    files: dict,
+    libre: dict,
+    parametres: dict,
+    liberation: Optional[dict] = None,
+    debut_finales: Optional[int] = None
+) -> tuple:
+    """
+    Heures de début des combats de chaque aire, dans l'ordre de leur file.
+    
+    files: aire_id -> combats dans l'ordre d'exécution (réguliers puis finales)
+    libre: aire_id -> minute à partir de laquelle l'aire est disponible
+    liberation: combat_id -> minute minimale imposée par des combats hors des files
+    debut_finales: début du bloc des finales; calculé si None (fin des combats
+    réguliers, heure_finales et pause avant finales)
+    
+    Un combat attend la fin des combats qui lui fournissent ses compétiteurs plus
+    le repos minimum, et ne chevauche pas les pauses de son aire.
+    Retourne ({combat_id: minute de début}, debut_finales, {aire_id: minute de fin}).
+    """
+    repos = parametres.get("repos_minutes")
+    repos = REPOS_MINIMUM_MINUTES if repos is None else repos
+    duree_fixe = parametres.get("duree_combat_minutes")
+    
+    def duree(combat):
+        return duree_fixe or duree_combat(combat)
+    
+    tous = [c for file in files.values() for c in file]
+    successeurs = graphe_precedences(tous)
+    restants = dict.fromkeys((c["combat_id"] for c in tous), 0)
+    for cibles in successeurs.values():
+        for cible in cibles:
+            restants[cible] += 1
+    liberation = dict(liberation or {})
+    pauses = {aire_id: pauses_aire(parametres, aire_id) for aire_id in files}
+    libre = {aire_id: libre.get(aire_id, 0) for aire_id in files}
+    horaires = {}
+    
+    def planifier_phase(finales: bool):
+        phase = {
+            aire_id: [c for c in file if c["tour"] in TOURS_FINALES or c.get("est_finale")] if finales
+            else [c for c in file if not (c["tour"] in TOURS_FINALES or c.get("est_finale"))]
+            for aire_id, file in files.items()
+        }
+        positions = dict.fromkeys(phase, 0)
+        while True:
+            # Parmi les têtes de file, placer celle qui peut commencer le plus tôt.
+            # Un combat dont un prédécesseur n'est pas encore placé (ordre manuel
+            # incohérent) n'est choisi qu'en dernier recours.
+            choix = None
+            for rang, (aire_id, file) in enumerate(phase.items()):
+                if positions[aire_id] >= len(file):
+                    continue
+                combat = file[positions[aire_id]]
+                debut = max(libre[aire_id], liberation.get(combat["combat_id"], 0))
+                debut = apres_pauses(debut, duree(combat), pauses[aire_id])
+                cle = (restants[combat["combat_id"]] > 0, debut, rang)
+                if choix is None or cle < choix[0]:
+                    choix = (cle, aire_id, combat, debut)
+            if choix is None:
+                return
+            _, aire_id, combat, debut = choix
+            positions[aire_id] += 1
+            fin = debut + duree(combat)
+            horaires[combat["combat_id"]] = debut
+            libre[aire_id] = fin
+            for cible in successeurs[combat["combat_id"]]:
+                liberation[cible] = max(liberation.get(cible, 0), fin + repos)
+                restants[cible] -= 1
+    
+    planifier_phase(finales=False)
+    if debut_finales is None:
+        debut_finales = max(libre.values(), default=0)
+        if parametres.get("heure_finales"):
+            debut_finales = max(debut_finales, heure_en_minutes(parametres["heure_finales"]))
+        debut_finales += parametres.get("pause_avant_finales_minutes") or 0
+    for aire_id in libre:
+        libre[aire_id] = max(libre[aire_id], debut_finales)
+    planifier_phase(finales=True)
+    
+    return horaires, debut_finales, libre
+
+def est_jour_competition(competition: dict) -> bool:
+    return competition.get("date") == datetime.now().strftime("%Y-%m-%d")
+
+def minutes_actuelles() -> int:
+    maintenant = datetime.now()
+    return maintenant.hour * 60 + maintenant.minute
+
+# Durées observées: moyenne mobile exponentielle par aire et par groupe d'âge
+DUREE_LISSAGE = float(os.environ.get("DUREE_LISSAGE", "0.2"))  # poids de la dernière observation
+DUREE_OBSERVATIONS_MIN = 3  # nombre d'observations avant d'utiliser une moyenne
+DUREE_OBSERVEE_MAX_MINUTES = 60  # au-delà, l'observation est ignorée (combat oublié en cours)
+
+def champs_lancement() -> dict:
+    """Champs à écrire lorsqu'un combat passe en cours"""
+    return {"statut": "en_cours", "heure_debut_reelle": datetime.now(timezone.utc).isoformat()}
+
+def minutes_locales(iso: str) -> float:
+    """Horodatage ISO -> minutes depuis minuit (heure locale du serveur)"""
+    moment = datetime.fromisoformat(iso)
+    if moment.tzinfo:
+        moment = moment.astimezone()
+    return moment.hour * 60 + moment.minute + moment.second / 60
+
+def groupe_age(categorie: Optional[dict]) -> Optional[str]:
+    if not categorie:
+        return None
+    return f"{categorie['age_min']}-{categorie['age_max']}"
+
+async def enregistrer_duree_observee(combat: dict, heure_fin_reelle: Optional[str]):
+    """Met à jour, en une écriture, les durées moyennes de l'aire et du groupe d'âge du combat"""
+    if combat.get("termine") or not combat.get("heure_debut_reelle") or not heure_fin_reelle:
+        return
+    duree = (
+        datetime.fromisoformat(heure_fin_reelle) - datetime.fromisoformat(combat["heure_debut_reelle"])
+    ).total_seconds() / 60
+    if not 0 < duree <= DUREE_OBSERVEE_MAX_MINUTES:
+        return
+    
+    index = await get_category_index(combat["competition_id"])
+    champs = []
+    if combat.get("aire_id"):
+        champs.append(f"durees_observees.aires.{combat['aire_id']}")
+    groupe = groupe_age(index.categories.get(combat["categorie_id"]))
+    if groupe:
+        champs.append(f"durees_observees.groupes.{groupe}")
+    if not champs:
+        return
+    
+    mise_a_jour = {}
+    for champ in champs:
+        mise_a_jour[f"{champ}.moyenne"] = {"$add": [
+            {"$multiply": [{"$ifNull": [f"${champ}.moyenne", duree]}, 1 - DUREE_LISSAGE]},
+            duree * DUREE_LISSAGE
+        ]}
+        mise_a_jour[f"{champ}.n"] = {"$add": [{"$ifNull": [f"${champ}.n", 0]}, 1]}
+    await db.competitions.update_one({"competition_id": combat["competition_id"]}, [{"$set": mise_a_jour}])
+
+def estimer_duree(combat: dict, durees_observees: Optional[dict], categories: dict) -> int:
+    """Durée prévue d'un combat: moyenne observée de son groupe d'âge, sinon de son aire, sinon sa durée"""
+    durees_observees = durees_observees or {}
+    statistiques = (
+        durees_observees.get("groupes", {}).get(groupe_age(categories.get(combat["categorie_id"]))),
+        durees_observees.get("aires", {}).get(combat.get("aire_id"))
+    )
+    for stat in statistiques:
+        if stat and stat.get("n", 0) >= DUREE_OBSERVATIONS_MIN:
+            return max(1, round(stat["moyenne"]))
+    return duree_combat(combat)
+
+def heure_lue(heure) -> Optional[int]:
+    """Minutes d'une heure enregistrée, ou None si elle est absente ou mal formée"""
+    try:
+        return heure_en_minutes(heure)
+    except (ValueError, TypeError, AttributeError):
+        return None
+
+async def replanifier_aire(aire_id: Optional[str]):
+    """
+    Replanification au mieux après une écriture déjà validée et publiée: une erreur
+    est journalisée mais ne fait pas échouer la requête (le client la rejouerait).
+    """
+    try:
+        await recalculer_horaires_aire(aire_id)
+    except Exception:
+        logger.exception(f"Replanification de l'aire {aire_id} impossible")
+
+async def recalculer_horaires_aire(aire_id: Optional[str]):
+    """
+    Recalcule les horaires des combats restants d'une aire (fin de sa file) après un
+    lancement, un résultat ou un réordonnancement, en une lecture de la file:
+    - heure_estimee: à partir du combat en cours (heure réelle de lancement) ou de
+      l'heure actuelle, avec les durées observées sur l'aire et le groupe d'âge
+    - heure_debut: replanifiée si la compétition a été planifiée
+    Seuls les combats dont une heure change sont réécrits.
+    """
+    from pymongo import UpdateOne
+    
+    if not aire_id:
+        return
+    aire = await db.aires_combat.find_one({"aire_id": aire_id}, {"_id": 0, "competition_id": 1})
+    if not aire:
+        return
+    competition, file = await asyncio.gather(
+        db.competitions.find_one(
+            {"competition_id": aire["competition_id"]},
+            {"_id": 0, "date": 1, "heure_debut": 1, "planification": 1, "durees_observees": 1}
+        ),
+        db.combats.find(
+            {"aire_id": aire_id, "termine": False}, {"_id": 0}
+        ).sort([("est_finale", 1), ("ordre", 1)]).to_list(None)
+    )
+    if not competition or not file:
+        return
+    
+    parametres = competition.get("planification")
+    jour_j = est_jour_competition(competition)
+    heure_depart = heure_en_minutes((parametres or {}).get("heure_debut") or competition.get("heure_debut") or "09:00")
+    repos = (parametres or {}).get("repos_minutes")
+    repos = REPOS_MINIMUM_MINUTES if repos is None else repos
+    debut_finales = heure_en_minutes(parametres["debut_finales"]) if parametres and parametres.get("debut_finales") else None
+    
+    # Combats des autres aires qui fournissent des compétiteurs à cette file
+    ids = [c["combat_id"] for c in file]
+    predecesseurs = await db.combats.find(
+        {"termine": False, "aire_id": {"$ne": aire_id},
+         "$or": [{"next_combat_id": {"$in": ids}}, {"loser_next_combat_id": {"$in": ids}}]},
+        {"_id": 0, "next_combat_id": 1, "loser_next_combat_id": 1,
+         "heure_debut": 1, "heure_estimee": 1, "duree_minutes": 1}
+    ).to_list(None)
+    
+    def liberations(champ_heure: str) -> dict:
+        liberation = {}
+        for pred in predecesseurs:
+            debut = heure_lue(pred.get(champ_heure))
+            if debut is None:
+                debut = heure_lue(pred.get("heure_debut"))
+            if debut is None:
+                continue
+            fin = debut + duree_combat(pred)
+            for cible in (pred.get("next_combat_id"), pred.get("loser_next_combat_id")):
+                if cible:
+                    liberation[cible] = max(liberation.get(cible, 0), fin + repos)
+        return liberation
+    
+    heures = {}  # combat_id -> {champ: HH:MM}
+    
+    # Horaire planifié
+    if parametres:
+        heures_prevues = [m for m in (heure_lue(c.get("heure_debut")) for c in file) if m is not None]
+        libre = min(heures_prevues, default=heure_depart)
+        if jour_j and not (file[0]["statut"] == "en_cours" and file[0].get("heure_debut")):
+            libre = max(minutes_actuelles(), heure_depart)
+        horaires, _, _ = calculer_horaires(
+            {aire_id: file}, {aire_id: libre}, parametres, liberations("heure_debut"),
+            debut_finales=debut_finales if debut_finales is not None else heure_depart
+        )
+        for combat_id, minute in horaires.items():
+            heures.setdefault(combat_id, {})["heure_debut"] = minutes_en_heure(minute)
+    
+    # Heures estimées d'après l'avancement réel et les durées observées
+    categories = (await get_category_index(aire["competition_id"])).categories
+    en_cours = [c for c in file if c["statut"] == "en_cours"]
+    a_venir = [
+        {**c, "duree_minutes": estimer_duree(c, competition.get("durees_observees"), categories)}
+        for c in file if c["statut"] != "en_cours"
+    ]
+    libre = minutes_actuelles() if jour_j else min(
+        [m for m in (heure_lue(c.get("heure_debut")) for c in file) if m is not None], default=heure_depart
+    )
+    for combat in en_cours:
+        if combat.get("heure_debut_reelle"):
+            debut = minutes_locales(combat["heure_debut_reelle"])
+            heures.setdefault(combat["combat_id"], {})["heure_estimee"] = minutes_en_heure(int(debut))
+            fin = debut + estimer_duree(combat, competition.get("durees_observees"), categories)
+            libre = max(libre, math.ceil(fin))
+    if a_venir:
+        horaires, _, _ = calculer_horaires(
+            {aire_id: a_venir}, {aire_id: libre},
+            {**(parametres or {}), "duree_combat_minutes": None, "repos_minutes": repos},
+            liberations("heure_estimee"),
+            debut_finales=debut_finales
+        )
+        for combat_id, minute in horaires.items():
+            heures.setdefault(combat_id, {})["heure_estimee"] = minutes_en_heure(minute)
+    
+    operations = []
+    categories_modifiees = set()
+    for combat in file:
+        changements = {
+            champ: heure for champ, heure in heures.get(combat["combat_id"], {}).items()
+            if combat.get(champ) != heure
+        }
+        if changements:
+            operations.append(UpdateOne({"combat_id": combat["combat_id"]}, {"$set": changements}))
+            categories_modifiees.add(combat["categorie_id"])
+    if operations:
+        await db.combats.bulk_write(operations, ordered=False)
+        arbitre_snapshots.invalider(aire["competition_id"], aire_id)
+        for categorie_id in categories_modifiees:
+            bracket_cache.invalider_categorie(categorie_id)
+
 @api_router.post("/combats/generer/{categorie_id}")
 async def generer_tableau(categorie_id: str, tatami_id: Optional[str] = None, user: User = Depends(require_admin)):
     """
     Génère l'arbre des combats pour une catégorie.
     
     Logique:
-    - Nombre pair: tous les combattants au même niveau
-    - Nombre impair: création de BYE pour équilibrer l'arbre
-    - L'arbre est ajusté à une puissance de 2 (2, 4, 8, 16...)
+    - L'arbre est ajusté à une puissance de 2 (2, 4, 8, 16, 32, 64...)
+    - Les places vides sont des BYE: le compétiteur passe directement au tour suivant
+    - Tous les combats sont créés en une seule écriture
     """
     # Récupérer la catégorie pour obtenir le competition_id
     categorie = await db.categories.find_one({"categorie_id": categorie_id}, {"_id": 0})
@@ -1402,406 +3133,231 @@ async def generer_tableau(categorie_id: str, tatami_id: Optional[str] = None, us
     
     competition_id = categorie.get("competition_id")
     
-    # Supprimer les anciens combats de cette catégorie
-    await db.combats.delete_many({"categorie_id": categorie_id})
-    await db.medailles.delete_many({"categorie_id": categorie_id})
-    
     # Récupérer les compétiteurs de la catégorie (uniquement ceux non disqualifiés)
     competiteurs = await db.competiteurs.find(
         {"categorie_id": categorie_id, "disqualifie": False},
-        {"_id": 0}
-    ).to_list(100)
+        {"_id": 0, "competiteur_id": 1}
+    ).to_list(None)
     
     if len(competiteurs) < 2:
         raise HTTPException(status_code=400, detail="Il faut au moins 2 compétiteurs pour générer un tableau")
     
     # Mélanger pour tirage au sort équitable
     random.shuffle(competiteurs)
-    
-    combats_created = []
     n = len(competiteurs)
     
-    # Calculer la taille de l'arbre (puissance de 2 supérieure ou égale)
-    def next_power_of_2(x):
-        return 1 if x == 0 else 2**(x - 1).bit_length()
-    
-    bracket_size = next_power_of_2(n)
-    num_byes = bracket_size - n
+    combats = construire_arbre(
+        [c["competiteur_id"] for c in competiteurs],
+        competition_id,
+        categorie_id,
+        tatami_id
+    )
+    combats_created = combats_en_documents(combats)
     
-    async def insert_combat(combat_obj):
-        """Helper to insert combat and return clean dict without _id"""
-        combat_dict = combat_obj.model_dump()
-        combat_dict["created_at"] = combat_dict["created_at"].isoformat()
-        await db.combats.insert_one(combat_dict)
+    # Remplacer les anciens combats de cette catégorie
+    anciens = await db.combats.find({"categorie_id": categorie_id}, {"_id": 0, "termine": 1, "est_finale": 1}).to_list(None)
+    await db.combats.delete_many({"categorie_id": categorie_id})
+    medailles = await db.medailles.delete_many({"categorie_id": categorie_id})
+    await db.combats.insert_many(combats_created)
+    for combat_dict in combats_created:
         combat_dict.pop("_id", None)
-        return combat_dict
-    
-    # Fonction pour créer l'arbre de façon récursive
-    async def create_bracket(participants, tour_name):
-        """
-        Crée les combats pour un niveau de l'arbre.
-        participants: liste de {"competiteur_id": ...} ou None pour BYE
-        """
-        if len(participants) == 1:
-            return participants[0]
-        
-        combats_tour = []
-        winners = []
-        
-        for i in range(0, len(participants), 2):
-            p1 = participants[i]
-            p2 = participants[i + 1] if i + 1 < len(participants) else None
-            
-            p1_id = p1.get("competiteur_id") if p1 else None
-            p2_id = p2.get("competiteur_id") if p2 else None
-            
-            # Déterminer le nom du tour en fonction de la taille
-            if len(participants) == 2:
-                actual_tour = "finale"
-            elif len(participants) <= 4:
-                actual_tour = "demi"
-            elif len(participants) <= 8:
-                actual_tour = "quart"
-            elif len(participants) <= 16:
-                actual_tour = "huitieme"
-            else:
-                actual_tour = f"tour_{len(participants)}"
-            
-            # Si un des deux est un BYE, l'autre passe directement
-            if p1_id is None:
-                winners.append(p2)
-                continue
-            elif p2_id is None:
-                winners.append(p1)
-                continue
-            
-            # Créer le combat
-            combat = Combat(
-                competition_id=competition_id,
-                categorie_id=categorie_id,
-                tatami_id=tatami_id,
-                tour=actual_tour,
-                position=len(combats_tour) + 1,
-                rouge_id=p1_id,
-                bleu_id=p2_id
-            )
-            combat_dict = await insert_combat(combat)
-            combats_created.append(combat_dict)
-            combats_tour.append(combat_dict)
-            
-            # Placeholder pour le vainqueur (sera rempli après le combat)
-            winners.append({"placeholder": combat_dict["combat_id"]})
-        
-        return winners
-    
-    # Cas simple: 2 combattants = finale directe
-    if n == 2:
-        combat = Combat(
-            competition_id=competition_id,
-            categorie_id=categorie_id,
-            tatami_id=tatami_id,
-            tour="finale",
-            position=1,
-            rouge_id=competiteurs[0]["competiteur_id"],
-            bleu_id=competiteurs[1]["competiteur_id"]
-        )
-        combat_dict = await insert_combat(combat)
-        combats_created.append(combat_dict)
-        
-    elif n == 3:
-        # Cas spécial: 2 en demi (1 avec BYE), puis finale
-        # Combat préliminaire: compétiteur 0 vs compétiteur 1
-        demi = Combat(
-            competition_id=competition_id,
-            categorie_id=categorie_id,
-            tatami_id=tatami_id,
-            tour="demi",
-            position=1,
-            rouge_id=competiteurs[0]["competiteur_id"],
-            bleu_id=competiteurs[1]["competiteur_id"]
-        )
-        demi_dict = await insert_combat(demi)
-        combats_created.append(demi_dict)
-        
-        # Finale: vainqueur demi vs compétiteur 2 (qui a un BYE)
-        finale = Combat(
-            competition_id=competition_id,
-            categorie_id=categorie_id,
-            tatami_id=tatami_id,
-            tour="finale",
-            position=1,
-            rouge_id=None,  # Vainqueur de la demi
-            bleu_id=competiteurs[2]["competiteur_id"]  # BYE direct en finale
-        )
-        finale_dict = await insert_combat(finale)
-        combats_created.append(finale_dict)
-        
-    elif n == 4:
-        # 2 demi-finales + finale + bronze
-        for i in range(2):
-            demi = Combat(
-                competition_id=competition_id,
-                categorie_id=categorie_id,
-                tatami_id=tatami_id,
-                tour="demi",
-                position=i + 1,
-                rouge_id=competiteurs[i*2]["competiteur_id"],
-                bleu_id=competiteurs[i*2 + 1]["competiteur_id"]
-            )
-            demi_dict = await insert_combat(demi)
-            combats_created.append(demi_dict)
-        
-        # Finale
-        finale = Combat(
-            competition_id=competition_id,
-            categorie_id=categorie_id,
-            tatami_id=tatami_id,
-            tour="finale",
-            position=1,
-            rouge_id=None,
-            bleu_id=None
-        )
-        finale_dict = await insert_combat(finale)
-        combats_created.append(finale_dict)
-        
-        # Match bronze
-        bronze = Combat(
-            competition_id=competition_id,
-            categorie_id=categorie_id,
-            tatami_id=tatami_id,
-            tour="bronze",
-            position=1,
-            rouge_id=None,
-            bleu_id=None
-        )
-        bronze_dict = await insert_combat(bronze)
-        combats_created.append(bronze_dict)
-        
-    elif n <= 8:
-        # 5, 6, 7 ou 8 combattants: quarts + demis + finale + bronze
-        # Avec BYE pour les places vides
-        
-        # Créer la liste avec BYE pour arriver à 8
-        participants = [c for c in competiteurs]
-        num_byes = 8 - n
-        
-        # Répartir les BYE équitablement (les mieux classés ont les BYE)
-        # Les BYE sont ajoutés à des positions stratégiques
-        padded = []
-        bye_positions = [1, 3, 5, 7][:num_byes]  # Positions des BYE (1-indexed, positions impaires)
-        
-        comp_idx = 0
-        for i in range(8):
-            if i in bye_positions:
-                padded.append(None)  # BYE
-            else:
-                if comp_idx < len(participants):
-                    padded.append(participants[comp_idx])
-                    comp_idx += 1
-                else:
-                    padded.append(None)
-        
-        # Quarts de finale (avec gestion des BYE)
-        quart_winners = []
-        for i in range(4):
-            p1 = padded[i*2]
-            p2 = padded[i*2 + 1]
-            
-            p1_id = p1["competiteur_id"] if p1 else None
-            p2_id = p2["competiteur_id"] if p2 else None
-            
-            # Si BYE, le combattant passe directement
-            if p1_id is None and p2_id:
-                quart_winners.append(p2_id)
-                continue
-            elif p2_id is None and p1_id:
-                quart_winners.append(p1_id)
-                continue
-            elif p1_id is None and p2_id is None:
-                quart_winners.append(None)
-                continue
-            
-            # Combat réel
-            quart = Combat(
-                competition_id=competition_id,
-                categorie_id=categorie_id,
-                tatami_id=tatami_id,
-                tour="quart",
-                position=i + 1,
-                rouge_id=p1_id,
-                bleu_id=p2_id
-            )
-            quart_dict = await insert_combat(quart)
-            combats_created.append(quart_dict)
-            quart_winners.append(None)  # Placeholder
-        
-        # Demi-finales
-        for i in range(2):
-            demi = Combat(
-                competition_id=competition_id,
-                categorie_id=categorie_id,
-                tatami_id=tatami_id,
-                tour="demi",
-                position=i + 1,
-                rouge_id=quart_winners[i*2] if isinstance(quart_winners[i*2], str) else None,
-                bleu_id=quart_winners[i*2 + 1] if isinstance(quart_winners[i*2 + 1], str) else None
-            )
-            demi_dict = await insert_combat(demi)
-            combats_created.append(demi_dict)
-        
-        # Finale
-        finale = Combat(
-            competition_id=competition_id,
-            categorie_id=categorie_id,
-            tatami_id=tatami_id,
-            tour="finale",
-            position=1,
-            rouge_id=None,
-            bleu_id=None
-        )
-        finale_dict = await insert_combat(finale)
-        combats_created.append(finale_dict)
-        
-        # Match bronze
-        bronze = Combat(
-            competition_id=competition_id,
-            categorie_id=categorie_id,
-            tatami_id=tatami_id,
-            tour="bronze",
-            position=1,
-            rouge_id=None,
-            bleu_id=None
-        )
-        bronze_dict = await insert_combat(bronze)
-        combats_created.append(bronze_dict)
-        
-    else:
-        # Plus de 8: on limite à 16 pour simplifier
-        competiteurs = competiteurs[:16]
-        n = len(competiteurs)
-        
-        # Créer la liste avec BYE pour arriver à 16
-        num_byes = 16 - n
-        padded = []
-        bye_positions = list(range(1, 16, 2))[:num_byes]  # Positions impaires
-        
-        comp_idx = 0
-        for i in range(16):
-            if i in bye_positions:
-                padded.append(None)
-            else:
-                if comp_idx < len(competiteurs):
-                    padded.append(competiteurs[comp_idx])
-                    comp_idx += 1
-                else:
-                    padded.append(None)
-        
-        # Huitièmes de finale
-        huitieme_winners = []
-        for i in range(8):
-            p1 = padded[i*2]
-            p2 = padded[i*2 + 1]
-            
-            p1_id = p1["competiteur_id"] if p1 else None
-            p2_id = p2["competiteur_id"] if p2 else None
-            
-            if p1_id is None and p2_id:
-                huitieme_winners.append(p2_id)
-                continue
-            elif p2_id is None and p1_id:
-                huitieme_winners.append(p1_id)
-                continue
-            elif p1_id is None and p2_id is None:
-                huitieme_winners.append(None)
-                continue
-            
-            huitieme = Combat(
-                competition_id=competition_id,
-                categorie_id=categorie_id,
-                tatami_id=tatami_id,
-                tour="huitieme",
-                position=i + 1,
-                rouge_id=p1_id,
-                bleu_id=p2_id
-            )
-            huitieme_dict = await insert_combat(huitieme)
-            combats_created.append(huitieme_dict)
-            huitieme_winners.append(None)
-        
-        # Quarts de finale
-        for i in range(4):
-            quart = Combat(
-                competition_id=competition_id,
-                categorie_id=categorie_id,
-                tatami_id=tatami_id,
-                tour="quart",
-                position=i + 1,
-                rouge_id=huitieme_winners[i*2] if isinstance(huitieme_winners[i*2], str) else None,
-                bleu_id=huitieme_winners[i*2 + 1] if isinstance(huitieme_winners[i*2 + 1], str) else None
-            )
-            quart_dict = await insert_combat(quart)
-            combats_created.append(quart_dict)
-        
-        # Demi-finales
-        for i in range(2):
-            demi = Combat(
-                competition_id=competition_id,
-                categorie_id=categorie_id,
-                tatami_id=tatami_id,
-                tour="demi",
-                position=i + 1,
-                rouge_id=None,
-                bleu_id=None
-            )
-            demi_dict = await insert_combat(demi)
-            combats_created.append(demi_dict)
-        
-        # Finale
-        finale = Combat(
-            competition_id=competition_id,
-            categorie_id=categorie_id,
-            tatami_id=tatami_id,
-            tour="finale",
-            position=1,
-            rouge_id=None,
-            bleu_id=None
-        )
-        finale_dict = await insert_combat(finale)
-        combats_created.append(finale_dict)
-        
-        # Match bronze
-        bronze = Combat(
-            competition_id=competition_id,
-            categorie_id=categorie_id,
-            tatami_id=tatami_id,
-            tour="bronze",
-            position=1,
-            rouge_id=None,
-            bleu_id=None
-        )
-        bronze_dict = await insert_combat(bronze)
-        combats_created.append(bronze_dict)
+    await incrementer_compteurs(
+        competition_id, medailles=-medailles.deleted_count, **ecart_combats(anciens, combats_created)
+    )
     
     # Mettre à jour le nombre de combattants dans la catégorie
     await db.categories.update_one(
         {"categorie_id": categorie_id},
         {"$set": {"nb_combattants": n, "arbre_genere": True}}
     )
+    live_feed.publish(competition_id, None, {"type": "resync"})
     
     return {
         "message": f"Tableau généré avec {len(combats_created)} combats pour {n} combattants",
         "combats": combats_created,
         "nb_combattants": n,
-        "nb_byes": bracket_size - n
+        "nb_byes": nombre_byes(n)
     }
 
+@api_router.post("/combats/generer-tout/{competition_id}")
+async def generer_tous_les_tableaux(
+    competition_id: str,
+    ignorer_existants: bool = False,
+    user: User = Depends(require_admin)
+):
+    """
+    Génère les arbres de toutes les catégories d'une compétition en une fois.
+    Les compétiteurs sont lus en une requête et regroupés en mémoire; les
+    combats sont écrits avec quelques opérations groupées.
+    Une catégorie dont un combat a déjà été lancé n'est jamais regénérée ici
+    (voir generer_tableau pour forcer une catégorie).
+    ignorer_existants: ne pas regénérer les catégories dont l'arbre existe déjà
+    """
+    from pymongo import UpdateOne
+    
+    competition = await db.competitions.find_one({"competition_id": competition_id}, {"_id": 0, "competition_id": 1})
+    if not competition:
+        raise HTTPException(status_code=404, detail="Compétition non trouvée")
+    
+    categories, competiteurs, commencees = await asyncio.gather(
+        db.categories.find(
+            {"competition_id": competition_id},
+            {"_id": 0, "categorie_id": 1, "nom": 1, "arbre_genere": 1}
+        ).to_list(None),
+        db.competiteurs.find(
+            {"competition_id": competition_id, "disqualifie": False, "categorie_id": {"$ne": None}},
+            {"_id": 0, "competiteur_id": 1, "categorie_id": 1}
+        ).to_list(None),
+        db.combats.distinct(
+            "categorie_id",
+            {"competition_id": competition_id, "statut": {"$in": ["en_cours", "termine", "non_dispute"]}}
+        )
+    )
+    commencees = set(commencees)
+    
+    # Regrouper les compétiteurs par catégorie
+    par_categorie = {}
+    for comp in competiteurs:
+        par_categorie.setdefault(comp["categorie_id"], []).append(comp["competiteur_id"])
+    
+    resume = []
+    documents = []
+    categories_generees = []
+    for categorie in categories:
+        categorie_id = categorie["categorie_id"]
+        ids = par_categorie.get(categorie_id, [])
+        ligne = {"categorie_id": categorie_id, "nom": categorie["nom"], "nb_combattants": len(ids)}
+        
+        if ignorer_existants and categorie.get("arbre_genere"):
+            resume.append({**ligne, "statut": "ignoree", "raison": "Arbre déjà généré"})
+            continue
+        if categorie_id in commencees:
+            resume.append({**ligne, "statut": "ignoree", "raison": "Combats déjà commencés"})
+            continue
+        if len(ids) < 2:
+            resume.append({**ligne, "statut": "ignoree", "raison": "Moins de 2 compétiteurs"})
+            continue
+        
+        # Tirage au sort équitable
+        random.shuffle(ids)
+        combats = combats_en_documents(construire_arbre(ids, competition_id, categorie_id))
+        documents.extend(combats)
+        categories_generees.append((categorie_id, len(ids)))
+        resume.append({
+            **ligne,
+            "statut": "generee",
+            "nb_combats": len(combats),
+            "nb_byes": nombre_byes(len(ids))
+        })
+    
+    if categories_generees:
+        ids_generes = [categorie_id for categorie_id, _ in categories_generees]
+        anciens = await db.combats.find(
+            {"categorie_id": {"$in": ids_generes}},
+            {"_id": 0, "termine": 1, "est_finale": 1}
+        ).to_list(None)
+        await db.combats.delete_many({"categorie_id": {"$in": ids_generes}})
+        medailles = await db.medailles.delete_many({"categorie_id": {"$in": ids_generes}})
+        await db.combats.insert_many(documents, ordered=False)
+        await incrementer_compteurs(
+            competition_id, medailles=-medailles.deleted_count, **ecart_combats(anciens, documents)
+        )
+        await db.categories.bulk_write([
+            UpdateOne(
+                {"categorie_id": categorie_id},
+                {"$set": {"nb_combattants": n, "arbre_genere": True}}
+            )
+            for categorie_id, n in categories_generees
+        ], ordered=False)
+        live_feed.publish(competition_id, None, {"type": "resync"})
+    
+    return {
+        "message": f"{len(categories_generees)} tableau(x) généré(s), {len(documents)} combats",
+        "categories_generees": len(categories_generees),
+        "total_combats": len(documents),
+        "categories": resume
+    }
+
+def filtre_version(combat: dict) -> dict:
+    """Condition sur la version lue (les combats créés avant son introduction n'en ont pas)"""
+    version = combat.get("version")
+    return {"version": version} if version is not None else {"version": {"$exists": False}}
+
+def deja_enregistre(combat: dict, cle: Optional[str]) -> bool:
+    """Vrai si la saisie portant cette clé d'idempotence a déjà été appliquée"""
+    return bool(cle) and combat.get("resultat_cle") == cle
+
+async def appliquer_resultat(
+    combat: dict,
+    conditions: dict,
+    champs: dict,
+    cle: Optional[str] = None,
+    version_attendue: Optional[int] = None
+) -> tuple:
+    """
+    Écrit un résultat en une seule mise à jour conditionnelle: le combat doit encore
+    satisfaire `conditions` et porter la version lue. Une seule saisie concurrente
+    peut donc réussir; elle seule déclenche la propagation.
+    Retourne (combat mis à jour, appliqué). Une reprise avec la même clé
+    d'idempotence renvoie le combat sans rien réécrire; tout autre conflit lève une 409.
+    """
+    if version_attendue is not None and version_attendue != combat.get("version", 0):
+        raise HTTPException(status_code=409, detail="Le combat a été modifié entre-temps, rechargez-le")
+    
+    champs = {**champs, "resultat_cle": cle}
+    if not combat.get("termine"):
+        champs["heure_fin_reelle"] = datetime.now(timezone.utc).isoformat()
+    avant = await db.combats.find_one_and_update(
+        {"combat_id": combat["combat_id"], **conditions, **filtre_version(combat)},
+        {"$set": champs, "$inc": {"version": 1}},
+        {"_id": 0}
+    )
+    if avant:
+        apres = {**avant, **champs, "version": avant.get("version", 0) + 1}
+        await incrementer_compteurs(avant.get("competition_id"), **ecart_combats([avant], [apres]))
+        return apres, True
+    
+    actuel = await db.combats.find_one({"combat_id": combat["combat_id"]}, {"_id": 0})
+    if actuel and deja_enregistre(actuel, cle):
+        return actuel, False
+    raise HTTPException(status_code=409, detail="Le combat a été modifié entre-temps, rechargez-le")
+
 @api_router.put("/combats/{combat_id}/resultat")
-async def saisir_resultat(combat_id: str, data: CombatResultat, user: User = Depends(require_admin)):
-    """Saisir ou modifier le résultat d'un combat"""
+async def saisir_resultat(
+    combat_id: str,
+    data: CombatResultat,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
+    user: User = Depends(require_admin)
+):
+    """
+    Saisir ou modifier le résultat d'un combat.
+    Écriture atomique: deux saisies simultanées ne peuvent pas être appliquées
+    toutes les deux (la seconde reçoit une 409, ou le combat si elle porte la même Idempotency-Key).
+    """
     combat = await db.combats.find_one({"combat_id": combat_id}, {"_id": 0})
     if not combat:
         raise HTTPException(status_code=404, detail="Combat non trouvé")
     
+    if deja_enregistre(combat, idempotency_key):
+        return combat
+    
+    updated, applique = await appliquer_resultat(
+        combat,
+        {},
+        {
+            "vainqueur_id": data.vainqueur_id,
+            "score_rouge": data.score_rouge,
+            "score_bleu": data.score_bleu,
+            "type_victoire": data.type_victoire,
+            "termine": True,
+            "statut": "termine"
+        },
+        idempotency_key,
+        data.version
+    )
+    if not applique:
+        return updated
+    
     # Sauvegarder dans l'historique si modification
     if combat.get("termine"):
         historique = HistoriqueResultat(
@@ -1826,79 +3382,80 @@ async def saisir_resultat(combat_id: str, data: CombatResultat, user: User = Dep
             {"$set": {"disqualifie": True}}
         )
     
-    # Mettre à jour le combat
-    await db.combats.update_one(
-        {"combat_id": combat_id},
-        {"$set": {
-            "vainqueur_id": data.vainqueur_id,
-            "score_rouge": data.score_rouge,
-            "score_bleu": data.score_bleu,
-            "type_victoire": data.type_victoire,
-            "termine": True,
-            "statut": "termine"
-        }}
+    publier_combat(
+        "resultat", combat,
+        vainqueur_id=data.vainqueur_id,
+        score_rouge=data.score_rouge,
+        score_bleu=data.score_bleu,
+        type_victoire=data.type_victoire,
+        termine=True,
+        statut="termine",
+        version=updated["version"]
     )
     
-    # Propager le vainqueur au tour suivant
-    await propager_vainqueur(combat, data.vainqueur_id)
+    # Propager le vainqueur au tour suivant (et le perdant au bronze sauf disqualification)
+    await propager_vainqueur(combat, data.vainqueur_id, qualifier_perdant=data.type_victoire != "disqualification")
+    await enregistrer_duree_observee(combat, updated.get("heure_fin_reelle"))
+    await replanifier_aire(combat.get("aire_id"))
     
-    updated = await db.combats.find_one({"combat_id": combat_id}, {"_id": 0})
     return updated
 
-async def propager_vainqueur(combat: dict, vainqueur_id: str):
-    """Propage le vainqueur au combat suivant"""
-    categorie_id = combat["categorie_id"]
-    tour = combat["tour"]
-    position = combat["position"]
+def cibles_propagation(combat: dict) -> tuple:
+    """
+    Filtres et couleurs des combats qui reçoivent le vainqueur et le perdant.
+    Utilise les pointeurs précalculés; pour les combats générés avant leur
+    introduction, les retrouve par catégorie, tour et position.
+    """
+    if combat.get("next_combat_id") or combat.get("loser_next_combat_id"):
+        vainqueur = (
+            ({"combat_id": combat["next_combat_id"]}, combat["next_slot"])
+            if combat.get("next_combat_id") else None
+        )
+        perdant = (
+            ({"combat_id": combat["loser_next_combat_id"]}, combat["loser_slot"])
+            if combat.get("loser_next_combat_id") else None
+        )
+        return vainqueur, perdant
     
-    # Trouver le perdant pour le match bronze
+    places = places_tour(combat["tour"])
+    position = combat["position"]
+    slot = "rouge" if position % 2 == 1 else "bleu"
+    if not places or places <= 2:
+        return None, None
+    vainqueur = ({
+        "categorie_id": combat["categorie_id"],
+        "tour": nom_tour(places // 2),
+        "position": (position + 1) // 2
+    }, slot)
+    perdant = None
+    if combat["tour"] == "demi":
+        perdant = ({"categorie_id": combat["categorie_id"], "tour": "bronze"}, slot)
+    return vainqueur, perdant
+
+async def propager_vainqueur(combat: dict, vainqueur_id: str, qualifier_perdant: bool = True):
+    """
+    Qualifie le vainqueur pour le combat suivant et, pour les demi-finales,
+    le perdant pour le match bronze (sauf disqualification).
+    Une seule écriture ciblée par combat mis à jour, quelle que soit la taille de l'arbre.
+    """
     perdant_id = combat["rouge_id"] if vainqueur_id == combat["bleu_id"] else combat["bleu_id"]
-    
-    if tour == "quart":
-        # Vers demi-finale
-        demi_position = (position + 1) // 2
-        demi = await db.combats.find_one({
-            "categorie_id": categorie_id,
-            "tour": "demi",
-            "position": demi_position
-        }, {"_id": 0})
-        
-        if demi:
-            field = "rouge_id" if position % 2 == 1 else "bleu_id"
-            await db.combats.update_one(
-                {"combat_id": demi["combat_id"]},
-                {"$set": {field: vainqueur_id}}
-            )
-    
-    elif tour == "demi":
-        # Vers finale
-        finale = await db.combats.find_one({
-            "categorie_id": categorie_id,
-            "tour": "finale"
-        }, {"_id": 0})
-        
-        if finale:
-            field = "rouge_id" if position == 1 else "bleu_id"
-            await db.combats.update_one(
-                {"combat_id": finale["combat_id"]},
-                {"$set": {field: vainqueur_id}}
-            )
-        
-        # Vers match bronze (perdant)
-        bronze = await db.combats.find_one({
-            "categorie_id": categorie_id,
-            "tour": "bronze"
-        }, {"_id": 0})
-        
-        if bronze and perdant_id:
-            # Vérifier si le perdant n'est pas disqualifié
-            perdant = await db.competiteurs.find_one({"competiteur_id": perdant_id}, {"_id": 0})
-            if perdant and not perdant.get("disqualifie"):
-                field = "rouge_id" if position == 1 else "bleu_id"
-                await db.combats.update_one(
-                    {"combat_id": bronze["combat_id"]},
-                    {"$set": {field: perdant_id}}
-                )
+    cible_vainqueur, cible_perdant = cibles_propagation(combat)
+    
+    qualifications = []
+    if cible_vainqueur and vainqueur_id:
+        qualifications.append((cible_vainqueur, vainqueur_id))
+    if cible_perdant and perdant_id and qualifier_perdant:
+        qualifications.append((cible_perdant, perdant_id))
+    
+    for (filtre, slot), competiteur_id in qualifications:
+        field = f"{slot}_id"
+        suivant = await db.combats.find_one_and_update(
+            filtre,
+            {"$set": {field: competiteur_id}, "$inc": {"version": 1}},
+            {"_id": 0, "combat_id": 1, "competition_id": 1, "aire_id": 1, "categorie_id": 1}
+        )
+        if suivant:
+            publier_combat("combat_mis_a_jour", suivant, **{field: competiteur_id})
 
 @api_router.post("/combats/{categorie_id}/attribuer-medailles")
 async def attribuer_medailles(categorie_id: str, user: User = Depends(require_admin)):
@@ -1973,6 +3530,7 @@ async def attribuer_medailles(categorie_id: str, user: User = Depends(require_ad
                     await db.medailles.insert_one(bronze_medaille.model_dump())
                     medailles.append(bronze_medaille.model_dump())
     
+    await incrementer_compteurs(finale.get("competition_id"), medailles=len(medailles))
     return {"message": f"{len(medailles)} médailles attribuées", "medailles": medailles}
 
 @api_router.put("/combats/{combat_id}/statut")
@@ -1981,67 +3539,143 @@ async def modifier_statut_combat(combat_id: str, statut: str, user: User = Depen
     if statut not in ["a_venir", "en_cours", "termine", "non_dispute"]:
         raise HTTPException(status_code=400, detail="Statut invalide")
     
-    result = await db.combats.update_one(
+    update_data = {"statut": statut, "termine": statut in ["termine", "non_dispute"]}
+    if statut == "en_cours":
+        update_data.update(champs_lancement())
+    # Nouvelle version: une saisie faite sur l'état précédent est refusée.
+    # Un combat rouvert oublie la clé de sa dernière saisie, qui pourra être refaite
+    modification = {"$set": update_data, "$inc": {"version": 1}}
+    if not update_data["termine"]:
+        modification["$unset"] = {"resultat_cle": ""}
+    
+    combat = await db.combats.find_one_and_update(
         {"combat_id": combat_id},
-        {"$set": {"statut": statut, "termine": statut in ["termine", "non_dispute"]}}
+        modification,
+        {"_id": 0, "combat_id": 1, "competition_id": 1, "aire_id": 1, "categorie_id": 1, "termine": 1, "est_finale": 1,
+         "version": 1}
     )
     
-    if result.matched_count == 0:
+    if not combat:
         raise HTTPException(status_code=404, detail="Combat non trouvé")
     
+    await incrementer_compteurs(combat.get("competition_id"), **ecart_combats([combat], [{**combat, **update_data}]))
+    publier_combat("combat_mis_a_jour", combat, version=combat.get("version", 0) + 1, **update_data)
+    await replanifier_aire(combat.get("aire_id"))
+    
     return {"message": "Statut mis à jour"}
 
+@api_router.post("/competitions/{competition_id}/planifier")
+async def planifier_competition(competition_id: str, data: PlanificationCompetition, user: User = Depends(require_admin)):
+    """
+    Calcule l'horaire de toute la compétition, aire par aire, dans l'ordre des
+    files (voir repartir_combats_sur_aires): enchaînement des tours, repos,
+    pauses et bloc des finales. Les paramètres sont conservés sur la compétition
+    pour les recalculs incrémentaux après chaque résultat ou réordonnancement.
+    """
+    from pymongo import UpdateOne
+    
+    competition = await db.competitions.find_one({"competition_id": competition_id}, {"_id": 0})
+    if not competition:
+        raise HTTPException(status_code=404, detail="Compétition non trouvée")
+    
+    parametres = data.model_dump()
+    parametres["heure_debut"] = data.heure_debut or competition.get("heure_debut", "09:00")
+    try:
+        debut = heure_en_minutes(parametres["heure_debut"])
+        for heure in [p.debut for p in data.pauses] + ([data.heure_finales] if data.heure_finales else []):
+            heure_en_minutes(heure)
+    except (ValueError, AttributeError):
+        raise HTTPException(status_code=400, detail="Format d'heure invalide (HH:MM)")
+    
+    aires, combats = await asyncio.gather(
+        db.aires_combat.find({"competition_id": competition_id}, {"_id": 0}).sort("numero", 1).to_list(None),
+        db.combats.find({"competition_id": competition_id, "termine": False}, {"_id": 0}).to_list(None)
+    )
+    files = {a["aire_id"]: [] for a in aires if a.get("statut", "active") == "active"}
+    non_assignes = 0
+    for combat in combats:
+        if combat.get("aire_id") in files:
+            files[combat["aire_id"]].append(combat)
+        else:
+            non_assignes += 1
+    if not any(files.values()):
+        raise HTTPException(status_code=400, detail="Aucun combat assigné à une aire active: répartissez d'abord les combats")
+    for file in files.values():
+        file.sort(key=lambda c: (c.get("est_finale", False), c.get("ordre", 0)))
+    
+    horaires, debut_finales, fins = calculer_horaires(files, dict.fromkeys(files, debut), parametres)
+    parametres["debut_finales"] = minutes_en_heure(debut_finales)
+    
+    champs_duree = {"duree_minutes": data.duree_combat_minutes} if data.duree_combat_minutes else {}
+    await db.combats.bulk_write([
+        UpdateOne(
+            {"combat_id": combat_id},
+            {"$set": {"heure_debut": minutes_en_heure(minute), **champs_duree}}
+        )
+        for combat_id, minute in horaires.items()
+    ], ordered=False)
+    await db.competitions.update_one(
+        {"competition_id": competition_id},
+        {"$set": {"planification": parametres}}
+    )
+    live_feed.publish(competition_id, None, {"type": "resync"})
+    
+    fin = max(fins.values(), default=debut)
+    return {
+        "message": f"{len(horaires)} combats planifiés sur {len(files)} aire(s)",
+        "heure_fin_estimee": minutes_en_heure(fin),
+        "debut_finales": parametres["debut_finales"],
+        "fin_par_aire": {aire_id: minutes_en_heure(minute) for aire_id, minute in fins.items()},
+        "combats_non_assignes": non_assignes
+    }
+
 @api_router.post("/combats/planifier/{categorie_id}")
 async def planifier_combats(categorie_id: str, data: PlanificationCreate, user: User = Depends(require_admin)):
-    """Planifier les horaires des combats d'une catégorie"""
+    """
+    Planifier les horaires des combats d'une seule catégorie, à la suite.
+    Pour planifier toutes les aires sans collision, utiliser /competitions/{competition_id}/planifier.
+    """
+    from pymongo import UpdateOne
+    
     combats = await db.combats.find(
         {"categorie_id": categorie_id},
         {"_id": 0}
-    ).sort([("tour", 1), ("position", 1)]).to_list(100)
+    ).to_list(None)
     
     if not combats:
         raise HTTPException(status_code=404, detail="Aucun combat trouvé")
     
-    # Définir l'ordre des tours
-    tour_ordre = {"quart": 1, "demi": 2, "bronze": 3, "finale": 4}
-    combats_sorted = sorted(combats, key=lambda x: (tour_ordre.get(x["tour"], 99), x["position"]))
+    # Ordre des tours: premiers tours d'abord, bronze puis finale
+    combats_sorted = sorted(combats, key=lambda x: (rang_tour(x["tour"]), x["position"]))
     
     # Parser l'heure de début
     try:
-        heure_parts = data.heure_debut_competition.split(":")
-        current_hour = int(heure_parts[0])
-        current_minute = int(heure_parts[1])
-    except:
+        current = heure_en_minutes(data.heure_debut_competition)
+    except (ValueError, AttributeError):
         raise HTTPException(status_code=400, detail="Format d'heure invalide (HH:MM)")
     
     # Planifier chaque combat
     pauses_dict = {p.get("apres_combat", 0): p.get("duree_minutes", 15) for p in data.pauses}
     
+    operations = []
     for i, combat in enumerate(combats_sorted):
-        heure = f"{current_hour:02d}:{current_minute:02d}"
-        
-        await db.combats.update_one(
+        operations.append(UpdateOne(
             {"combat_id": combat["combat_id"]},
             {"$set": {
                 "ordre": i + 1,
-                "heure_debut": heure,
+                "heure_debut": minutes_en_heure(current),
                 "duree_minutes": data.duree_combat_minutes
             }}
-        )
-        
-        # Ajouter la durée du combat
-        current_minute += data.duree_combat_minutes
-        
-        # Ajouter une pause si définie
-        if (i + 1) in pauses_dict:
-            current_minute += pauses_dict[i + 1]
+        ))
         
-        # Gérer le dépassement d'heure
-        while current_minute >= 60:
-            current_minute -= 60
-            current_hour += 1
+        # Ajouter la durée du combat, et une pause si définie
+        current += data.duree_combat_minutes
+        current += pauses_dict.get(i + 1, 0)
     
-    return {"message": f"{len(combats_sorted)} combats planifiés", "heure_fin_estimee": f"{current_hour:02d}:{current_minute:02d}"}
+    await db.combats.bulk_write(operations, ordered=False)
+    live_feed.publish(combats[0].get("competition_id"), None, {"type": "resync"})
+    
+    return {"message": f"{len(combats_sorted)} combats planifiés", "heure_fin_estimee": minutes_en_heure(current)}
 
 @api_router.put("/combats/modifier-ordre")
 async def modifier_ordre_combat(data: ModifierOrdreCombat, user: User = Depends(require_admin)):
@@ -2058,6 +3692,7 @@ async def modifier_ordre_combat(data: ModifierOrdreCombat, user: User = Depends(
         {"combat_id": data.combat_id},
         {"$set": update_data}
     )
+    publier_combat("combat_mis_a_jour", combat, **update_data)
     
     return {"message": "Ordre mis à jour"}
 
@@ -2078,95 +3713,190 @@ async def lancer_categorie(categorie_id: str, mode: str = "complet", user: User
     premier_combat = await db.combats.find_one(query, {"_id": 0}, sort=[("ordre", 1)])
     
     if premier_combat:
+        lancement = champs_lancement()
         await db.combats.update_one(
             {"combat_id": premier_combat["combat_id"]},
-            {"$set": {"statut": "en_cours"}}
+            {"$set": lancement}
         )
+        publier_combat("combat_lance", premier_combat, **lancement)
+        await replanifier_aire(premier_combat.get("aire_id"))
         return {"message": f"Catégorie lancée en mode {mode}", "premier_combat": premier_combat["combat_id"]}
     
     return {"message": "Aucun combat à lancer"}
 
+async def demarrer_prochain_combat(
+    competition_id: str,
+    aire_id: Optional[str],
+    finales: Optional[bool] = None
+) -> Optional[dict]:
+    """
+    Retire la tête de la file d'une aire et la passe en cours en une seule écriture.
+    File: combats à venir de la compétition sur l'aire, réguliers avant finales puis
+    par ordre (index competition_id, aire_id, statut, est_finale, ordre). Seuls les
+    combats dont les deux combattants sont connus peuvent partir. Deux appels
+    simultanés ne peuvent pas lancer le même combat.
+    finales: limiter la file aux finales (True) ou aux combats réguliers (False)
+    """
+    query = {
+        "competition_id": competition_id,
+        "aire_id": aire_id,
+        "statut": "a_venir",
+        "rouge_id": {"$ne": None},
+        "bleu_id": {"$ne": None}
+    }
+    if finales is not None:
+        query["est_finale"] = finales
+    
+    lancement = champs_lancement()
+    # Document d'avant la mise à jour, complété localement
+    avant = await db.combats.find_one_and_update(
+        query,
+        {"$set": lancement},
+        {"_id": 0},
+        sort=[("est_finale", 1), ("ordre", 1)]
+    )
+    if not avant:
+        return None
+    
+    publier_combat("combat_lance", avant, **lancement)
+    await replanifier_aire(aire_id)
+    return {**avant, **lancement}
+
 @api_router.post("/combats/lancer-finales")
-async def lancer_finales(user: User = Depends(require_admin)):
-    """Lancer toutes les finales de toutes les catégories"""
-    finales = await db.combats.find(
-        {"tour": {"$in": ["finale", "bronze"]}, "statut": "a_venir"},
-        {"_id": 0}
-    ).sort("ordre", 1).to_list(100)
+async def lancer_finales(competition_id: str, user: User = Depends(require_admin)):
+    """Lancer les finales d'une compétition: la première finale de chaque aire libre part"""
+    aires, occupees = await asyncio.gather(
+        db.aires_combat.find(
+            {"competition_id": competition_id},
+            {"_id": 0, "aire_id": 1, "statut": 1}
+        ).sort("numero", 1).to_list(None),
+        db.combats.distinct("aire_id", {"competition_id": competition_id, "statut": "en_cours"})
+    )
     
-    if finales:
-        # Mettre la première finale en cours
-        await db.combats.update_one(
-            {"combat_id": finales[0]["combat_id"]},
-            {"$set": {"statut": "en_cours"}}
-        )
-        return {"message": f"{len(finales)} finales prêtes à être lancées", "premiere_finale": finales[0]["combat_id"]}
+    lancees = []
+    for aire in aires:
+        # Les aires en pause, hors service ou occupées ne reçoivent pas de finale
+        if aire.get("statut", "active") != "active" or aire["aire_id"] in occupees:
+            continue
+        finale = await demarrer_prochain_combat(competition_id, aire["aire_id"], finales=True)
+        if finale:
+            lancees.append(finale["combat_id"])
+    
+    if lancees:
+        return {
+            "message": f"{len(lancees)} finale(s) lancée(s)",
+            "premiere_finale": lancees[0],
+            "finales_lancees": lancees
+        }
     
     return {"message": "Aucune finale à lancer"}
 
 @api_router.post("/combats/{combat_id}/suivant")
 async def passer_combat_suivant(combat_id: str, user: User = Depends(require_admin)):
-    """Terminer le combat actuel et passer au suivant"""
-    combat = await db.combats.find_one({"combat_id": combat_id}, {"_id": 0})
+    """Terminer le combat actuel et passer au suivant (tête de la file de son aire)"""
+    combat = await db.combats.find_one(
+        {"combat_id": combat_id},
+        {"_id": 0, "competition_id": 1, "aire_id": 1}
+    )
     if not combat:
         raise HTTPException(status_code=404, detail="Combat non trouvé")
     
-    # Trouver le prochain combat
-    prochain = await db.combats.find_one(
-        {"ordre": {"$gt": combat.get("ordre", 0)}, "statut": "a_venir"},
-        {"_id": 0},
-        sort=[("ordre", 1)]
-    )
-    
+    prochain = await demarrer_prochain_combat(combat["competition_id"], combat.get("aire_id"))
     if prochain:
-        await db.combats.update_one(
-            {"combat_id": prochain["combat_id"]},
-            {"$set": {"statut": "en_cours"}}
-        )
         return {"message": "Combat suivant lancé", "combat_id": prochain["combat_id"]}
     
     return {"message": "Plus de combat à suivre"}
 
 # ============ MEDAILLES ENDPOINTS ============
 
-@api_router.get("/medailles", response_model=List[Medaille])
-async def list_medailles(categorie_id: Optional[str] = None, user: User = Depends(get_current_user)):
+@api_router.get("/medailles", responses=reponses_liste(Medaille))
+async def list_medailles(
+    request: Request,
+    response: Response,
+    categorie_id: Optional[str] = None,
+    competition_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=5000),
+    user: User = Depends(get_current_user)
+):
+    """
+    Liste les médailles d'une catégorie ou d'une compétition.
+    Pagination par curseur (limit / X-Next-Cursor) et flux NDJSON: voir repondre_liste.
+    """
     query = {}
     if categorie_id:
         query["categorie_id"] = categorie_id
+    elif competition_id:
+        # Les médailles ne portent que leur catégorie
+        query["categorie_id"] = {"$in": await db.categories.distinct("categorie_id", {"competition_id": competition_id})}
     
-    medailles = await db.medailles.find(query, {"_id": 0}).to_list(1000)
-    return medailles
+    # Or, argent puis bronze dans chaque catégorie
+    tri = [("categorie_id", 1), ("rang", 1), ("medaille_id", 1)]
+    return await repondre_liste(request, response, db.medailles, query, {"_id": 0}, tri, cursor, limit)
 
 # ============ HISTORIQUE ENDPOINTS ============
 
-@api_router.get("/historique", response_model=List[HistoriqueResultat])
-async def list_historique(combat_id: Optional[str] = None, user: User = Depends(get_current_user)):
+@api_router.get("/historique", responses=reponses_liste(HistoriqueResultat))
+async def list_historique(
+    request: Request,
+    response: Response,
+    combat_id: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = Query(None, ge=1, le=5000),
+    user: User = Depends(get_current_user)
+):
+    """
+    Historique des modifications de résultats.
+    Pagination par curseur (limit / X-Next-Cursor) et flux NDJSON: voir repondre_liste.
+    """
     query = {}
     if combat_id:
         query["combat_id"] = combat_id
     
-    historique = await db.historique_resultats.find(query, {"_id": 0}).to_list(1000)
-    return historique
+    # Ordre chronologique (modifie_at est une date ISO, triable comme texte)
+    tri = [("modifie_at", 1), ("historique_id", 1)]
+    return await repondre_liste(request, response, db.historique_resultats, query, {"_id": 0}, tri, cursor, limit)
 
 # ============ STATS ENDPOINTS ============
 
 @api_router.get("/stats")
-async def get_stats(user: User = Depends(get_current_user)):
-    competiteurs_count = await db.competiteurs.count_documents({})
-    categories_count = await db.categories.count_documents({})
-    combats_count = await db.combats.count_documents({})
-    combats_termines = await db.combats.count_documents({"termine": True})
-    medailles_count = await db.medailles.count_documents({})
-    tatamis_count = await db.tatamis.count_documents({})
+async def get_stats(competition_id: Optional[str] = None, user: User = Depends(get_current_user)):
+    """
+    Statistiques d'une compétition, ou de toutes les compétitions sans competition_id.
+    Lues depuis les compteurs matérialisés (aucun comptage de collection).
+    """
+    if competition_id:
+        competition = await db.competitions.find_one(
+            {"competition_id": competition_id},
+            {"_id": 0, "competition_id": 1, "compteurs": 1}
+        )
+        if not competition:
+            raise HTTPException(status_code=404, detail="Compétition non trouvée")
+        compteurs = await lire_compteurs(competition)
+    else:
+        totaux = await db.competitions.aggregate([
+            {"$group": {"_id": None, **{cle: {"$sum": f"$compteurs.{cle}"} for cle in COMPTEURS_COMPETITION}}}
+        ]).to_list(1)
+        compteurs = {**compteurs_vides(), **(totaux[0] if totaux else {})}
     
     return {
-        "competiteurs": competiteurs_count,
-        "categories": categories_count,
-        "combats_total": combats_count,
-        "combats_termines": combats_termines,
-        "medailles": medailles_count,
-        "tatamis": tatamis_count
+        "competiteurs": compteurs["competiteurs"],
+        "competiteurs_peses": compteurs["competiteurs_peses"],
+        "categories": compteurs["categories"],
+        "combats_total": compteurs["combats"],
+        "combats_termines": compteurs["combats_termines"],
+        "medailles": compteurs["medailles"],
+        "tatamis": compteurs["tatamis"],
+        **etat_finales(compteurs)
+    }
+
+@api_router.get("/stats/cache")
+async def get_cache_stats(admin: User = Depends(require_admin)):
+    """Compteurs des caches en mémoire (sessions, vues arbitre, arbres)"""
+    return {
+        "sessions": session_cache.stats(),
+        "arbitre": arbitre_snapshots.stats(),
+        "arbres": bracket_cache.stats()
     }
 
 # ============ ADMIN: Promote user ============
@@ -2194,6 +3924,8 @@ async def update_user_role(user_id: str, role: str, admin: User = Depends(requir
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Utilisateur non trouvé")
     
+    session_cache.invalidate_user(user_id)
+    
     return {"message": f"Rôle mis à jour en {role}"}
 
 @api_router.get("/users")
@@ -2213,17 +3945,116 @@ async def delete_user(user_id: str, admin: User = Depends(require_master)):
     
     # Supprimer aussi les sessions de cet utilisateur
     await db.user_sessions.delete_many({"user_id": user_id})
+    session_cache.invalidate_user(user_id)
     
     return {"message": "Utilisateur supprimé"}
 
 # ============ ARBITRE ENDPOINTS ============
 
+class ArbitreSnapshotCache:
+    """
+    Instantanés de la vue arbitre par aire, avec une révision croissante.
+    Invalidés par les écritures (voir LiveFeedHub.publish); le TTL n'est qu'un filet
+    de sécurité. Une reconstruction au contenu identique garde sa révision.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self.entries = {}  # aire_id -> {"competition_id", "revision", "contenu", "corps", "expire_at"}
+        self.revision = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.invalidations = 0
+        self.generation = 0  # incrémentée à chaque invalidation
+
+    def get(self, aire_id: str) -> Optional[dict]:
+        entry = self.entries.get(aire_id)
+        if entry is None or entry["expire_at"] <= time.monotonic():
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def set(self, aire_id: str, competition_id: str, contenu: dict, generation: int) -> dict:
+        """Mémorise un instantané construit à `generation`; périmé d'office si une
+        invalidation est survenue pendant sa construction"""
+        precedent = self.entries.get(aire_id)
+        if precedent and precedent["contenu"] == contenu:
+            revision = precedent["revision"]
+        else:
+            self.revision += 1
+            revision = self.revision
+        entry = {
+            "competition_id": competition_id,
+            "revision": revision,
+            "contenu": contenu,
+            "corps": dumps_json({**contenu, "revision": revision}),  # sérialisé une seule fois
+            "expire_at": time.monotonic() + self.ttl_seconds if generation == self.generation else 0
+        }
+        self.entries[aire_id] = entry
+        return entry
+
+    def invalider(self, competition_id: Optional[str], aire_id: Optional[str] = None):
+        """Invalide une aire, ou toutes les aires de la compétition sans aire_id"""
+        self.generation += 1
+        cibles = [aire_id] if aire_id else [
+            a for a, entry in self.entries.items() if entry["competition_id"] == competition_id
+        ]
+        for cible in cibles:
+            entry = self.entries.get(cible)
+            if entry and entry["expire_at"]:
+                # Révision et contenu conservés pour détecter une reconstruction identique
+                entry["expire_at"] = 0
+                self.invalidations += 1
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "ttl_seconds": self.ttl_seconds,
+            "revision": self.revision,
+            "hits": self.hits,
+            "misses": self.misses,
+            "not_modified": self.not_modified,
+            "invalidations": self.invalidations,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0
+        }
+
+arbitre_snapshots = ArbitreSnapshotCache(
+    ttl_seconds=float(os.environ.get("ARBITRE_SNAPSHOT_TTL_SECONDS", "30"))
+)
+
+def reponse_instantane(snapshot: dict, request: Request, revision: Optional[int]):
+    """304 si le client a déjà cette révision, sinon l'instantané avec son ETag"""
+    headers = {"ETag": f'"{snapshot["revision"]}"', "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == headers["ETag"] or revision == snapshot["revision"]:
+        arbitre_snapshots.not_modified += 1
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot["corps"], media_type="application/json", headers=headers)
+
 @api_router.get("/arbitre/aire/{aire_id}")
-async def get_arbitre_view(aire_id: str, user: User = Depends(get_current_user)):
+async def get_arbitre_view(
+    aire_id: str,
+    request: Request,
+    revision: Optional[int] = None,
+    user: User = Depends(get_current_user)
+):
     """
     Vue complète pour l'arbitre de table centrale d'une aire de combat.
     Retourne le combat en cours, les combats à venir et les infos des compétiteurs.
+    Servie depuis un instantané en mémoire: un client qui renvoie la révision
+    reçue (If-None-Match ou ?revision=) obtient une 304 tant que rien n'a changé.
     """
+    snapshot = arbitre_snapshots.get(aire_id)
+    if not snapshot:
+        generation = arbitre_snapshots.generation
+        contenu = await construire_vue_arbitre(aire_id)
+        snapshot = arbitre_snapshots.set(aire_id, contenu["aire"]["competition_id"], contenu, generation)
+    return reponse_instantane(snapshot, request, revision)
+
+async def construire_vue_arbitre(aire_id: str) -> dict:
+    """Charge la vue arbitre d'une aire depuis MongoDB"""
     aire = await db.aires_combat.find_one({"aire_id": aire_id}, {"_id": 0})
     if not aire:
         raise HTTPException(status_code=404, detail="Aire de combat non trouvée")
@@ -2234,59 +4065,45 @@ async def get_arbitre_view(aire_id: str, user: User = Depends(get_current_user))
         {"_id": 0}
     )
     
-    # Enrichir avec les infos des compétiteurs
-    if combat_en_cours:
-        if combat_en_cours.get("rouge_id"):
-            rouge = await db.competiteurs.find_one(
-                {"competiteur_id": combat_en_cours["rouge_id"]},
-                {"_id": 0}
-            )
-            combat_en_cours["rouge"] = rouge
-        if combat_en_cours.get("bleu_id"):
-            bleu = await db.competiteurs.find_one(
-                {"competiteur_id": combat_en_cours["bleu_id"]},
-                {"_id": 0}
-            )
-            combat_en_cours["bleu"] = bleu
-        # Catégorie
-        categorie = await db.categories.find_one(
-            {"categorie_id": combat_en_cours["categorie_id"]},
-            {"_id": 0}
-        )
-        combat_en_cours["categorie"] = categorie
-    
     # Combats à venir sur cette aire (non-finales d'abord)
     combats_a_venir = await db.combats.find(
         {"aire_id": aire_id, "statut": "a_venir"},
         {"_id": 0}
     ).sort([("est_finale", 1), ("ordre", 1)]).to_list(20)
     
-    # Enrichir chaque combat à venir
+    # Charger en une fois les compétiteurs et catégories référencés
+    tous_combats = combats_a_venir + ([combat_en_cours] if combat_en_cours else [])
+    competiteurs, categories, _ = await charger_references_combats(tous_combats)
+    
+    # Enrichir avec les infos des compétiteurs
+    if combat_en_cours:
+        if combat_en_cours.get("rouge_id"):
+            combat_en_cours["rouge"] = competiteurs.get(combat_en_cours["rouge_id"])
+        if combat_en_cours.get("bleu_id"):
+            combat_en_cours["bleu"] = competiteurs.get(combat_en_cours["bleu_id"])
+        combat_en_cours["categorie"] = categories.get(combat_en_cours["categorie_id"])
+    
+    # Enrichir chaque combat à venir (infos réduites)
+    def resume_competiteur(competiteur_id):
+        comp = competiteurs.get(competiteur_id)
+        if not comp:
+            return None
+        return {k: comp[k] for k in ("competiteur_id", "nom", "prenom", "club") if k in comp}
+    
     for combat in combats_a_venir:
         if combat.get("rouge_id"):
-            rouge = await db.competiteurs.find_one(
-                {"competiteur_id": combat["rouge_id"]},
-                {"_id": 0, "competiteur_id": 1, "nom": 1, "prenom": 1, "club": 1}
-            )
-            combat["rouge"] = rouge
+            combat["rouge"] = resume_competiteur(combat["rouge_id"])
         if combat.get("bleu_id"):
-            bleu = await db.competiteurs.find_one(
-                {"competiteur_id": combat["bleu_id"]},
-                {"_id": 0, "competiteur_id": 1, "nom": 1, "prenom": 1, "club": 1}
-            )
-            combat["bleu"] = bleu
-        categorie = await db.categories.find_one(
-            {"categorie_id": combat["categorie_id"]},
-            {"_id": 0, "nom": 1}
-        )
-        combat["categorie"] = categorie
+            combat["bleu"] = resume_competiteur(combat["bleu_id"])
+        categorie = categories.get(combat["categorie_id"])
+        combat["categorie"] = {"nom": categorie["nom"]} if categorie else None
     
     # Finales en attente (toutes les aires confondues pour info)
-    finales_restantes = await db.combats.count_documents({
-        "competition_id": aire["competition_id"],
-        "est_finale": True,
-        "termine": False
-    })
+    competition = await db.competitions.find_one(
+        {"competition_id": aire["competition_id"]},
+        {"_id": 0, "competition_id": 1, "compteurs": 1}
+    )
+    finales_restantes = etat_finales(await lire_compteurs(competition))["finales_restantes"] if competition else 0
     
     return {
         "aire": aire,
@@ -2310,10 +4127,13 @@ async def lancer_combat(combat_id: str, user: User = Depends(get_current_user)):
         raise HTTPException(status_code=400, detail="Les deux combattants doivent être définis")
     
     # Passer le combat en cours
+    lancement = champs_lancement()
     await db.combats.update_one(
         {"combat_id": combat_id},
-        {"$set": {"statut": "en_cours"}}
+        {"$set": lancement}
     )
+    publier_combat("combat_lance", combat, **lancement)
+    await replanifier_aire(combat.get("aire_id"))
     
     updated = await db.combats.find_one({"combat_id": combat_id}, {"_id": 0})
     return updated
@@ -2325,6 +4145,8 @@ async def saisir_resultat_rapide(
     score_rouge: int = 0,
     score_bleu: int = 0,
     type_victoire: str = "normal",
+    version: Optional[int] = None,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key"),
     user: User = Depends(get_current_user)
 ):
     """
@@ -2335,6 +4157,10 @@ async def saisir_resultat_rapide(
     if not combat:
         raise HTTPException(status_code=404, detail="Combat non trouvé")
     
+    # Double saisie ou nouvelle tentative réseau: le résultat est déjà enregistré
+    if deja_enregistre(combat, idempotency_key):
+        return combat
+    
     if combat["statut"] != "en_cours":
         raise HTTPException(status_code=400, detail="Ce combat n'est pas en cours")
     
@@ -2348,6 +4174,24 @@ async def saisir_resultat_rapide(
     else:
         raise HTTPException(status_code=400, detail="Le vainqueur doit être 'rouge' ou 'bleu'")
     
+    # Mettre à jour le combat (uniquement s'il est toujours en cours)
+    updated, applique = await appliquer_resultat(
+        combat,
+        {"statut": "en_cours"},
+        {
+            "vainqueur_id": vainqueur_id,
+            "score_rouge": score_rouge,
+            "score_bleu": score_bleu,
+            "type_victoire": type_victoire,
+            "termine": True,
+            "statut": "termine"
+        },
+        idempotency_key,
+        version
+    )
+    if not applique:
+        return updated
+    
     # En Taekwondo, le perdant est éliminé (ne peut plus combattre)
     # Sauf s'il y a un match pour le bronze
     if perdant_id:
@@ -2360,38 +4204,22 @@ async def saisir_resultat_rapide(
                 {"$set": {"elimine": True}}
             )
     
-    # Mettre à jour le combat
-    await db.combats.update_one(
-        {"combat_id": combat_id},
-        {"$set": {
-            "vainqueur_id": vainqueur_id,
-            "score_rouge": score_rouge,
-            "score_bleu": score_bleu,
-            "type_victoire": type_victoire,
-            "termine": True,
-            "statut": "termine"
-        }}
+    publier_combat(
+        "resultat", combat,
+        vainqueur_id=vainqueur_id,
+        score_rouge=score_rouge,
+        score_bleu=score_bleu,
+        type_victoire=type_victoire,
+        termine=True,
+        statut="termine",
+        version=updated["version"]
     )
     
-    # Propager le vainqueur au tour suivant
-    await propager_vainqueur(combat, vainqueur_id)
-    
-    # Propager le perdant au match bronze si c'est une demi-finale
-    if combat["tour"] == "demi" and perdant_id:
-        bronze_match = await db.combats.find_one({
-            "categorie_id": combat["categorie_id"],
-            "tour": "bronze"
-        }, {"_id": 0})
-        
-        if bronze_match:
-            # Déterminer quelle position (rouge ou bleu) selon la position de la demi
-            update_field = "rouge_id" if combat["position"] == 1 else "bleu_id"
-            await db.combats.update_one(
-                {"combat_id": bronze_match["combat_id"]},
-                {"$set": {update_field: perdant_id}}
-            )
+    # Propager le vainqueur au tour suivant et le perdant d'une demi-finale au match bronze
+    await propager_vainqueur(combat, vainqueur_id, qualifier_perdant=type_victoire != "disqualification")
+    await enregistrer_duree_observee(combat, updated.get("heure_fin_reelle"))
+    await replanifier_aire(combat.get("aire_id"))
     
-    updated = await db.combats.find_one({"combat_id": combat_id}, {"_id": 0})
     return updated
 
 @api_router.get("/arbitre/prochain/{aire_id}")
@@ -2416,24 +4244,12 @@ async def get_prochain_combat(aire_id: str, user: User = Depends(get_current_use
         return None
     
     # Enrichir avec les infos
+    competiteurs, categories, _ = await charger_references_combats([combat])
     if combat.get("rouge_id"):
-        rouge = await db.competiteurs.find_one(
-            {"competiteur_id": combat["rouge_id"]},
-            {"_id": 0}
-        )
-        combat["rouge"] = rouge
+        combat["rouge"] = competiteurs.get(combat["rouge_id"])
     if combat.get("bleu_id"):
-        bleu = await db.competiteurs.find_one(
-            {"competiteur_id": combat["bleu_id"]},
-            {"_id": 0}
-        )
-        combat["bleu"] = bleu
-    
-    categorie = await db.categories.find_one(
-        {"categorie_id": combat["categorie_id"]},
-        {"_id": 0}
-    )
-    combat["categorie"] = categorie
+        combat["bleu"] = competiteurs.get(combat["bleu_id"])
+    combat["categorie"] = categories.get(combat["categorie_id"])
     
     return combat
 
@@ -2443,31 +4259,22 @@ async def verifier_lancement_finales(competition_id: str, user: User = Depends(g
     Vérifie si tous les combats non-finales sont terminés.
     Si oui, les finales peuvent commencer.
     """
-    # Compter les combats non-finales non terminés
-    combats_restants = await db.combats.count_documents({
-        "competition_id": competition_id,
-        "est_finale": False,
-        "termine": False
-    })
-    
-    # Compter les finales
-    finales_total = await db.combats.count_documents({
-        "competition_id": competition_id,
-        "est_finale": True
-    })
-    
-    finales_terminees = await db.combats.count_documents({
-        "competition_id": competition_id,
-        "est_finale": True,
-        "termine": True
-    })
+    competition = await db.competitions.find_one(
+        {"competition_id": competition_id},
+        {"_id": 0, "competition_id": 1, "compteurs": 1}
+    )
+    if not competition:
+        raise HTTPException(status_code=404, detail="Compétition non trouvée")
     
+    # Combats non-finales restants et finales, depuis les compteurs matérialisés
+    etat = etat_finales(await lire_compteurs(competition))
+    combats_restants = etat["combats_reguliers_restants"]
     peut_lancer_finales = combats_restants == 0
     
     return {
         "combats_reguliers_restants": combats_restants,
-        "finales_total": finales_total,
-        "finales_terminees": finales_terminees,
+        "finales_total": etat["finales_total"],
+        "finales_terminees": etat["finales_terminees"],
         "peut_lancer_finales": peut_lancer_finales,
         "message": "Les finales peuvent commencer !" if peut_lancer_finales else f"Il reste {combats_restants} combat(s) régulier(s) à terminer"
     }
@@ -2550,89 +4357,204 @@ async def remove_coach_from_competition(competition_id: str, coach_id: str, admi
     
     return {"message": "Coach retiré de la compétition"}
 
+# ============ EXPORT XLSX EN FLUX ============
+
+XLSX_STREAM_CHUNK_BYTES = 64 * 1024
+
+class _ZipChunkBuffer:
+    """Flux non positionnable dans lequel zipfile écrit; vidé au fur et à mesure"""
+
+    def __init__(self):
+        self.chunks = []
+        self.size = 0
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self.chunks)
+        self.chunks = []
+        self.size = 0
+        return data
+
+class XlsxStreamWriter:
+    """
+    Écrit un classeur XLSX d'une seule feuille en flux.
+    Les parties fixes (styles partagés, classeur, relations) sont écrites d'emblée,
+    puis la feuille est compressée ligne par ligne; drain() rend les octets prêts.
+    """
+
+    STYLE_DEFAUT = 0
+    STYLE_HEADER = 1  # fond bleu, texte blanc gras, centré, bordures
+    STYLE_CELLULE = 2  # bordures fines
+
+    NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+    NS_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+    NS_PKG_REL = "http://schemas.openxmlformats.org/package/2006/relationships"
+    CARACTERES_INTERDITS = re.compile("[\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+    def __init__(self, sheet_name: str, column_widths: Optional[list] = None):
+        import zipfile
+        
+        self.buffer = _ZipChunkBuffer()
+        self.zip = zipfile.ZipFile(self.buffer, "w", compression=zipfile.ZIP_DEFLATED, compresslevel=6)
+        self._ecrire_parties_fixes(sheet_name)
+        self.sheet = self.zip.open("xl/worksheets/sheet1.xml", "w", force_zip64=True)
+        
+        entete = f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n<worksheet xmlns="{self.NS}">'
+        if column_widths:
+            cols = "".join(
+                f'<col min="{i}" max="{i}" width="{w}" customWidth="1"/>'
+                for i, w in enumerate(column_widths, 1)
+            )
+            entete += f"<cols>{cols}</cols>"
+        self.sheet.write((entete + "<sheetData>").encode("utf-8"))
+
+    def _ecrire_parties_fixes(self, sheet_name: str):
+        from xml.sax.saxutils import quoteattr
+        
+        xml = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        ct = "application/vnd.openxmlformats-officedocument.spreadsheetml"
+        self.zip.writestr("[Content_Types].xml", xml + (
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            f'<Override PartName="/xl/workbook.xml" ContentType="{ct}.sheet.main+xml"/>'
+            f'<Override PartName="/xl/worksheets/sheet1.xml" ContentType="{ct}.worksheet+xml"/>'
+            f'<Override PartName="/xl/styles.xml" ContentType="{ct}.styles+xml"/>'
+            '</Types>'
+        ))
+        self.zip.writestr("_rels/.rels", xml + (
+            f'<Relationships xmlns="{self.NS_PKG_REL}">'
+            f'<Relationship Id="rId1" Type="{self.NS_REL}/officeDocument" Target="xl/workbook.xml"/>'
+            '</Relationships>'
+        ))
+        self.zip.writestr("xl/workbook.xml", xml + (
+            f'<workbook xmlns="{self.NS}" xmlns:r="{self.NS_REL}">'
+            f'<sheets><sheet name={quoteattr(sheet_name[:31])} sheetId="1" r:id="rId1"/></sheets>'
+            '</workbook>'
+        ))
+        self.zip.writestr("xl/_rels/workbook.xml.rels", xml + (
+            f'<Relationships xmlns="{self.NS_PKG_REL}">'
+            f'<Relationship Id="rId1" Type="{self.NS_REL}/worksheet" Target="worksheets/sheet1.xml"/>'
+            f'<Relationship Id="rId2" Type="{self.NS_REL}/styles" Target="styles.xml"/>'
+            '</Relationships>'
+        ))
+        bordure = "<left style=\"thin\"/><right style=\"thin\"/><top style=\"thin\"/><bottom style=\"thin\"/><diagonal/>"
+        self.zip.writestr("xl/styles.xml", xml + (
+            f'<styleSheet xmlns="{self.NS}">'
+            '<fonts count="2">'
+            '<font><sz val="11"/><name val="Calibri"/></font>'
+            '<font><b/><sz val="11"/><color rgb="FFFFFFFF"/><name val="Calibri"/></font>'
+            '</fonts>'
+            '<fills count="3">'
+            '<fill><patternFill patternType="none"/></fill>'
+            '<fill><patternFill patternType="gray125"/></fill>'
+            '<fill><patternFill patternType="solid"><fgColor rgb="FF1F4E79"/><bgColor rgb="FF1F4E79"/></patternFill></fill>'
+            '</fills>'
+            '<borders count="2">'
+            '<border><left/><right/><top/><bottom/><diagonal/></border>'
+            f'<border>{bordure}</border>'
+            '</borders>'
+            '<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+            '<cellXfs count="3">'
+            '<xf numFmtId="0" fontId="0" fillId="0" borderId="0" xfId="0"/>'
+            '<xf numFmtId="0" fontId="1" fillId="2" borderId="1" xfId="0" applyFont="1" applyFill="1" applyBorder="1" applyAlignment="1">'
+            '<alignment horizontal="center"/></xf>'
+            '<xf numFmtId="0" fontId="0" fillId="0" borderId="1" xfId="0" applyBorder="1"/>'
+            '</cellXfs>'
+            '<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+            '</styleSheet>'
+        ))
+
+    def _cellule(self, value, style: int) -> str:
+        from xml.sax.saxutils import escape
+        
+        if value is None or value == "":
+            return f'<c s="{style}"/>'
+        if isinstance(value, bool):
+            return f'<c s="{style}" t="b"><v>{int(value)}</v></c>'
+        if isinstance(value, (int, float)) and math.isfinite(value):
+            return f'<c s="{style}"><v>{value!r}</v></c>'
+        texte = escape(self.CARACTERES_INTERDITS.sub("", str(value)))
+        return f'<c s="{style}" t="inlineStr"><is><t xml:space="preserve">{texte}</t></is></c>'
+
+    def write_row(self, values: list, style: int = STYLE_CELLULE):
+        cellules = "".join(self._cellule(v, style) for v in values)
+        self.sheet.write(f"<row>{cellules}</row>".encode("utf-8"))
+
+    def pending(self) -> int:
+        """Nombre d'octets compressés prêts à être envoyés"""
+        return self.buffer.size
+
+    def drain(self) -> bytes:
+        return self.buffer.drain()
+
+    def close(self) -> bytes:
+        """Termine la feuille et l'archive; retourne les derniers octets"""
+        self.sheet.write(b"</sheetData></worksheet>")
+        self.sheet.close()
+        self.zip.close()
+        return self.buffer.drain()
+
 # ============ IMPORT/EXPORT EXCEL COMPETITEURS ============
 
 @api_router.get("/excel/competiteurs/export/{competition_id}")
 async def export_competiteurs_excel(competition_id: str, user: User = Depends(get_current_user)):
-    """Exporte la liste des compétiteurs d'une compétition au format Excel"""
+    """
+    Exporte la liste des compétiteurs d'une compétition au format Excel.
+    Le fichier est produit en flux: les lignes sont écrites au fil du curseur
+    MongoDB, sans limite de nombre et avec une mémoire constante.
+    """
     if not await user_can_access_competition(user, competition_id):
         raise HTTPException(status_code=403, detail="Accès non autorisé")
     
-    import pandas as pd
-    from openpyxl import Workbook
-    from openpyxl.styles import Font, PatternFill, Border, Side, Alignment
-    
     # Récupérer la compétition
     competition = await db.competitions.find_one({"competition_id": competition_id}, {"_id": 0})
     if not competition:
         raise HTTPException(status_code=404, detail="Compétition non trouvée")
     
-    # Récupérer les compétiteurs
-    competiteurs = await db.competiteurs.find(
-        {"competition_id": competition_id},
-        {"_id": 0}
-    ).to_list(1000)
-    
-    # Récupérer les catégories pour les noms
-    categories = await db.categories.find(
-        {"competition_id": competition_id},
-        {"_id": 0}
-    ).to_list(500)
-    cat_dict = {c["categorie_id"]: c["nom"] for c in categories}
-    
-    # Créer le workbook Excel
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "Compétiteurs"
-    
-    # Style pour l'en-tête
-    header_fill = PatternFill(start_color="1F4E79", end_color="1F4E79", fill_type="solid")
-    header_font = Font(color="FFFFFF", bold=True)
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
+    # Noms des catégories depuis l'index en mémoire
+    categories = (await get_category_index(competition_id)).categories
+    cat_dict = {cat_id: c["nom"] for cat_id, c in categories.items()}
     
-    # En-têtes
     headers = ["Nom", "Prénom", "Date de naissance", "Sexe", "Poids déclaré", "Poids officiel", "Club", "Catégorie", "Pesé", "Surclassé"]
-    for col, header in enumerate(headers, 1):
-        cell = ws.cell(row=1, column=col, value=header)
-        cell.fill = header_fill
-        cell.font = header_font
-        cell.border = thin_border
-        cell.alignment = Alignment(horizontal="center")
-    
-    # Données
-    for row, comp in enumerate(competiteurs, 2):
-        ws.cell(row=row, column=1, value=comp.get("nom", "")).border = thin_border
-        ws.cell(row=row, column=2, value=comp.get("prenom", "")).border = thin_border
-        # Convertir la date au format français JJ/MM/AAAA
-        date_fr = date_iso_to_fr(comp.get("date_naissance", ""))
-        ws.cell(row=row, column=3, value=date_fr).border = thin_border
-        ws.cell(row=row, column=4, value=comp.get("sexe", "")).border = thin_border
-        ws.cell(row=row, column=5, value=comp.get("poids_declare", "")).border = thin_border
-        ws.cell(row=row, column=6, value=comp.get("poids_officiel", "")).border = thin_border
-        ws.cell(row=row, column=7, value=comp.get("club", "")).border = thin_border
-        ws.cell(row=row, column=8, value=cat_dict.get(comp.get("categorie_id"), "Non assignée")).border = thin_border
-        ws.cell(row=row, column=9, value="Oui" if comp.get("pese") else "Non").border = thin_border
-        ws.cell(row=row, column=10, value="Oui" if comp.get("surclasse") else "Non").border = thin_border
-    
-    # Ajuster la largeur des colonnes
     column_widths = [15, 15, 15, 8, 15, 15, 20, 30, 8, 10]
-    for i, width in enumerate(column_widths, 1):
-        ws.column_dimensions[ws.cell(row=1, column=i).column_letter].width = width
     
-    # Sauvegarder dans un buffer
-    buffer = io.BytesIO()
-    wb.save(buffer)
-    buffer.seek(0)
+    async def contenu():
+        writer = XlsxStreamWriter("Compétiteurs", column_widths)
+        writer.write_row(headers, style=XlsxStreamWriter.STYLE_HEADER)
+        yield writer.drain()
+        
+        cursor = db.competiteurs.find({"competition_id": competition_id}, {"_id": 0})
+        async for comp in cursor:
+            writer.write_row([
+                comp.get("nom", ""),
+                comp.get("prenom", ""),
+                # Convertir la date au format français JJ/MM/AAAA
+                date_iso_to_fr(comp.get("date_naissance", "")),
+                comp.get("sexe", ""),
+                comp.get("poids_declare", ""),
+                comp.get("poids_officiel", ""),
+                comp.get("club", ""),
+                cat_dict.get(comp.get("categorie_id"), "Non assignée"),
+                "Oui" if comp.get("pese") else "Non",
+                "Oui" if comp.get("surclasse") else "Non"
+            ])
+            if writer.pending() >= XLSX_STREAM_CHUNK_BYTES:
+                yield writer.drain()
+        
+        yield writer.close()
     
     filename = f"competiteurs_{competition['nom'].replace(' ', '_')}_{datetime.now().strftime('%Y%m%d')}.xlsx"
     
     return StreamingResponse(
-        buffer,
+        contenu(),
         media_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -2731,17 +4653,70 @@ async def get_import_template(user: User = Depends(get_current_user)):
         headers={"Content-Disposition": "attachment; filename=template_import_competiteurs.xlsx"}
     )
 
+IMPORT_CHUNK_SIZE = 500
+COLONNES_IMPORT_REQUISES = ["nom", "prénom", "date de naissance", "sexe", "poids déclaré", "club"]
+
+def valider_ligne_import(row: tuple, col_map: dict) -> dict:
+    """
+    Valide et normalise une ligne du fichier d'import.
+    Retourne les champs du compétiteur ou lève ValueError avec le message d'erreur.
+    """
+    nom = str(row[col_map["nom"]]).strip()
+    prenom = str(row[col_map["prénom"]] or "").strip()
+    date_naissance = row[col_map["date de naissance"]]
+    sexe = str(row[col_map["sexe"]] or "").strip().upper()
+    club = str(row[col_map["club"]] or "").strip()
+    surclasse_valeur = row[col_map["surclassé"]] if "surclassé" in col_map else None
+    surclasse = str(surclasse_valeur or "Non").strip().lower() in ["oui", "yes", "true", "1"]
+    
+    try:
+        poids_declare = float(row[col_map["poids déclaré"]])
+    except (TypeError, ValueError):
+        raise ValueError(f"Poids déclaré invalide '{row[col_map['poids déclaré']]}'")
+    
+    # Convertir la date si nécessaire
+    if isinstance(date_naissance, datetime):
+        date_naissance = date_naissance.strftime("%Y-%m-%d")
+    else:
+        # Convertir du format français JJ/MM/AAAA au format ISO
+        date_naissance = date_fr_to_iso(str(date_naissance or "").strip())
+    
+    # Valider le sexe
+    if sexe not in ["M", "F"]:
+        raise ValueError(f"Sexe invalide '{sexe}' (doit être M ou F)")
+    
+    # Valider la date
+    try:
+        datetime.strptime(date_naissance, "%Y-%m-%d")
+    except ValueError:
+        raise ValueError(f"Date de naissance invalide '{date_naissance}' (format: JJ/MM/AAAA)")
+    
+    return {
+        "nom": nom,
+        "prenom": prenom,
+        "date_naissance": date_naissance,
+        "sexe": sexe,
+        "poids_declare": poids_declare,
+        "club": club,
+        "surclasse": surclasse
+    }
+
 @api_router.post("/excel/competiteurs/import/{competition_id}")
 async def import_competiteurs_excel(
     competition_id: str,
     file: UploadFile = File(...),
+    dry_run: bool = False,
     user: User = Depends(get_current_user)
 ):
-    """Importe des compétiteurs depuis un fichier Excel"""
+    """
+    Importe des compétiteurs depuis un fichier Excel.
+    Le fichier est lu en streaming (lecture seule), les catégories sont attribuées
+    depuis l'index en mémoire et les insertions sont faites par lots.
+    dry_run: valide tout le fichier et retourne toutes les erreurs sans rien écrire
+    """
     if not await user_can_access_competition(user, competition_id):
         raise HTTPException(status_code=403, detail="Accès non autorisé")
     
-    import pandas as pd
     from openpyxl import load_workbook
     
     # Vérifier que la compétition existe et est active
@@ -2757,107 +4732,211 @@ async def import_competiteurs_excel(
     
     try:
         content = await file.read()
-        wb = load_workbook(io.BytesIO(content))
-        ws = wb.active
-        
-        # Lire les en-têtes
-        headers = [cell.value for cell in ws[1]]
+        wb = load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=f"Erreur lors de la lecture du fichier: {str(e)}")
+    
+    try:
+        rows = wb.active.iter_rows(values_only=True)
         
-        # Mapper les colonnes (ignorer les astérisques)
+        # Lire les en-têtes et mapper les colonnes (ignorer les astérisques)
+        headers = next(rows, None) or ()
         col_map = {}
         for i, h in enumerate(headers):
             if h:
-                clean_h = h.replace("*", "").strip().lower()
+                clean_h = str(h).replace("*", "").strip().lower()
                 col_map[clean_h] = i
         
         # Vérifier les colonnes requises
-        required = ["nom", "prénom", "date de naissance", "sexe", "poids déclaré", "club"]
-        missing = [r for r in required if r not in col_map]
+        missing = [r for r in COLONNES_IMPORT_REQUISES if r not in col_map]
         if missing:
             raise HTTPException(status_code=400, detail=f"Colonnes manquantes: {', '.join(missing)}")
         
-        # Importer les compétiteurs
+        index = await get_category_index(competition_id)
+        created_at = datetime.now(timezone.utc).isoformat()
+        
         imported = 0
+        valides = 0
         errors = []
+        lot = []
         
-        for row_idx, row in enumerate(ws.iter_rows(min_row=2, values_only=True), 2):
+        for row_idx, row in enumerate(rows, 2):
+            # En lecture seule, les lignes peuvent être plus courtes que l'en-tête
+            row = tuple(row) + (None,) * (len(headers) - len(row))
             if not row[col_map["nom"]]:  # Ligne vide
                 continue
             
             try:
-                nom = str(row[col_map["nom"]]).strip()
-                prenom = str(row[col_map["prénom"]]).strip()
-                date_naissance = row[col_map["date de naissance"]]
-                sexe = str(row[col_map["sexe"]]).strip().upper()
-                poids_declare = float(row[col_map["poids déclaré"]])
-                club = str(row[col_map["club"]]).strip()
-                surclasse = str(row[col_map.get("surclassé", -1)] or "Non").strip().lower() in ["oui", "yes", "true", "1"]
-                
-                # Convertir la date si nécessaire
-                if isinstance(date_naissance, datetime):
-                    date_naissance = date_naissance.strftime("%Y-%m-%d")
-                else:
-                    date_str = str(date_naissance).strip()
-                    # Convertir du format français JJ/MM/AAAA au format ISO
-                    date_naissance = date_fr_to_iso(date_str)
-                
-                # Valider le sexe
-                if sexe not in ["M", "F"]:
-                    errors.append(f"Ligne {row_idx}: Sexe invalide '{sexe}' (doit être M ou F)")
-                    continue
-                
-                # Valider la date
-                try:
-                    datetime.strptime(date_naissance, "%Y-%m-%d")
-                except ValueError:
-                    errors.append(f"Ligne {row_idx}: Date de naissance invalide '{date_naissance}' (format: JJ/MM/AAAA)")
-                    continue
-                
-                # Créer le compétiteur
-                comp = Competiteur(
-                    competition_id=competition_id,
-                    nom=nom,
-                    prenom=prenom,
-                    date_naissance=date_naissance,
-                    sexe=sexe,
-                    poids_declare=poids_declare,
-                    club=club,
-                    surclasse=surclasse,
-                    created_by=user.user_id
-                )
-                comp_dict = comp.model_dump()
-                comp_dict["created_at"] = comp_dict["created_at"].isoformat()
-                
-                # Attribution automatique de la catégorie
-                if not surclasse:
-                    categorie_id = await assign_categorie(comp_dict, competition_id)
-                    comp_dict["categorie_id"] = categorie_id
-                
-                await db.competiteurs.insert_one(comp_dict)
-                imported += 1
-                
-            except Exception as e:
+                champs = valider_ligne_import(row, col_map)
+            except (ValueError, TypeError) as e:
                 errors.append(f"Ligne {row_idx}: {str(e)}")
+                continue
+            valides += 1
+            if dry_run:
+                continue
+            
+            comp_dict = Competiteur(
+                competition_id=competition_id,
+                created_by=user.user_id,
+                **champs
+            ).model_dump()
+            comp_dict["created_at"] = created_at
+            
+            # Attribution automatique de la catégorie
+            if not champs["surclasse"]:
+                comp_dict["categorie_id"] = resoudre_categorie(index, comp_dict)
+            
+            lot.append(comp_dict)
+            if len(lot) >= IMPORT_CHUNK_SIZE:
+                await db.competiteurs.insert_many(lot, ordered=False)
+                imported += len(lot)
+                lot = []
         
+        if lot:
+            await db.competiteurs.insert_many(lot, ordered=False)
+            imported += len(lot)
+    finally:
+        wb.close()
+    
+    await incrementer_compteurs(competition_id, competiteurs=imported)
+    
+    if dry_run:
         return {
-            "message": f"{imported} compétiteur(s) importé(s)",
-            "imported": imported,
-            "errors": errors[:10] if errors else [],  # Limiter à 10 erreurs
+            "message": f"{valides} ligne(s) valide(s), {len(errors)} erreur(s) - aucune donnée importée",
+            "dry_run": True,
+            "valides": valides,
+            "imported": 0,
+            "errors": errors,
             "total_errors": len(errors)
         }
+    
+    return {
+        "message": f"{imported} compétiteur(s) importé(s)",
+        "imported": imported,
+        "errors": errors[:10] if errors else [],  # Limiter à 10 erreurs
+        "total_errors": len(errors)
+    }
+
+# ============ COMPRESSION DES RÉPONSES ============
+
+COMPRESSION_MIN_SIZE = int(os.environ.get("COMPRESSION_MIN_SIZE", "1024"))  # octets
+GZIP_LEVEL = int(os.environ.get("GZIP_LEVEL", "5"))
+BROTLI_QUALITY = int(os.environ.get("BROTLI_QUALITY", "4"))  # rapide, adapté aux réponses dynamiques
+
+# Jamais compressés: le flux SSE (chaque message doit partir tout de suite) et
+# les formats déjà compressés (xlsx et zip sont des archives deflate, images)
+TYPES_NON_COMPRESSES = (
+    "text/event-stream",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "application/zip",
+    "image/",
+)
+
+class Compresseur:
+    """gzip (zlib) ou br (brotli) avec la même interface; `vider` pousse ce qui est en attente"""
+
+    def __init__(self, encodage: str):
+        self.encodage = encodage
+        if encodage == "br":
+            self.brotli = brotli.Compressor(quality=BROTLI_QUALITY)
+        else:
+            self.zlib = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: en-tête gzip
+
+    def vider(self, data: bytes) -> bytes:
+        if self.encodage == "br":
+            return self.brotli.process(data) + self.brotli.flush()
+        return self.zlib.compress(data) + self.zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def terminer(self, data: bytes) -> bytes:
+        if self.encodage == "br":
+            return self.brotli.process(data) + self.brotli.finish()
+        return self.zlib.compress(data) + self.zlib.flush()
+
+def choisir_encodage(accept_encoding: str) -> Optional[str]:
+    encodages = {e.split(";")[0].strip() for e in accept_encoding.lower().split(",")}
+    if brotli is not None and "br" in encodages:
+        return "br"
+    if "gzip" in encodages:
+        return "gzip"
+    return None
+
+class CompressionMiddleware:
+    """
+    Compresse les réponses d'au moins COMPRESSION_MIN_SIZE octets en Brotli (si le
+    module est installé et accepté par le client) ou en gzip. Les réponses en flux
+    (NDJSON) sont compressées morceau par morceau, chaque morceau étant poussé
+    aussitôt. Le flux SSE et les formats déjà compressés (TYPES_NON_COMPRESSES)
+    ou portant déjà un Content-Encoding sont transmis tels quels.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        encodage = choisir_encodage(Headers(scope=scope).get("accept-encoding", "")) if scope["type"] == "http" else None
+        if encodage is None:
+            await self.app(scope, receive, send)
+            return
         
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Erreur lors de la lecture du fichier: {str(e)}")
+        debut = None
+        compresseur = None
+        direct = False
+        
+        async def envoyer(message):
+            nonlocal debut, compresseur, direct
+            if direct:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if "content-encoding" in headers or headers.get("content-type", "").startswith(TYPES_NON_COMPRESSES):
+                    direct = True
+                    await send(message)
+                else:
+                    debut = message  # envoyé avec le premier morceau du corps
+                return
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+            
+            body = message.get("body", b"")
+            suite = message.get("more_body", False)
+            if compresseur is None:
+                if not suite and len(body) < COMPRESSION_MIN_SIZE:
+                    direct = True
+                    await send(debut)
+                    await send(message)
+                    return
+                compresseur = Compresseur(encodage)
+                headers = MutableHeaders(raw=debut["headers"])
+                headers["Content-Encoding"] = encodage
+                headers.add_vary_header("Accept-Encoding")
+                if not suite:
+                    body = compresseur.terminer(body)
+                    headers["Content-Length"] = str(len(body))
+                    await send(debut)
+                    await send({"type": "http.response.body", "body": body})
+                    return
+                del headers["Content-Length"]
+                await send(debut)
+            
+            body = compresseur.vider(body) if suite else compresseur.terminer(body)
+            await send({"type": "http.response.body", "body": body, "more_body": suite})
+        
+        await self.app(scope, receive, envoyer)
 
 # Include router
 app.include_router(api_router)
 
+app.add_middleware(CompressionMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 logging.basicConfig(
@@ -2866,6 +4945,153 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# ============ INDEX MONGODB ============
+
+# Index créés au démarrage: (collection, clés, options).
+# Chaque entrée correspond à une forme de requête utilisée par les endpoints.
+INDEXES = [
+    # Utilisateurs et sessions
+    ("users", [("user_id", 1)], {"unique": True}),
+    ("users", [("email", 1)], {"unique": True}),
+    ("users", [("role", 1)], {}),
+    ("user_sessions", [("session_token", 1)], {"unique": True}),
+    ("user_sessions", [("user_id", 1)], {}),
+    # Compétitions
+    ("competitions", [("competition_id", 1)], {"unique": True}),
+    ("competitions", [("coaches_autorises", 1), ("date", -1)], {}),
+    ("competitions", [("statut", 1), ("date", -1)], {}),
+    # Compétiteurs
+    ("competiteurs", [("competiteur_id", 1)], {"unique": True}),
+    ("competiteurs", [("competition_id", 1), ("club", 1), ("nom", 1), ("competiteur_id", 1)], {}),
+    ("competiteurs", [("competition_id", 1), ("pese", 1)], {}),
+    ("competiteurs", [("categorie_id", 1), ("disqualifie", 1)], {}),
+    # Catégories
+    ("categories", [("categorie_id", 1)], {"unique": True}),
+    ("categories", [("competition_id", 1), ("sexe", 1), ("age_min", 1), ("poids_min", 1)], {}),
+    ("categorie_templates", [("template_id", 1)], {"unique": True}),
+    ("categorie_templates", [("nom", 1), ("version", -1)], {"unique": True}),
+    # Aires de combat et tatamis
+    ("aires_combat", [("aire_id", 1)], {"unique": True}),
+    ("aires_combat", [("competition_id", 1), ("numero", 1)], {}),
+    ("tatamis", [("tatami_id", 1)], {"unique": True}),
+    ("tatamis", [("competition_id", 1)], {}),
+    # Combats
+    ("combats", [("combat_id", 1)], {"unique": True}),
+    ("combats", [("aire_id", 1), ("statut", 1), ("est_finale", 1), ("ordre", 1)], {}),
+    ("combats", [("competition_id", 1), ("aire_id", 1), ("statut", 1), ("est_finale", 1), ("ordre", 1)], {}),
+    ("combats", [("aire_id", 1), ("termine", 1), ("est_finale", 1), ("ordre", 1)], {}),
+    ("combats", [("categorie_id", 1), ("tour", 1), ("position", 1)], {}),
+    ("combats", [("competition_id", 1), ("termine", 1)], {}),
+    ("combats", [("competition_id", 1), ("ordre", 1), ("combat_id", 1)], {}),
+    ("combats", [("competition_id", 1), ("statut", 1), ("ordre", 1)], {}),
+    ("combats", [("statut", 1), ("ordre", 1)], {}),
+    ("combats", [("tour", 1), ("statut", 1), ("ordre", 1)], {}),
+    # Médailles et historique
+    ("medailles", [("categorie_id", 1), ("rang", 1), ("medaille_id", 1)], {}),
+    ("historique_resultats", [("combat_id", 1), ("modifie_at", 1), ("historique_id", 1)], {}),
+    ("historique_resultats", [("modifie_at", 1), ("historique_id", 1)], {}),
+]
+
+# Formes de requête (collection, champs filtrés en égalité ou intervalle)
+# qui doivent être servies par un index. Vérifiées au démarrage.
+QUERY_SHAPES = [
+    ("users", ["email"]),
+    ("users", ["user_id"]),
+    ("users", ["role"]),
+    ("user_sessions", ["session_token"]),
+    ("user_sessions", ["user_id"]),
+    ("competitions", ["competition_id"]),
+    ("competitions", ["coaches_autorises"]),
+    ("competiteurs", ["competiteur_id"]),
+    ("competiteurs", ["competition_id"]),
+    ("competiteurs", ["competition_id", "pese"]),
+    ("competiteurs", ["competition_id", "club"]),
+    ("competiteurs", ["categorie_id"]),
+    ("competiteurs", ["categorie_id", "disqualifie"]),
+    ("categories", ["categorie_id"]),
+    ("categories", ["competition_id"]),
+    ("categories", ["competition_id", "sexe", "age_min"]),
+    ("categorie_templates", ["template_id"]),
+    ("categorie_templates", ["nom"]),
+    ("aires_combat", ["aire_id"]),
+    ("aires_combat", ["competition_id"]),
+    ("tatamis", ["tatami_id"]),
+    ("combats", ["combat_id"]),
+    ("combats", ["aire_id", "statut"]),
+    ("combats", ["aire_id", "statut", "est_finale"]),
+    ("combats", ["aire_id", "termine"]),
+    ("combats", ["categorie_id"]),
+    ("combats", ["categorie_id", "tour"]),
+    ("combats", ["categorie_id", "tour", "position"]),
+    ("combats", ["competition_id"]),
+    ("combats", ["competition_id", "termine"]),
+    ("combats", ["competition_id", "aire_id", "statut", "est_finale"]),
+    ("combats", ["statut"]),
+    ("combats", ["tour", "statut"]),
+    ("medailles", ["categorie_id"]),
+    ("historique_resultats", ["combat_id"]),
+]
+
+def index_couvre(index_keys: list, champs: list) -> bool:
+    """Vrai si les champs de la requête forment un préfixe (dans un ordre quelconque) des clés de l'index"""
+    prefixe = [k for k, _ in index_keys[:len(champs)]]
+    return len(prefixe) == len(champs) and set(prefixe) == set(champs)
+
+async def ensure_indexes():
+    """Crée les index manquants (idempotent), les vérifie et signale les requêtes non couvertes"""
+    from pymongo.errors import OperationFailure
+
+    for collection, keys, options in INDEXES:
+        try:
+            await db[collection].create_index(keys, **options)
+        except OperationFailure as e:
+            # Ex: doublons empêchant un index unique, ou index existant avec d'autres options
+            logger.error(f"Index {collection} {keys} non créé: {e}")
+
+    # Vérifier les index réellement présents
+    existants = {}
+    for collection in sorted({c for c, _, _ in INDEXES} | {c for c, _ in QUERY_SHAPES}):
+        info = await db[collection].index_information()
+        existants[collection] = [spec["key"] for spec in info.values()]
+
+    for collection, keys, _ in INDEXES:
+        if [tuple(k) for k in keys] not in [[tuple(k) for k in spec] for spec in existants[collection]]:
+            logger.warning(f"Index attendu absent: {collection} {keys}")
+
+    for collection, champs in QUERY_SHAPES:
+        if not any(index_couvre(spec, champs) for spec in existants[collection]):
+            logger.warning(f"Requête sans index: {collection} {champs}")
+
+async def completer_champs_de_tri():
+    """Complète les documents antérieurs aux champs de tri des listes (rang des médailles, date des forfaits)"""
+    from pymongo import UpdateOne
+    
+    for type_medaille, rang in RANGS_MEDAILLES.items():
+        await db.medailles.update_many({"type": type_medaille, "rang": {"$exists": False}}, {"$set": {"rang": rang}})
+    anciens = await db.historique_resultats.find(
+        {"modifie_at": {"$exists": False}}, {"_id": 0, "historique_id": 1, "date": 1}
+    ).to_list(None)
+    if anciens:
+        await db.historique_resultats.bulk_write([
+            UpdateOne({"historique_id": h["historique_id"]}, {"$set": {"modifie_at": h.get("date", "")}})
+            for h in anciens
+        ], ordered=False)
+
+@app.on_event("startup")
+async def startup_indexes():
+    await ensure_indexes()
+    await completer_champs_de_tri()
+
+@app.on_event("startup")
+async def startup_templates():
+    await enregistrer_template_officiel()
+
+@app.on_event("startup")
+async def startup_compteurs():
+    app.state.reconciliation_compteurs = asyncio.create_task(boucle_reconciliation_compteurs())
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    app.state.reconciliation_compteurs.cancel()
     client.close()
+    password_executor.shutdown(wait=False)
@@ -0,0 +1,244 @@
+"""
+Unit tests - Taekwondo Competition Manager
+Pure functions of server.py, no live server needed:
+1. Bracket construction (byes, pointers, round names, bronze)
+2. Result propagation targets, with and without pointers
+3. In-memory category index versus a first-match scan
+4. List scheduling of fights on the aires
+"""
+import os
+import random
+import sys
+from pathlib import Path
+
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "test_algorithmes")
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import server  # noqa: E402
+
+
+def arbre(n, categorie_id="cat_test"):
+    ids = [f"cptr_{i}" for i in range(n)]
+    return ids, server.combats_en_documents(server.construire_arbre(ids, "comp_test", categorie_id))
+
+
+class TestConstruireArbre:
+    """Tests for the general bracket engine"""
+
+    def test_byes_fill_up_to_next_power_of_two(self):
+        for n in range(2, 41):
+            taille = 1 << (n - 1).bit_length()
+            assert server.nombre_byes(n) == taille - n
+        assert server.nombre_byes(1) == 0
+
+    def test_every_competitor_placed_once_with_at_most_one_bye_per_pair(self):
+        """First-round fights count n - size/2: no pair is made of two byes"""
+        for n in range(2, 41):
+            ids, combats = arbre(n)
+            taille = 1 << (n - 1).bit_length()
+            premier_tour = [c for c in combats if c["tour"] == server.nom_tour(taille)]
+            assert len(premier_tour) == n - taille // 2
+            assert all(c["rouge_id"] and c["bleu_id"] for c in premier_tour)
+
+            places = [c[champ] for c in combats for champ in ("rouge_id", "bleu_id") if c[champ]]
+            assert sorted(places) == sorted(ids)
+
+    def test_byes_are_spread_between_halves(self):
+        for n in range(3, 41):
+            _, combats = arbre(n)
+            taille = 1 << (n - 1).bit_length()
+            if taille < 8:
+                continue
+            second_tour = server.nom_tour(taille // 2)
+            # Un compétiteur déjà placé au second tour est exempté du premier
+            byes = [
+                (c["position"] - 1) * 2 + (0 if champ == "rouge_id" else 1)
+                for c in combats if c["tour"] == second_tour
+                for champ in ("rouge_id", "bleu_id") if c[champ]
+            ]
+            moitie = taille // 4
+            haut = len([b for b in byes if b < moitie])
+            assert abs(haut - (len(byes) - haut)) <= 1, n
+
+    def test_every_non_final_fight_has_exactly_one_target_slot(self):
+        for n in range(2, 41):
+            _, combats = arbre(n)
+            par_id = {c["combat_id"]: c for c in combats}
+            cibles = []
+            for combat in combats:
+                if combat["tour"] in server.TOURS_FINALES:
+                    assert combat["next_combat_id"] is None
+                    continue
+                assert combat["next_combat_id"] in par_id
+                assert combat["next_slot"] in ("rouge", "bleu")
+                suivant = par_id[combat["next_combat_id"]]
+                assert server.rang_tour(suivant["tour"]) > server.rang_tour(combat["tour"])
+                # L'emplacement visé n'est pas déjà occupé par un exempté
+                assert suivant[f"{combat['next_slot']}_id"] is None
+                cibles.append((combat["next_combat_id"], combat["next_slot"]))
+            assert len(cibles) == len(set(cibles))
+
+    def test_bronze_exists_iff_both_demis_are_fought(self):
+        for n in range(2, 41):
+            _, combats = arbre(n)
+            demis = [c for c in combats if c["tour"] == "demi"]
+            bronzes = [c for c in combats if c["tour"] == "bronze"]
+            assert len(bronzes) == (1 if len(demis) == 2 else 0), n
+            for demi in demis:
+                if bronzes:
+                    assert demi["loser_next_combat_id"] == bronzes[0]["combat_id"]
+                else:
+                    assert demi["loser_next_combat_id"] is None
+            if bronzes:
+                assert {d["loser_slot"] for d in demis} == {"rouge", "bleu"}
+            assert len(combats) == n - 1 + len(bronzes)
+
+    def test_round_names_beyond_sixteen(self):
+        """The former 16-competitor cap is gone: 40 competitors use a 64-place bracket"""
+        _, combats = arbre(40)
+        tours = {c["tour"] for c in combats}
+        assert tours == {"tour_64", "tour_32", "huitieme", "quart", "demi", "bronze", "finale"}
+        assert len([c for c in combats if c["tour"] == "tour_32"]) == 16
+        assert [server.places_tour(server.nom_tour(p)) for p in (2, 4, 8, 16, 32, 64)] == [2, 4, 8, 16, 32, 64]
+
+    def test_two_competitors_give_a_single_final(self):
+        _, combats = arbre(2)
+        assert [c["tour"] for c in combats] == ["finale"]
+
+
+def trouver(combats, filtre):
+    return [c for c in combats if all(c.get(champ) == valeur for champ, valeur in filtre.items())]
+
+
+class TestCiblesPropagation:
+    """Tests for winner/loser propagation targets"""
+
+    def test_demi_targets_final_and_bronze(self):
+        _, combats = arbre(4)
+        finale = trouver(combats, {"tour": "finale"})[0]
+        bronze = trouver(combats, {"tour": "bronze"})[0]
+        for demi in trouver(combats, {"tour": "demi"}):
+            (filtre_v, slot_v), (filtre_p, slot_p) = server.cibles_propagation(demi)
+            assert trouver(combats, filtre_v) == [finale]
+            assert trouver(combats, filtre_p) == [bronze]
+            assert slot_v == slot_p == ("rouge" if demi["position"] == 1 else "bleu")
+
+    def test_legacy_bracket_without_pointers_uses_the_fallback(self):
+        """Without next_combat_id, targets found by category/tour/position match the pointers"""
+        for n in (3, 4, 8, 11, 16, 23):
+            _, combats = arbre(n)
+            anciens = [
+                {**c, "next_combat_id": None, "next_slot": None, "loser_next_combat_id": None, "loser_slot": None}
+                for c in combats
+            ]
+            for combat, ancien in zip(combats, anciens):
+                attendu = server.cibles_propagation(combat)
+                obtenu = server.cibles_propagation(ancien)
+                for cible_attendue, cible_obtenue in zip(attendu, obtenu):
+                    if cible_attendue is None:
+                        # Demi sans bronze (demi unique): la cible du perdant n'existe pas
+                        assert cible_obtenue is None or not trouver(anciens, cible_obtenue[0])
+                        continue
+                    (filtre_attendu, slot_attendu), (filtre_obtenu, slot_obtenu) = cible_attendue, cible_obtenue
+                    assert [c["combat_id"] for c in trouver(anciens, filtre_obtenu)] == \
+                        [c["combat_id"] for c in trouver(combats, filtre_attendu)]
+                    assert slot_obtenu == slot_attendu
+
+
+def premiere_categorie(categories, sexe, age, poids):
+    """Référence: premier document correspondant, comme find_one sur la collection"""
+    for cat in categories:
+        if (cat["sexe"] == sexe and cat["age_min"] <= age <= cat["age_max"]
+                and cat["poids_min"] <= poids <= cat["poids_max"]):
+            return cat["categorie_id"]
+    return None
+
+
+def verifier_index(categories, rng):
+    index = server.CategoryIndex(categories)
+    bornes_poids = sorted({c[champ] for c in categories for champ in ("poids_min", "poids_max")})
+    bornes_age = sorted({c[champ] for c in categories for champ in ("age_min", "age_max")})
+    poids = [p + d for p in bornes_poids for d in (-0.5, -0.01, 0, 0.01, 0.5)] + \
+        [rng.uniform(0, 210) for _ in range(300)]
+    ages = sorted({a + d for a in bornes_age for d in (-1, 0, 1)})
+    for sexe in ("M", "F"):
+        for age in ages:
+            for p in poids:
+                assert index.resoudre(sexe, age, p) == premiere_categorie(categories, sexe, age, p), (sexe, age, p)
+    assert index.resoudre("M", 20, None) is None
+
+
+class TestCategoryIndex:
+    """Tests for the bisection-based category assignment"""
+
+    def test_official_template_boundaries(self):
+        """poids == poids_max, age == age_min and neighbours resolve like the linear scan"""
+        categories = server.instancier_template(server.TEMPLATE_OFFICIEL, "comp_test")
+        verifier_index(categories, random.Random(1))
+
+    def test_overlapping_custom_categories(self):
+        """With overlaps, the category created first wins"""
+        officielles = server.instancier_template(server.TEMPLATE_OFFICIEL, "comp_test")
+        personnalisees = [
+            {"categorie_id": "cat_open", "sexe": "M", "age_min": 18, "age_max": 40, "poids_min": 60, "poids_max": 80},
+            {"categorie_id": "cat_lourds", "sexe": "M", "age_min": 25, "age_max": 99, "poids_min": 75.5, "poids_max": 200},
+            {"categorie_id": "cat_mixte_f", "sexe": "F", "age_min": 10, "age_max": 14, "poids_min": 30, "poids_max": 50},
+        ]
+        verifier_index(personnalisees + officielles, random.Random(2))
+        verifier_index(officielles + personnalisees, random.Random(3))
+
+
+def competition_fictive(nb_combats, rng):
+    """Arbres de catégories de 2 à 32 compétiteurs jusqu'à nb_combats"""
+    combats = []
+    numero = 0
+    while len(combats) < nb_combats:
+        numero += 1
+        ids = [f"cptr_{numero}_{i}" for i in range(rng.randint(2, 32))]
+        combats.extend(server.combats_en_documents(server.construire_arbre(ids, "comp_test", f"cat_{numero:03d}")))
+    return combats
+
+
+class TestOrdonnancement:
+    """Tests for ordonnancer_combats on a multi-category competition"""
+
+    REPOS = 10
+
+    def planifier(self, seed, nb_aires):
+        combats = competition_fictive(300, random.Random(seed))
+        aire_ids = [f"aire_{i + 1}" for i in range(nb_aires)]
+        plan, fin = server.ordonnancer_combats(combats, aire_ids, self.REPOS)
+        assert set(plan) == {c["combat_id"] for c in combats}
+        return combats, aire_ids, plan, fin
+
+    def test_predecessors_and_rest_time_are_respected(self):
+        for seed in range(3):
+            combats, _, plan, _ = self.planifier(seed, 4)
+            for combat_id, cibles in server.graphe_precedences(combats).items():
+                for cible in cibles:
+                    assert plan[cible]["debut"] >= plan[combat_id]["fin"] + self.REPOS
+
+    def test_no_overlap_on_an_aire(self):
+        _, aire_ids, plan, _ = self.planifier(0, 4)
+        for aire_id in aire_ids:
+            creneaux = sorted((p["debut"], p["fin"]) for p in plan.values() if p["aire_id"] == aire_id)
+            assert all(fin <= debut for (_, fin), (debut, _) in zip(creneaux, creneaux[1:]))
+
+    def test_finals_form_a_shared_final_block(self):
+        combats, _, plan, fin = self.planifier(1, 4)
+        par_id = {c["combat_id"]: c for c in combats}
+        finales = [p for cid, p in plan.items() if par_id[cid]["tour"] in server.TOURS_FINALES]
+        autres = [p for cid, p in plan.items() if par_id[cid]["tour"] not in server.TOURS_FINALES]
+        assert all(p["est_finale"] for p in finales) and not any(p["est_finale"] for p in autres)
+        debut_bloc = min(p["debut"] for p in finales)
+        assert debut_bloc >= max(p["fin"] for p in autres)
+        assert max(p["fin"] for p in finales) == fin
+
+    def test_load_is_balanced_across_aires(self):
+        for nb_aires in (3, 4, 6):
+            _, aire_ids, plan, _ = self.planifier(2, nb_aires)
+            charges = {aire_id: 0 for aire_id in aire_ids}
+            for p in plan.values():
+                charges[p["aire_id"]] += p["fin"] - p["debut"]
+            assert max(charges.values()) - min(charges.values()) <= 3 * server.DUREE_COMBAT_DEFAUT_MINUTES
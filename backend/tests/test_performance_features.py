@@ -0,0 +1,762 @@
+"""
+Test suite for Taekwondo Competition Management - Performance Features
+Tests: Batch weigh-in, weigh-in list, concurrent result submission
+"""
+import pytest
+import requests
+import os
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+BASE_URL = os.environ.get('REACT_APP_BACKEND_URL', '').rstrip('/')
+
+# Test credentials
+ADMIN_EMAIL = "admin2@test.com"
+ADMIN_PASSWORD = "admin123"
+
+
+@pytest.fixture(scope="module")
+def session():
+    """Create authenticated session"""
+    s = requests.Session()
+    s.headers.update({"Content-Type": "application/json"})
+    response = s.post(f"{BASE_URL}/api/auth/login", json={
+        "email": ADMIN_EMAIL,
+        "password": ADMIN_PASSWORD
+    })
+    assert response.status_code == 200, f"Login failed: {response.text}"
+    return s
+
+
+def creer_competition(session, nb_competiteurs):
+    """Create a seeded test competition with competitors in the same category"""
+    response = session.post(f"{BASE_URL}/api/competitions", json={
+        "nom": "TEST_Performance_Competition",
+        "date": "2026-06-01",
+        "lieu": "Test Location"
+    })
+    assert response.status_code == 200
+    competition_id = response.json()["competition_id"]
+
+    response = session.post(f"{BASE_URL}/api/categories/seed/{competition_id}")
+    assert response.status_code == 200
+
+    competiteurs = []
+    for i in range(nb_competiteurs):
+        response = session.post(f"{BASE_URL}/api/competiteurs", json={
+            "competition_id": competition_id,
+            "nom": f"TEST_Perf_{i}",
+            "prenom": "Athlete",
+            "date_naissance": "2000-01-01",
+            "sexe": "M",
+            "poids_declare": 70,
+            "club": f"TEST_Club_{i % 2}"
+        })
+        assert response.status_code == 200
+        competiteurs.append(response.json())
+
+    return {"competition_id": competition_id, "competiteurs": competiteurs}
+
+
+@pytest.fixture(scope="module")
+def competition(session):
+    data = creer_competition(session, 4)
+    yield data
+    session.delete(f"{BASE_URL}/api/competitions/{data['competition_id']}")
+
+
+class TestPeseeLot:
+    """Tests for POST /api/pesee/lot"""
+
+    def test_batch_weigh_in_reports_category_changes(self, session, competition):
+        """Weighing several athletes at once reassigns their categories"""
+        ids = [c["competiteur_id"] for c in competition["competiteurs"]]
+        response = session.post(f"{BASE_URL}/api/pesee/lot", json={
+            "competition_id": competition["competition_id"],
+            "pesees": [
+                {"competiteur_id": ids[0], "poids_officiel": 70},
+                {"competiteur_id": ids[1], "poids_officiel": 95},
+                {"competiteur_id": "cptr_inexistant", "poids_officiel": 60}
+            ]
+        })
+        assert response.status_code == 200
+        data = response.json()
+        assert data["enregistres"] == 2
+        assert data["introuvables"] == ["cptr_inexistant"]
+
+        resultats = {r["competiteur_id"]: r for r in data["resultats"]}
+        assert resultats[ids[0]]["categorie_changee"] is False
+        assert resultats[ids[1]]["categorie_changee"] is True
+        assert data["categories_changees"] == 1
+        print(f"✓ Batch weigh-in: {data['message']}")
+
+    def test_batch_weigh_in_requires_entries(self, session, competition):
+        """An empty batch is rejected"""
+        response = session.post(f"{BASE_URL}/api/pesee/lot", json={
+            "competition_id": competition["competition_id"],
+            "pesees": []
+        })
+        assert response.status_code == 400
+
+
+class TestListPesee:
+    """Tests for GET /api/pesee/{competition_id} filters and pagination"""
+
+    def test_cursor_pagination_returns_every_competitor_once(self, session, competition):
+        """Following X-Next-Cursor walks the whole list in club/nom order"""
+        url = f"{BASE_URL}/api/pesee/{competition['competition_id']}"
+        complet = session.get(url).json()
+
+        pages = []
+        params = {"limit": 3}
+        while True:
+            response = session.get(url, params=params)
+            assert response.status_code == 200
+            pages.extend(response.json())
+            curseur = response.headers.get("X-Next-Cursor")
+            if not curseur:
+                break
+            params = {"limit": 3, "cursor": curseur}
+
+        assert [c["competiteur_id"] for c in pages] == [c["competiteur_id"] for c in complet]
+        assert all("categorie_nom" in c for c in pages)
+        print(f"✓ Pagination covered {len(pages)} competitors")
+
+    def test_filters(self, session, competition):
+        """Club and weigh-in status filters are applied server-side"""
+        url = f"{BASE_URL}/api/pesee/{competition['competition_id']}"
+        par_club = session.get(url, params={"club": "TEST_Club_0"}).json()
+        assert par_club and all(c["club"] == "TEST_Club_0" for c in par_club)
+
+        non_peses = session.get(url, params={"pese": "false"}).json()
+        assert all(not c.get("pese") for c in non_peses)
+
+    def test_invalid_cursor(self, session, competition):
+        """A malformed cursor is rejected"""
+        response = session.get(f"{BASE_URL}/api/pesee/{competition['competition_id']}", params={"cursor": "invalide"})
+        assert response.status_code == 400
+
+
+class TestResultatConcurrent:
+    """Tests for atomic result recording (version guard and Idempotency-Key)"""
+
+    @pytest.fixture(scope="class")
+    def demis(self, session):
+        data = creer_competition(session, 4)
+        categorie_id = data["competiteurs"][0]["categorie_id"]
+        response = session.post(f"{BASE_URL}/api/combats/generer/{categorie_id}")
+        assert response.status_code == 200
+        combats = session.get(f"{BASE_URL}/api/combats", params={"categorie_id": categorie_id}).json()
+        yield [c for c in combats if c["tour"] == "demi"]
+        session.delete(f"{BASE_URL}/api/competitions/{data['competition_id']}")
+
+    def _soumettre(self, session, combat_id, nb, headers=None):
+        def envoyer(_):
+            return session.post(
+                f"{BASE_URL}/api/arbitre/resultat/{combat_id}",
+                params={"vainqueur": "rouge", "score_rouge": 3},
+                headers=headers or {}
+            )
+        with ThreadPoolExecutor(max_workers=nb) as executor:
+            return list(executor.map(envoyer, range(nb)))
+
+    def test_concurrent_results_apply_once(self, session, demis):
+        """Only one of several simultaneous submissions is applied"""
+        demi_finales = demis
+        combat = demi_finales[0]
+        assert session.post(f"{BASE_URL}/api/arbitre/lancer/{combat['combat_id']}").status_code == 200
+
+        responses = self._soumettre(session, combat["combat_id"], 8)
+        codes = [r.status_code for r in responses]
+        assert codes.count(200) == 1
+        assert all(code in (200, 400, 409) for code in codes)
+
+        combats = session.get(f"{BASE_URL}/api/combats", params={"categorie_id": combat["categorie_id"]}).json()
+        demi = next(c for c in combats if c["combat_id"] == combat["combat_id"])
+        assert demi["version"] == combat["version"] + 1
+        print(f"✓ Concurrent submissions: {codes}")
+
+    def test_idempotency_key_makes_retries_noops(self, session, demis):
+        """Retries carrying the same Idempotency-Key all succeed without re-applying"""
+        demi_finales = demis
+        combat = demi_finales[1]
+        assert session.post(f"{BASE_URL}/api/arbitre/lancer/{combat['combat_id']}").status_code == 200
+
+        responses = self._soumettre(session, combat["combat_id"], 8, {"Idempotency-Key": f"test-{combat['combat_id']}"})
+        assert all(r.status_code == 200 for r in responses)
+        assert {r.json()["version"] for r in responses} == {combat["version"] + 1}
+
+    def test_stale_version_is_rejected(self, session, demis):
+        """Correcting a result from an outdated view returns 409"""
+        demi_finales = demis
+        combat = demi_finales[0]
+        response = session.put(f"{BASE_URL}/api/combats/{combat['combat_id']}/resultat", json={
+            "vainqueur_id": combat["bleu_id"],
+            "version": combat["version"]
+        })
+        assert response.status_code == 409
+
+    def test_reopened_fight_accepts_the_same_result_again(self, session, demis):
+        """Resetting the status forgets the last key and bumps the version"""
+        combat_id = demis[1]["combat_id"]
+        cle = {"Idempotency-Key": f"reouverture-{combat_id}"}
+        url = f"{BASE_URL}/api/arbitre/resultat/{combat_id}"
+        session.put(f"{BASE_URL}/api/combats/{combat_id}/statut", params={"statut": "en_cours"})
+        assert session.post(url, params={"vainqueur": "rouge"}, headers=cle).status_code == 200
+
+        termine = session.get(f"{BASE_URL}/api/combats/{combat_id}").json()
+        response = session.put(f"{BASE_URL}/api/combats/{combat_id}/statut", params={"statut": "en_cours"})
+        assert response.status_code == 200
+        rouvert = session.get(f"{BASE_URL}/api/combats/{combat_id}").json()
+        assert rouvert["version"] == termine["version"] + 1
+        assert not rouvert["termine"] and "resultat_cle" not in rouvert
+
+        response = session.put(f"{BASE_URL}/api/combats/{combat_id}/resultat", json={
+            "vainqueur_id": rouvert["rouge_id"], "version": termine["version"]
+        })
+        assert response.status_code == 409
+        assert session.post(url, params={"vainqueur": "rouge"}, headers=cle).status_code == 200
+        assert session.get(f"{BASE_URL}/api/combats/{combat_id}").json()["termine"]
+
+
+class TestCompteurs:
+    """Tests for materialized competition counters"""
+
+    def _stats(self, session, competition_id):
+        response = session.get(f"{BASE_URL}/api/stats", params={"competition_id": competition_id})
+        assert response.status_code == 200
+        return response.json()
+
+    def test_counters_match_recount(self, session):
+        """Counters maintained by the mutating endpoints equal a full recount"""
+        data = creer_competition(session, 4)
+        competition_id = data["competition_id"]
+        ids = [c["competiteur_id"] for c in data["competiteurs"]]
+        try:
+            session.put(f"{BASE_URL}/api/pesee/{ids[0]}", json={"poids_officiel": 70})
+            session.delete(f"{BASE_URL}/api/competiteurs/{ids[3]}")
+            session.post(f"{BASE_URL}/api/combats/generer/{data['competiteurs'][0]['categorie_id']}")
+
+            stats = self._stats(session, competition_id)
+            assert stats["competiteurs"] == 3
+            assert stats["competiteurs_peses"] == 1
+            assert stats["combats_total"] > 0
+
+            response = session.post(f"{BASE_URL}/api/competitions/{competition_id}/compteurs/recalculer")
+            assert response.status_code == 200
+            assert self._stats(session, competition_id) == stats
+
+            competition = session.get(f"{BASE_URL}/api/competitions/{competition_id}").json()
+            assert competition["nb_competiteurs"] == 3
+            assert competition["nb_combats"] == stats["combats_total"]
+            print(f"✓ Counters: {stats}")
+        finally:
+            session.delete(f"{BASE_URL}/api/competitions/{competition_id}")
+
+
+class TestFileAire:
+    """Tests for the per-aire fight queue (suivant, lancer-finales)"""
+
+    def test_next_fight_stays_in_competition_and_aire(self, session):
+        """Passing to the next fight starts the head of the same aire's queue"""
+        data = creer_competition(session, 4)
+        competition_id = data["competition_id"]
+        try:
+            aire = session.post(f"{BASE_URL}/api/aires-combat", json={
+                "competition_id": competition_id, "nom": "TEST_Aire", "numero": 1
+            }).json()
+            session.post(f"{BASE_URL}/api/combats/generer/{data['competiteurs'][0]['categorie_id']}")
+            session.post(f"{BASE_URL}/api/aires-combat/repartir/{competition_id}")
+
+            combats = session.get(f"{BASE_URL}/api/combats", params={"competition_id": competition_id}).json()
+            demi = next(c for c in combats if c["tour"] == "demi")
+            response = session.post(f"{BASE_URL}/api/combats/{demi['combat_id']}/suivant")
+            assert response.status_code == 200
+
+            lance = session.get(f"{BASE_URL}/api/combats/{response.json()['combat_id']}").json()
+            assert lance["competition_id"] == competition_id
+            assert lance["aire_id"] == aire["aire_id"]
+            assert lance["statut"] == "en_cours"
+        finally:
+            session.delete(f"{BASE_URL}/api/competitions/{competition_id}")
+
+    def test_launch_finals_requires_competition(self, session):
+        """Finals are launched per competition only"""
+        response = session.post(f"{BASE_URL}/api/combats/lancer-finales")
+        assert response.status_code == 422
+
+
+class TestVueArbitreCache:
+    """Tests for the arbitre view snapshot (ETag / 304)"""
+
+    def test_unchanged_view_answers_304_until_a_fight_starts(self, session):
+        """Polls with the current ETag get 304; launching a fight publishes a new revision"""
+        data = creer_competition(session, 4)
+        competition_id = data["competition_id"]
+        try:
+            aire = session.post(f"{BASE_URL}/api/aires-combat", json={
+                "competition_id": competition_id, "nom": "TEST_Aire", "numero": 1
+            }).json()
+            session.post(f"{BASE_URL}/api/combats/generer/{data['competiteurs'][0]['categorie_id']}")
+            session.post(f"{BASE_URL}/api/aires-combat/repartir/{competition_id}")
+            url = f"{BASE_URL}/api/arbitre/aire/{aire['aire_id']}"
+
+            response = session.get(url)
+            assert response.status_code == 200
+            etag = response.headers["ETag"]
+            assert session.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+            prochain = response.json()["combats_a_venir"][0]
+            session.post(f"{BASE_URL}/api/arbitre/lancer/{prochain['combat_id']}")
+
+            response = session.get(url, headers={"If-None-Match": etag})
+            assert response.status_code == 200
+            assert response.headers["ETag"] != etag
+            assert response.json()["combat_en_cours"]["combat_id"] == prochain["combat_id"]
+        finally:
+            session.delete(f"{BASE_URL}/api/competitions/{competition_id}")
+
+
+class TestArbresCache:
+    """Tests for cached bracket payloads and the batch endpoint"""
+
+    def test_bracket_is_refreshed_after_a_result(self, session):
+        """A recorded result bumps the category revision; the batch endpoint returns the same payload"""
+        data = creer_competition(session, 4)
+        competition_id = data["competition_id"]
+        categorie_id = data["competiteurs"][0]["categorie_id"]
+        try:
+            session.post(f"{BASE_URL}/api/combats/generer/{categorie_id}")
+            arbre = session.get(f"{BASE_URL}/api/combats/arbre/{categorie_id}").json()
+            assert arbre["tours"] == ["demi", "bronze", "finale"]
+            assert arbre["combats_termines"] == 0
+
+            demi = arbre["arbre"]["demi"][0]
+            session.post(f"{BASE_URL}/api/arbitre/lancer/{demi['combat_id']}")
+            session.post(f"{BASE_URL}/api/arbitre/resultat/{demi['combat_id']}", params={"vainqueur": "rouge"})
+
+            arbre = session.get(f"{BASE_URL}/api/combats/arbre/{categorie_id}").json()
+            assert arbre["combats_termines"] == 1
+            finale = arbre["arbre"]["finale"][0]
+            assert demi["rouge_id"] in (finale["rouge_id"], finale["bleu_id"])
+
+            response = session.get(f"{BASE_URL}/api/combats/arbres", params={"competition_id": competition_id})
+            assert response.status_code == 200
+            assert response.json()[categorie_id]["combats_termines"] == 1
+        finally:
+            session.delete(f"{BASE_URL}/api/competitions/{competition_id}")
+
+    def test_deleted_or_reseeded_category_is_not_served_from_cache(self, session):
+        data = creer_competition(session, 4)
+        competition_id = data["competition_id"]
+        categorie_id = data["competiteurs"][0]["categorie_id"]
+        try:
+            session.post(f"{BASE_URL}/api/combats/generer/{categorie_id}")
+            assert session.get(f"{BASE_URL}/api/combats/arbre/{categorie_id}").json()["categorie"] is not None
+            assert session.delete(f"{BASE_URL}/api/categories/{categorie_id}").status_code == 200
+            assert session.get(f"{BASE_URL}/api/combats/arbre/{categorie_id}").json()["categorie"] is None
+
+            autre_id = session.get(f"{BASE_URL}/api/categories", params={"competition_id": competition_id}).json()[0]["categorie_id"]
+            assert session.get(f"{BASE_URL}/api/combats/arbre/{autre_id}").json()["categorie"] is not None
+            assert session.post(f"{BASE_URL}/api/categories/seed/{competition_id}").status_code == 200
+            assert session.get(f"{BASE_URL}/api/combats/arbre/{autre_id}").json()["categorie"] is None
+        finally:
+            session.delete(f"{BASE_URL}/api/competitions/{competition_id}")
+
+
+class TestListesPaginees:
+    """Tests for keyset pagination and NDJSON streaming on list endpoints"""
+
+    def parcourir(self, session, url, params, limit):
+        """Chain pages with X-Next-Cursor"""
+        pages = []
+        suite = {**params, "limit": limit}
+        while True:
+            response = session.get(url, params=suite)
+            assert response.status_code == 200
+            pages.extend(response.json())
+            curseur = response.headers.get("X-Next-Cursor")
+            if not curseur:
+                return pages
+            suite = {**params, "limit": limit, "cursor": curseur}
+
+    def test_cursor_pagination_on_competitors(self, session, competition):
+        """Pages chained with X-Next-Cursor cover the unpaginated list exactly"""
+        url = f"{BASE_URL}/api/competiteurs"
+        params = {"competition_id": competition["competition_id"]}
+        complet = session.get(url, params=params).json()
+
+        pages = self.parcourir(session, url, params, 3)
+        assert [c["competiteur_id"] for c in pages] == [c["competiteur_id"] for c in complet]
+
+    def test_history_and_medals_keep_their_natural_order(self, session):
+        """History is chronological and medals go or, argent, bronze, across pages"""
+        data = creer_competition(session, 4)
+        categorie_id = data["competiteurs"][0]["categorie_id"]
+        try:
+            session.post(f"{BASE_URL}/api/combats/generer/{categorie_id}")
+            combats = session.get(f"{BASE_URL}/api/combats", params={"categorie_id": categorie_id}).json()
+            demi = next(c for c in combats if c["tour"] == "demi")
+            for score in range(6):
+                response = session.put(f"{BASE_URL}/api/combats/{demi['combat_id']}/resultat", json={
+                    "vainqueur_id": demi["rouge_id"], "score_rouge": score
+                })
+                assert response.status_code == 200
+            historique = self.parcourir(session, f"{BASE_URL}/api/historique", {"combat_id": demi["combat_id"]}, 2)
+            assert [h["nouveau_score_rouge"] for h in historique] == [1, 2, 3, 4, 5]
+
+            for tour in ("demi", "bronze", "finale"):
+                combats = session.get(f"{BASE_URL}/api/combats", params={"categorie_id": categorie_id}).json()
+                for combat in [c for c in combats if c["tour"] == tour and not c["termine"]]:
+                    response = session.put(f"{BASE_URL}/api/combats/{combat['combat_id']}/resultat", json={
+                        "vainqueur_id": combat["rouge_id"]
+                    })
+                    assert response.status_code == 200
+            assert session.post(f"{BASE_URL}/api/combats/{categorie_id}/attribuer-medailles").status_code == 200
+            medailles = self.parcourir(session, f"{BASE_URL}/api/medailles", {"categorie_id": categorie_id}, 1)
+            assert [m["type"] for m in medailles] == ["or", "argent", "bronze"]
+        finally:
+            session.delete(f"{BASE_URL}/api/competitions/{data['competition_id']}")
+
+    def test_ndjson_streaming(self, session, competition):
+        """Accept: application/x-ndjson returns one JSON document per line"""
+        response = session.get(
+            f"{BASE_URL}/api/categories",
+            params={"competition_id": competition["competition_id"]},
+            headers={"Accept": "application/x-ndjson"}
+        )
+        assert response.status_code == 200
+        assert response.headers["Content-Type"].startswith("application/x-ndjson")
+        lignes = [json.loads(ligne) for ligne in response.text.splitlines() if ligne]
+        assert lignes and all("categorie_id" in ligne for ligne in lignes)
+
+
+class TestCompression:
+    """Tests for response compression"""
+
+    def test_large_list_is_gzipped(self, session, competition):
+        """A list above the size threshold is sent gzip-encoded and decodes to the same JSON"""
+        url = f"{BASE_URL}/api/categories"
+        params = {"competition_id": competition["competition_id"]}
+        response = session.get(url, params=params, headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers.get("Content-Encoding") == "gzip"
+        assert "Accept-Encoding" in response.headers.get("Vary", "")
+
+        brut = session.get(url, params=params, headers={"Accept-Encoding": "identity"})
+        assert "Content-Encoding" not in brut.headers
+        assert response.json() == brut.json()
+
+    def test_xlsx_export_is_not_recompressed(self, session, competition):
+        """Already-deflated formats are sent as is"""
+        response = session.get(
+            f"{BASE_URL}/api/excel/competiteurs/export/{competition['competition_id']}",
+            headers={"Accept-Encoding": "gzip"}
+        )
+        assert response.status_code == 200
+        assert "Content-Encoding" not in response.headers
+        assert response.content[:2] == b"PK"
+
+    def test_small_response_is_not_compressed(self, session):
+        """Responses below the threshold are sent as is"""
+        response = session.get(f"{BASE_URL}/api/auth/me", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert "Content-Encoding" not in response.headers
+
+
+class TestCategorieTemplates:
+    """Tests for versioned category templates"""
+
+    def test_official_template_is_listed(self, session):
+        """The official FFTA/FFDA template is registered at startup"""
+        response = session.get(f"{BASE_URL}/api/categorie-templates")
+        assert response.status_code == 200
+        officiel = [t for t in response.json() if t["template_id"] == "tpl_ffta_2025_2026"]
+        assert len(officiel) == 1
+        assert officiel[0]["nb_categories"] == 126
+
+    def test_competition_created_from_template(self, session):
+        """A custom template is versioned by name and applied at competition creation"""
+        ligne = {"nom": "TEST Open", "age_min": 6, "age_max": 99, "sexe": "M", "poids_min": 0, "poids_max": 200}
+        v1 = session.post(f"{BASE_URL}/api/categorie-templates", json={"nom": "TEST_Modele", "categories": [ligne]}).json()
+        v2 = session.post(f"{BASE_URL}/api/categorie-templates", json={"nom": "TEST_Modele", "categories": [ligne]}).json()
+        assert v2["version"] == v1["version"] + 1
+
+        response = session.post(f"{BASE_URL}/api/competitions", params={"template_id": v2["template_id"]}, json={
+            "nom": "TEST_Template_Competition",
+            "date": "2026-06-01",
+            "lieu": "Test Location"
+        })
+        assert response.status_code == 200
+        competition = response.json()
+        competition_id = competition["competition_id"]
+        try:
+            assert competition["categorie_template"]["version"] == v2["version"]
+            categories = session.get(f"{BASE_URL}/api/categories", params={"competition_id": competition_id}).json()
+            assert [c["nom"] for c in categories] == ["TEST Open"]
+
+            response = session.post(f"{BASE_URL}/api/categories/seed/{competition_id}")
+            assert response.json()["total"] == 126
+            stats = session.get(f"{BASE_URL}/api/stats", params={"competition_id": competition_id}).json()
+            assert stats["categories"] == 126
+        finally:
+            session.delete(f"{BASE_URL}/api/competitions/{competition_id}")
+            for template in (v1, v2):
+                session.delete(f"{BASE_URL}/api/categorie-templates/{template['template_id']}")
+
+
+class TestPropagation:
+    """Tests for winner/loser propagation through bracket pointers"""
+
+    def test_demi_result_fills_final_and_bronze(self, session):
+        data = creer_competition(session, 4)
+        competition_id = data["competition_id"]
+        categorie_id = data["competiteurs"][0]["categorie_id"]
+        try:
+            session.post(f"{BASE_URL}/api/combats/generer/{categorie_id}")
+            arbre = session.get(f"{BASE_URL}/api/combats/arbre/{categorie_id}").json()["arbre"]
+            demi = next(d for d in arbre["demi"] if d["position"] == 1)
+            finale_id = arbre["finale"][0]["combat_id"]
+            bronze_id = arbre["bronze"][0]["combat_id"]
+
+            session.post(f"{BASE_URL}/api/arbitre/lancer/{demi['combat_id']}")
+            response = session.post(f"{BASE_URL}/api/arbitre/resultat/{demi['combat_id']}", params={"vainqueur": "bleu"})
+            assert response.status_code == 200
+
+            finale = session.get(f"{BASE_URL}/api/combats/{finale_id}").json()
+            bronze = session.get(f"{BASE_URL}/api/combats/{bronze_id}").json()
+            assert finale["rouge_id"] == demi["bleu_id"]
+            assert bronze["rouge_id"] == demi["rouge_id"]
+        finally:
+            session.delete(f"{BASE_URL}/api/competitions/{competition_id}")
+
+
+class TestGenererTout:
+    """Tests for whole-competition bracket generation"""
+
+    def test_generation_counts_and_second_call(self, session):
+        """11 competitors give 10 fights plus bronze with 5 byes; a second call keeps played fights"""
+        data = creer_competition(session, 11)
+        competition_id = data["competition_id"]
+        categorie_id = data["competiteurs"][0]["categorie_id"]
+        url = f"{BASE_URL}/api/combats/generer-tout/{competition_id}"
+        try:
+            response = session.post(url)
+            assert response.status_code == 200
+            ligne = next(c for c in response.json()["categories"] if c["categorie_id"] == categorie_id)
+            assert ligne["statut"] == "generee"
+            assert ligne["nb_combats"] == 11
+            assert ligne["nb_byes"] == 5
+
+            combats = session.get(f"{BASE_URL}/api/combats", params={"categorie_id": categorie_id}).json()
+            assert len(combats) == 11
+            assert len([c for c in combats if c["tour"] == "bronze"]) == 1
+            joue = next(c for c in combats if c["rouge_id"] and c["bleu_id"])
+            session.post(f"{BASE_URL}/api/arbitre/lancer/{joue['combat_id']}")
+            session.post(f"{BASE_URL}/api/arbitre/resultat/{joue['combat_id']}", params={"vainqueur": "rouge"})
+
+            for params in ({}, {"ignorer_existants": "true"}):
+                response = session.post(url, params=params)
+                assert response.status_code == 200
+                ligne = next(c for c in response.json()["categories"] if c["categorie_id"] == categorie_id)
+                assert ligne["statut"] == "ignoree"
+
+            apres = session.get(f"{BASE_URL}/api/combats", params={"categorie_id": categorie_id}).json()
+            assert sorted(c["combat_id"] for c in apres) == sorted(c["combat_id"] for c in combats)
+            assert next(c for c in apres if c["combat_id"] == joue["combat_id"])["termine"] is True
+        finally:
+            session.delete(f"{BASE_URL}/api/competitions/{competition_id}")
+
+
+def classeur_import(nb_valides, nb_invalides):
+    """Workbook without the optional Surclassé column: valid rows then invalid weights"""
+    from openpyxl import Workbook
+
+    wb = Workbook()
+    ws = wb.active
+    ws.append(["Nom*", "Prénom*", "Date de naissance*", "Sexe*", "Poids déclaré*", "Club*"])
+    for i in range(nb_valides):
+        ws.append([f"TEST_Import_{i}", "Athlete", "01/01/2000", "M", 70, "TEST_Club"])
+    for i in range(nb_invalides):
+        ws.append([f"TEST_Invalide_{i}", "Athlete", "01/01/2000", "M", "lourd", "TEST_Club"])
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer.getvalue()
+
+
+class TestImportExcel:
+    """Tests for the streaming Excel import"""
+
+    def importer(self, session, competition_id, contenu, **params):
+        return session.post(
+            f"{BASE_URL}/api/excel/competiteurs/import/{competition_id}",
+            params=params,
+            files={"file": ("import.xlsx", io.BytesIO(contenu), "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")},
+            headers={"Content-Type": None}
+        )
+
+    def test_dry_run_then_import(self, session):
+        """dry_run returns every error and writes nothing; the real import inserts valid rows in chunks"""
+        competition_id = creer_competition(session, 0)["competition_id"]
+        contenu = classeur_import(510, 12)
+        try:
+            response = self.importer(session, competition_id, contenu, dry_run="true")
+            assert response.status_code == 200, response.text
+            data = response.json()
+            assert data["dry_run"] is True
+            assert data["valides"] == 510
+            assert data["imported"] == 0
+            assert data["total_errors"] == 12
+            assert len(data["errors"]) == 12
+            assert data["errors"][0].startswith("Ligne 512:")
+            assert session.get(f"{BASE_URL}/api/competiteurs", params={"competition_id": competition_id}).json() == []
+
+            response = self.importer(session, competition_id, contenu)
+            assert response.status_code == 200, response.text
+            data = response.json()
+            assert data["imported"] == 510
+            assert data["total_errors"] == 12
+            assert len(data["errors"]) == 10
+            competiteurs = session.get(f"{BASE_URL}/api/competiteurs", params={"competition_id": competition_id}).json()
+            assert len(competiteurs) == 510
+            assert all(c["surclasse"] is False and c["categorie_id"] for c in competiteurs)
+        finally:
+            session.delete(f"{BASE_URL}/api/competitions/{competition_id}")
+
+
+class TestExportExcel:
+    """Tests for the streamed XLSX export"""
+
+    def test_export_reads_back_with_openpyxl(self, session):
+        """Headers, row count and escaping of &, < and non-ASCII names survive the round-trip"""
+        from openpyxl import load_workbook
+
+        data = creer_competition(session, 3)
+        competition_id = data["competition_id"]
+        noms = ["Dupont & Fils", "<Martin>", "Ñoël-Çaïa Øster"]
+        try:
+            for nom in noms:
+                response = session.post(f"{BASE_URL}/api/competiteurs", json={
+                    "competition_id": competition_id,
+                    "nom": nom,
+                    "prenom": "Élodie",
+                    "date_naissance": "2001-02-03",
+                    "sexe": "F",
+                    "poids_declare": 55.5,
+                    "club": "TEST_Club <&>"
+                })
+                assert response.status_code == 200
+
+            response = session.get(f"{BASE_URL}/api/excel/competiteurs/export/{competition_id}")
+            assert response.status_code == 200
+            wb = load_workbook(io.BytesIO(response.content))
+            lignes = list(wb.active.iter_rows(values_only=True))
+            assert list(lignes[0]) == ["Nom", "Prénom", "Date de naissance", "Sexe", "Poids déclaré",
+                                       "Poids officiel", "Club", "Catégorie", "Pesé", "Surclassé"]
+            assert len(lignes) == 1 + 3 + len(noms)
+
+            exportes = {ligne[0]: ligne for ligne in lignes[1:]}
+            for nom in noms:
+                assert exportes[nom][1] == "Élodie"
+                assert exportes[nom][2] == "03/02/2001"
+                assert exportes[nom][4] == 55.5
+                assert exportes[nom][6] == "TEST_Club <&>"
+        finally:
+            session.delete(f"{BASE_URL}/api/competitions/{competition_id}")
+
+
+class TestReorder:
+    """Tests for moving fights within an aire"""
+
+    @pytest.fixture
+    def aire(self, session):
+        data = creer_competition(session, 8)
+        competition_id = data["competition_id"]
+        aire = session.post(f"{BASE_URL}/api/aires-combat", json={
+            "competition_id": competition_id, "nom": "TEST_Aire", "numero": 1
+        }).json()
+        session.post(f"{BASE_URL}/api/combats/generer/{data['competiteurs'][0]['categorie_id']}")
+        session.post(f"{BASE_URL}/api/aires-combat/repartir/{competition_id}")
+        yield aire["aire_id"]
+        session.delete(f"{BASE_URL}/api/competitions/{competition_id}")
+
+    def ordre(self, session, aire_id):
+        combats = session.get(f"{BASE_URL}/api/combats/ordre/{aire_id}").json()
+        combats.sort(key=lambda c: c["ordre"])
+        assert [c["ordre"] for c in combats] == list(range(1, len(combats) + 1))
+        return [c["combat_id"] for c in combats]
+
+    def deplacer(self, session, aire_id, combat_id, nouvel_ordre):
+        response = session.put(f"{BASE_URL}/api/combats/reorder/{aire_id}", json={
+            "combat_id": combat_id, "nouvel_ordre": nouvel_ordre
+        })
+        assert response.status_code == 200
+        return response.json()
+
+    def test_move_up(self, session, aire):
+        avant = self.ordre(session, aire)
+        assert len(avant) == 8
+        assert self.deplacer(session, aire, avant[5], 2)["combats_decales"] == 4
+        assert self.ordre(session, aire) == avant[:1] + [avant[5]] + avant[1:5] + avant[6:]
+
+    def test_move_down_into_finals(self, session, aire):
+        """Moving a regular fight past the finals keeps the numbering contiguous"""
+        avant = self.ordre(session, aire)
+        assert self.deplacer(session, aire, avant[0], 8)["combats_decales"] == 7
+        assert self.ordre(session, aire) == avant[1:] + [avant[0]]
+
+    def test_span_with_a_finished_fight(self, session, aire):
+        """A finished fight inside the span is shifted too: no two fights share an ordre"""
+        avant = self.ordre(session, aire)
+        termine = avant[1]
+        assert session.post(f"{BASE_URL}/api/arbitre/lancer/{termine}").status_code == 200
+        response = session.post(f"{BASE_URL}/api/arbitre/resultat/{termine}", params={"vainqueur": "rouge"})
+        assert response.status_code == 200
+
+        assert self.deplacer(session, aire, avant[5], 1)["combats_decales"] == 5
+        competition_id = session.get(f"{BASE_URL}/api/combats/{termine}").json()["competition_id"]
+        combats = session.get(f"{BASE_URL}/api/combats", params={"competition_id": competition_id}).json()
+        assert [c["ordre"] for c in combats] == list(range(1, 9))
+        assert [c["combat_id"] for c in combats] == [avant[5]] + avant[:5] + avant[6:]
+
+    def test_target_is_clamped_to_last_fight(self, session, aire):
+        avant = self.ordre(session, aire)
+        assert self.deplacer(session, aire, avant[0], 99)["combats_decales"] == 7
+        assert self.ordre(session, aire) == avant[1:] + [avant[0]]
+
+    def test_full_list_reorder(self, session, aire):
+        avant = self.ordre(session, aire)
+        response = session.put(f"{BASE_URL}/api/combats/reorder/{aire}", json={"combat_ids": avant[::-1]})
+        assert response.status_code == 200
+        assert self.ordre(session, aire) == avant[::-1]
+
+
+class TestModifierOrdre:
+    """Tests for manual order/time edits of a fight"""
+
+    def test_bad_time_is_rejected_and_aire_keeps_working(self, session):
+        data = creer_competition(session, 4)
+        competition_id = data["competition_id"]
+        try:
+            aire = session.post(f"{BASE_URL}/api/aires-combat", json={
+                "competition_id": competition_id, "nom": "TEST_Aire", "numero": 1
+            }).json()
+            session.post(f"{BASE_URL}/api/combats/generer/{data['competiteurs'][0]['categorie_id']}")
+            session.post(f"{BASE_URL}/api/aires-combat/repartir/{competition_id}")
+            combats = session.get(f"{BASE_URL}/api/combats/ordre/{aire['aire_id']}").json()
+            premier, second = combats[0], combats[1]
+
+            url = f"{BASE_URL}/api/combats/modifier-ordre"
+            response = session.put(url, json={"combat_id": premier["combat_id"], "nouvel_ordre": 1, "nouvelle_heure": "9h30"})
+            assert response.status_code == 422
+            response = session.put(url, json={"combat_id": second["combat_id"], "nouvel_ordre": 2, "nouvelle_heure": "9:5"})
+            assert response.status_code == 200
+            assert session.get(f"{BASE_URL}/api/combats/{second['combat_id']}").json()["heure_debut"] == "09:05"
+
+            response = session.post(f"{BASE_URL}/api/arbitre/lancer/{premier['combat_id']}")
+            assert response.status_code == 200
+            response = session.post(f"{BASE_URL}/api/arbitre/resultat/{premier['combat_id']}", params={"vainqueur": "rouge"})
+            assert response.status_code == 200
+        finally:
+            session.delete(f"{BASE_URL}/api/competitions/{competition_id}")
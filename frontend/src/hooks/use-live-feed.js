@@ -0,0 +1,47 @@
+import { useEffect, useRef } from "react";
+
+const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
+const API = `${BACKEND_URL}/api`;
+
+const EVENT_TYPES = [
+  "combat_lance",
+  "resultat",
+  "forfait",
+  "combat_mis_a_jour",
+  "combats_reordonnes",
+  "resync"
+];
+
+// Abonnement au flux Server-Sent Events d'une compétition (optionnellement d'une aire).
+// onEvent est appelé pour chaque modification de combat, ainsi qu'à chaque (re)connexion
+// afin de resynchroniser l'écran après une coupure réseau.
+export function useLiveFeed(competitionId, aireId, onEvent) {
+  const callbackRef = useRef(onEvent);
+
+  useEffect(() => {
+    callbackRef.current = onEvent;
+  }, [onEvent]);
+
+  useEffect(() => {
+    if (!competitionId || typeof EventSource === "undefined") return undefined;
+
+    let url = `${API}/live/competition/${competitionId}`;
+    if (aireId) url += `?aire_id=${aireId}`;
+
+    const source = new EventSource(url, { withCredentials: true });
+    const handler = (event) => {
+      let data = null;
+      try {
+        data = event.data ? JSON.parse(event.data) : null;
+      } catch (error) {
+        data = null;
+      }
+      callbackRef.current?.(event.type, data);
+    };
+
+    source.addEventListener("connecte", handler);
+    EVENT_TYPES.forEach((type) => source.addEventListener(type, handler));
+
+    return () => source.close();
+  }, [competitionId, aireId]);
+}
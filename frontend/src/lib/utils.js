@@ -4,3 +4,32 @@ import { twMerge } from "tailwind-merge"
 export function cn(...inputs) {
   return twMerge(clsx(inputs));
 }
+
+// Clés d'idempotence des saisies restées sans réponse, par saisie
+const clesEnAttente = new Map();
+
+function nouvelleCle() {
+  if (crypto.randomUUID) return crypto.randomUUID();
+  // randomUUID n'existe qu'en contexte sécurisé (HTTPS ou localhost)
+  const octets = crypto.getRandomValues(new Uint8Array(16));
+  octets[6] = (octets[6] & 0x0f) | 0x40;
+  octets[8] = (octets[8] & 0x3f) | 0x80;
+  const hex = Array.from(octets, (o) => o.toString(16).padStart(2, "0")).join("");
+  return `${hex.slice(0, 8)}-${hex.slice(8, 12)}-${hex.slice(12, 16)}-${hex.slice(16, 20)}-${hex.slice(20)}`;
+}
+
+// Envoie une saisie avec une clé d'idempotence propre à cette tentative.
+// La clé n'est réutilisée que pour renvoyer la même saisie restée sans
+// réponse (réseau coupé, délai dépassé), qui a pu être appliquée.
+export async function envoyerUneFois(saisie, envoyer) {
+  const cle = clesEnAttente.get(saisie) ?? nouvelleCle();
+  clesEnAttente.set(saisie, cle);
+  try {
+    const reponse = await envoyer(cle);
+    clesEnAttente.delete(saisie);
+    return reponse;
+  } catch (error) {
+    if (error.response) clesEnAttente.delete(saisie);
+    throw error;
+  }
+}
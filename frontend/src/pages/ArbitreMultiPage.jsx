@@ -4,6 +4,8 @@ import axios from "axios";
 import { toast } from "sonner";
 import { Layout } from "../components/Layout";
 import { useAuth, useCompetition } from "../App";
+import { useLiveFeed } from "../hooks/use-live-feed";
+import { envoyerUneFois } from "../lib/utils";
 import { Card, CardContent, CardHeader, CardTitle } from "../components/ui/card";
 import { Button } from "../components/ui/button";
 import { Badge } from "../components/ui/badge";
@@ -240,12 +242,19 @@ export default function ArbitreMultiPage() {
   useEffect(() => {
     if (selectedAires.length > 0) {
       fetchAllData();
-      // Rafraîchir toutes les 5 secondes
-      const interval = setInterval(fetchAllData, 5000);
-      return () => clearInterval(interval);
     }
   }, [selectedAires]);
 
+  // Rafraîchir uniquement l'aire concernée par chaque modification poussée par le serveur
+  useLiveFeed(competition?.competition_id, null, (type, event) => {
+    if (selectedAires.length === 0) return;
+    if (event?.aire_id && type !== "connecte") {
+      if (selectedAires.includes(event.aire_id)) fetchAireData(event.aire_id);
+    } else {
+      fetchAllData();
+    }
+  });
+
   const fetchAires = async () => {
     try {
       const response = await axios.get(
@@ -321,7 +330,8 @@ export default function ArbitreMultiPage() {
 
   const saisirResultat = async (combatId, vainqueur, scores) => {
     try {
-      await axios.post(
+      // Une double saisie du même résultat n'est appliquée qu'une fois
+      await envoyerUneFois(`${combatId}-${vainqueur}-${scores.rouge}-${scores.bleu}`, (cle) => axios.post(
         `${API}/arbitre/resultat/${combatId}`,
         null,
         { 
@@ -331,9 +341,10 @@ export default function ArbitreMultiPage() {
             score_bleu: scores.bleu,
             type_victoire: "normal"
           },
+          headers: { "Idempotency-Key": cle },
           withCredentials: true 
         }
-      );
+      ));
       toast.success("Résultat enregistré !");
       fetchAllData();
     } catch (error) {
@@ -3,6 +3,8 @@ import { useParams, useNavigate } from "react-router-dom";
 import axios from "axios";
 import { toast } from "sonner";
 import { useAuth, useCompetition } from "../App";
+import { useLiveFeed } from "../hooks/use-live-feed";
+import { envoyerUneFois } from "../lib/utils";
 import { Card, CardContent, CardHeader, CardTitle } from "../components/ui/card";
 import { Button } from "../components/ui/button";
 import { Badge } from "../components/ui/badge";
@@ -47,11 +49,11 @@ export default function ArbitrePage() {
 
   useEffect(() => {
     fetchData();
-    // Rafraîchir toutes les 5 secondes
-    const interval = setInterval(fetchData, 5000);
-    return () => clearInterval(interval);
   }, [fetchData]);
 
+  // Rafraîchir à chaque modification poussée par le serveur sur cette aire
+  useLiveFeed(competition?.competition_id || data?.aire?.competition_id, aireId, fetchData);
+
   const lancerCombat = async (combatId) => {
     try {
       await axios.post(`${API}/arbitre/lancer/${combatId}`, {}, { withCredentials: true });
@@ -67,8 +69,10 @@ export default function ArbitrePage() {
     
     setSubmitting(true);
     try {
-      await axios.post(
-        `${API}/arbitre/resultat/${data.combat_en_cours.combat_id}`,
+      const combatId = data.combat_en_cours.combat_id;
+      // Une double saisie du même résultat n'est appliquée qu'une fois
+      await envoyerUneFois(`${combatId}-${vainqueur}-${scores.rouge}-${scores.bleu}`, (cle) => axios.post(
+        `${API}/arbitre/resultat/${combatId}`,
         null,
         { 
           params: {
@@ -77,9 +81,10 @@ export default function ArbitrePage() {
             score_bleu: scores.bleu,
             type_victoire: "normal"
           },
+          headers: { "Idempotency-Key": cle },
           withCredentials: true 
         }
-      );
+      ));
       toast.success("Résultat enregistré !");
       setScores({ rouge: 0, bleu: 0 });
       fetchData();
@@ -20,6 +20,10 @@ import { motion } from "framer-motion";
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
 
+// Tours affichés avec leur propre colonne ci-dessous; les tours précédents (huitièmes, tour_32...) sont génériques
+const TOURS_PRINCIPAUX = ["quart", "demi", "bronze", "finale"];
+const titreTour = (tour) => tour === "huitieme" ? "Huitièmes de finale" : `Tour de ${tour.replace("tour_", "")}`;
+
 export default function ArbreCombatsPage() {
   const { isAdmin } = useAuth();
   const [categories, setCategories] = useState([]);
@@ -306,6 +310,18 @@ export default function ArbreCombatsPage() {
               </CardHeader>
               <CardContent className="p-6">
                 <div className="flex gap-8 min-w-max">
+                  {/* Premiers tours */}
+                  {(arbreData.tours || [])
+                    .filter(tour => !TOURS_PRINCIPAUX.includes(tour))
+                    .map(tour => (
+                      <RoundColumn
+                        key={tour}
+                        title={titreTour(tour)}
+                        combats={arbreData.arbre[tour]}
+                        color="slate"
+                      />
+                    ))}
+                  
                   {/* Quarts */}
                   {arbreData.arbre.quart.length > 0 && (
                     <RoundColumn 
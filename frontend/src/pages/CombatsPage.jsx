@@ -127,7 +127,7 @@ export default function CombatsPage() {
     try {
       await axios.put(
         `${API}/combats/${selectedCombat.combat_id}/resultat`,
-        resultatForm,
+        { ...resultatForm, version: selectedCombat.version },
         { withCredentials: true }
       );
       toast.success("Résultat enregistré");
@@ -2,7 +2,8 @@ import { useState, useEffect } from "react";
 import axios from "axios";
 import { toast } from "sonner";
 import { Layout } from "../components/Layout";
-import { useAuth } from "../App";
+import { useAuth, useCompetition } from "../App";
+import { useLiveFeed } from "../hooks/use-live-feed";
 import { Card, CardContent, CardHeader, CardTitle } from "../components/ui/card";
 import { Button } from "../components/ui/button";
 import { Input } from "../components/ui/input";
@@ -25,9 +26,11 @@ import { motion } from "framer-motion";
 
 const BACKEND_URL = process.env.REACT_APP_BACKEND_URL;
 const API = `${BACKEND_URL}/api`;
+const PLANIFICATION_COMPETITION = "__competition__";
 
 export default function CombatsSuivrePage() {
   const { isAdmin } = useAuth();
+  const { competition } = useCompetition();
   const [combats, setCombats] = useState([]);
   const [categories, setCategories] = useState([]);
   const [tatamis, setTatamis] = useState([]);
@@ -48,10 +51,16 @@ export default function CombatsSuivrePage() {
 
   useEffect(() => {
     fetchData();
-    // Rafraîchir toutes les 30 secondes
+  }, []);
+
+  // Rafraîchir à chaque modification poussée par le serveur (sans compétition sélectionnée: toutes les 30 secondes)
+  useLiveFeed(competition?.competition_id, null, () => fetchCombats());
+
+  useEffect(() => {
+    if (competition?.competition_id) return undefined;
     const interval = setInterval(fetchCombats, 30000);
     return () => clearInterval(interval);
-  }, []);
+  }, [competition]);
 
   useEffect(() => {
     fetchCombats();
@@ -103,8 +112,15 @@ export default function CombatsSuivrePage() {
   };
 
   const handleLancerFinales = async () => {
+    if (!competition?.competition_id) {
+      toast.error("Sélectionnez d'abord une compétition");
+      return;
+    }
     try {
-      const response = await axios.post(`${API}/combats/lancer-finales`, {}, { withCredentials: true });
+      const response = await axios.post(`${API}/combats/lancer-finales`, {}, {
+        params: { competition_id: competition?.competition_id },
+        withCredentials: true
+      });
       toast.success(response.data.message);
       fetchCombats();
     } catch (error) {
@@ -138,15 +154,25 @@ export default function CombatsSuivrePage() {
       return;
     }
     try {
-      const response = await axios.post(
-        `${API}/combats/planifier/${planificationCategorie}`,
-        {
-          heure_debut_competition: heureDebut,
-          duree_combat_minutes: dureeCombat,
-          pauses: pauses
-        },
-        { withCredentials: true }
-      );
+      // Toute la compétition: horaires calculés aire par aire, sans collision
+      const response = planificationCategorie === PLANIFICATION_COMPETITION
+        ? await axios.post(
+            `${API}/competitions/${competition.competition_id}/planifier`,
+            {
+              heure_debut: heureDebut,
+              duree_combat_minutes: dureeCombat
+            },
+            { withCredentials: true }
+          )
+        : await axios.post(
+            `${API}/combats/planifier/${planificationCategorie}`,
+            {
+              heure_debut_competition: heureDebut,
+              duree_combat_minutes: dureeCombat,
+              pauses: pauses
+            },
+            { withCredentials: true }
+          );
       toast.success(`${response.data.message} - Fin estimée: ${response.data.heure_fin_estimee}`);
       setPlanificationDialog(false);
       fetchCombats();
@@ -240,6 +266,11 @@ export default function CombatsSuivrePage() {
                           <SelectValue placeholder="Choisir une catégorie" />
                         </SelectTrigger>
                         <SelectContent>
+                          {competition?.competition_id && (
+                            <SelectItem value={PLANIFICATION_COMPETITION}>
+                              Toute la compétition (toutes les aires)
+                            </SelectItem>
+                          )}
                           {categories.map(cat => (
                             <SelectItem key={cat.categorie_id} value={cat.categorie_id}>
                               {cat.nom}
@@ -274,7 +305,12 @@ export default function CombatsSuivrePage() {
                 </DialogContent>
               </Dialog>
               
-              <Button variant="outline" onClick={handleLancerFinales} data-testid="lancer-finales-btn">
+              <Button
+                variant="outline"
+                onClick={handleLancerFinales}
+                disabled={!competition?.competition_id}
+                data-testid="lancer-finales-btn"
+              >
                 <Play className="mr-2 h-4 w-4" />
                 Lancer les finales
               </Button>
@@ -490,10 +526,16 @@ const CombatCard = ({ combat, isAdmin, onStatutChange, onPasserSuivant, getTourB
           {getTourBadge(combat.tour)}
           {getStatutBadge(combat.statut)}
         </div>
-        {combat.heure_debut && (
-          <span className="text-sm font-mono text-slate-500 flex items-center gap-1">
+        {(combat.heure_estimee || combat.heure_debut) && (
+          <span
+            className="text-sm font-mono text-slate-500 flex items-center gap-1"
+            title={combat.heure_debut ? `Prévu à ${combat.heure_debut}` : undefined}
+          >
             <Clock className="h-3 w-3" />
-            {combat.heure_debut}
+            {combat.heure_estimee || combat.heure_debut}
+            {combat.heure_estimee && combat.heure_debut && combat.heure_estimee !== combat.heure_debut && (
+              <span className="text-xs text-slate-400 line-through">{combat.heure_debut}</span>
+            )}
           </span>
         )}
       </div>
@@ -1,6 +1,7 @@
 import { useState, useEffect } from "react";
 import axios from "axios";
 import { Layout } from "../components/Layout";
+import { useCompetition } from "../App";
 import { Card, CardContent, CardHeader, CardTitle } from "../components/ui/card";
 import { Users, Swords, Trophy, Grid3X3, FolderKanban, CheckCircle } from "lucide-react";
 import { motion } from "framer-motion";
@@ -31,6 +32,7 @@ const StatCard = ({ title, value, icon: Icon, color, delay }) => (
 );
 
 export default function Dashboard() {
+  const { competition } = useCompetition();
   const [stats, setStats] = useState({
     competiteurs: 0,
     categories: 0,
@@ -44,7 +46,10 @@ export default function Dashboard() {
   useEffect(() => {
     const fetchStats = async () => {
       try {
-        const response = await axios.get(`${API}/stats`, { withCredentials: true });
+        const response = await axios.get(`${API}/stats`, {
+          params: competition ? { competition_id: competition.competition_id } : {},
+          withCredentials: true
+        });
         setStats(response.data);
       } catch (error) {
         console.error("Error fetching stats:", error);
@@ -54,7 +59,7 @@ export default function Dashboard() {
     };
 
     fetchStats();
-  }, []);
+  }, [competition]);
 
   if (loading) {
     return (
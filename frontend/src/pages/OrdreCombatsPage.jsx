@@ -4,6 +4,7 @@ import axios from "axios";
 import { toast } from "sonner";
 import { Layout } from "../components/Layout";
 import { useAuth, useCompetition } from "../App";
+import { envoyerUneFois } from "../lib/utils";
 import { Card, CardContent, CardHeader, CardTitle } from "../components/ui/card";
 import { Button } from "../components/ui/button";
 import { Badge } from "../components/ui/badge";
@@ -405,11 +406,14 @@ export default function OrdreCombatsPage() {
     if (!window.confirm(`Déclarer forfait pour ${nom} (${couleur}) ?`)) return;
     
     try {
-      await axios.post(
+      await envoyerUneFois(`forfait-${combat.combat_id}-${competiteurId}`, (cle) => axios.post(
         `${API}/combats/${combat.combat_id}/forfait`,
         { competiteur_id: competiteurId, raison: "forfait" },
-        { withCredentials: true }
-      );
+        {
+          headers: { "Idempotency-Key": cle },
+          withCredentials: true
+        }
+      ));
       toast.success("Forfait enregistré");
       fetchAllCombats();
     } catch (error) {